@@ -1,34 +1,56 @@
+import logging
+
 import structlog
-from fastapi import FastAPI, status
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, status, Depends
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi_jwt_auth import AuthJWT
 from gunicorn import glogging
 from pydantic.main import BaseModel
 from starlette.requests import Request
 
+from app.core.capture import capture_route
 from app.core.database import get_database, get_test_database
 from app.core.events import startup_event, shutdown_event, startup_test_event, shutdown_test_event
 from app.core.log_config import configure_logging
+from app.core.metrics import registry
+from app.core.middleware import MetricsMiddleware, QueryMonitoringMiddleware, ServerTimingMiddleware, \
+    ProfilingMiddleware, RequestContextMiddleware, TrafficCaptureMiddleware, UnitOfWorkMiddleware
+from app.core.profiling import ProfileStorage
+from app.diagnostics.routes import diagnostics_router
 from app.orders.routes import order_router
 from app.settings import settings
 from app.users.routes import user_router
 
-configure_logging(log_level=settings.LOG_LEVEL, log_format=settings.LOG_FORMAT)
+
+def _configure_logging():
+    configure_logging(
+        log_level=settings.LOG_LEVEL,
+        log_format=settings.LOG_FORMAT,
+        sampling=settings.LOG_SAMPLING,
+        queue_size=settings.LOG_QUEUE_SIZE,
+    )
+
+
+_configure_logging()
 logger = structlog.get_logger("app")
 
 
 class UniformLogger(glogging.Logger):
     def setup(self, cfg):
-        configure_logging(log_level=settings.LOG_LEVEL, log_format=settings.LOG_FORMAT)
+        _configure_logging()
 
 
 async def logging_dependency(request: Request):
-    path_params = getattr(request, "path_params", None)
-    query_params = getattr(request, "query_params", None)
-    body = getattr(request, "_json", None)
-
+    capture_route(request)
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
     logger.debug(
-        f'{request.method} {request.url}, path_params={path_params}, query_params={query_params}, body={body}'
+        "request",
+        method=request.method,
+        url=str(request.url),
+        path_params=getattr(request, "path_params", None),
+        query_params=str(getattr(request, "query_params", "")),
+        body=getattr(request, "_json", None),
     )
 
 
@@ -39,6 +61,13 @@ async def health_check():
     )
 
 
+async def metrics():
+    return PlainTextResponse(
+        content=registry.render(),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
 class AuthJWTSettings(BaseModel):
     authjwt_secret_key = settings.JWT_SECRET_KEY
     authjwt_access_token_expires = settings.ACCESS_TOKEN_EXPIRE
@@ -54,16 +83,36 @@ def create_app(testing: bool = False):
         title="Pocket Law",
         version="0.0.1",
         openapi_version="3.0.0",
+        dependencies=[Depends(logging_dependency)],
         # root_path="/api",
     )
 
     app.include_router(user_router)
     app.include_router(order_router)
+    app.include_router(diagnostics_router)
 
     app.add_api_route("/service/health/", health_check)
+    app.add_api_route("/service/metrics", metrics)
+
+    app.add_middleware(UnitOfWorkMiddleware)
+    app.add_middleware(QueryMonitoringMiddleware, repeated_threshold=settings.MONGO_REPEATED_QUERY_THRESHOLD)
+    app.add_middleware(
+        ServerTimingMiddleware,
+        header_enabled=settings.SERVER_TIMING,
+        access_log=settings.ACCESS_LOG,
+    )
+    app.add_middleware(MetricsMiddleware)
+    app.add_middleware(TrafficCaptureMiddleware)
+    app.add_middleware(
+        ProfilingMiddleware,
+        storage=ProfileStorage(
+            directory=settings.PROFILING_DIR,
+            max_files=settings.PROFILING_MAX_FILES,
+            max_bytes=settings.PROFILING_MAX_BYTES,
+        ) if settings.PROFILING_DIR else None,
+    )
+    app.add_middleware(RequestContextMiddleware)
 
-
-    testing = False
     if not testing:
         app.add_event_handler("startup", startup_event)
         app.add_event_handler("shutdown", shutdown_event)
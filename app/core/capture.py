@@ -0,0 +1,133 @@
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional, List, Iterable, Tuple
+
+import structlog
+from starlette.requests import Request
+
+from app.core.log_config import json_dumps
+
+logger = structlog.get_logger("capture")
+
+# Values of path and query parameters kept as is, the rest may carry phones, emails, codes and tokens
+_SAFE_VALUE = re.compile(r"^(?:[0-9a-f]{24}|\d{1,6}|[A-Za-z_]{1,32})$")
+MASK = "*"
+
+
+def sanitize(value: str) -> str:
+    """
+    :return: value if it is an object id, a short number or a word, otherwise the mask
+    """
+    return value if _SAFE_VALUE.match(value) else MASK
+
+
+def sanitize_params(params: Iterable[Tuple[str, str]]) -> List[List[str]]:
+    return [[name, sanitize(str(value))] for name, value in params]
+
+
+class TrafficCapture:
+    """
+    Appends sampled requests to the NDJSON file: method, route template, sanitized parameters,
+    body size, user role, status and duration. Entries are written in batches by a background thread
+    and dropped when the queue is full. Workers may share the file, every batch is one append.
+    """
+
+    def __init__(self, path: str, sample_rate: float, queue_size: int = 10000):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[dict]]" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="traffic-capture", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def is_sampled(self) -> bool:
+        return self._thread is not None and random.random() < self.sample_rate
+
+    def record(self, entry: dict) -> None:
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        stopped = False
+        while not stopped:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                stopped = True
+                batch = batch[:batch.index(None)]
+            if batch:
+                try:
+                    with open(self.path, "a") as f:
+                        f.write("".join(json_dumps(x) + "\n" for x in batch))
+                except OSError as e:
+                    logger.error("Traffic capture failed", count=len(batch), error=str(e))
+
+
+traffic_capture: Optional[TrafficCapture] = None
+# Entry of the request being captured, filled by the middleware, logging_dependency and auth
+captured_request: ContextVar[Optional[dict]] = ContextVar("captured_request", default=None)
+
+
+def start_traffic_capture(path: Optional[str], sample_rate: float) -> None:
+    global traffic_capture
+    if path and sample_rate > 0:
+        traffic_capture = TrafficCapture(path, sample_rate)
+        traffic_capture.start()
+
+
+def stop_traffic_capture() -> None:
+    global traffic_capture
+    if traffic_capture is not None:
+        traffic_capture.stop()
+        traffic_capture = None
+
+
+def get_route_template(request: Request) -> Optional[str]:
+    endpoint = request.scope.get("endpoint")
+    for route in request.app.routes:
+        if getattr(route, "endpoint", None) is endpoint:
+            return route.path
+    return None
+
+
+def capture_route(request: Request) -> None:
+    """
+    Adds the route template and sanitized parameters to the entry of the captured request
+    """
+    entry = captured_request.get()
+    if entry is not None:
+        entry["route"] = get_route_template(request)
+        entry["path_params"] = dict(sanitize_params(request.path_params.items()))
+        entry["query"] = sanitize_params(request.query_params.multi_items())
+
+
+def capture_role(role: str) -> None:
+    entry = captured_request.get()
+    if entry is not None:
+        entry["role"] = role
+
+
+def new_entry(method: str) -> dict:
+    return {"ts": round(time.time(), 3), "method": method, "route": None, "role": None}
@@ -1,14 +1,25 @@
-from typing import Optional
+from typing import Optional, Union
 
 from bson.objectid import ObjectId as BsonObjectId
 from motor.motor_asyncio import AsyncIOMotorClient
 
 
-__all__ = ["get_database", "get_test_database", "AsyncIOMotorClient", "PydanticObjectId"]
+__all__ = ["get_database", "get_test_database", "create_client", "AsyncIOMotorClient", "PydanticObjectId"]
 
+from app.core.enums import StorageBackend
+from app.core.memory_database import MemoryClient
 from app.settings import settings
 
-mongo_client: Optional[AsyncIOMotorClient] = None
+mongo_client: Optional[Union[AsyncIOMotorClient, MemoryClient]] = None
+
+
+def create_client(backend: str, url: str, **kwargs) -> Union[AsyncIOMotorClient, MemoryClient]:
+    """
+    :param backend: name of StorageBackend, kwargs are passed to the Motor client only
+    """
+    if StorageBackend(backend) == StorageBackend.memory:
+        return MemoryClient()
+    return AsyncIOMotorClient(url, **kwargs)
 
 
 async def get_database() -> AsyncIOMotorClient:
@@ -0,0 +1,214 @@
+import asyncio
+import functools
+import json
+from contextvars import ContextVar
+from typing import Optional, Dict, Tuple, Set, List
+
+import structlog
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+from app.core.metrics import Counter, Histogram
+from app.core.timing import add_timing
+from app.core.tracing import span
+
+logger = structlog.get_logger("db_monitoring")
+
+MONGO_COMMANDS = Counter(
+    "mongo_commands_total", "Count of Mongo commands", ["command", "collection", "operation", "status"],
+)
+MONGO_COMMAND_DURATION = Histogram(
+    "mongo_command_duration_seconds", "Duration of Mongo commands", ["command", "collection", "operation"],
+)
+
+# Repository method that issues the commands, e.g. "OrderRepository.get_order_by_id"
+current_operation: ContextVar[Optional[str]] = ContextVar("current_operation", default=None)
+# Counts of query shapes issued within the current request
+request_queries: ContextVar[Optional[Dict[Tuple[str, str], int]]] = ContextVar("request_queries", default=None)
+# Commands issued within the current context as (operation, command, collection), used by round trip budgets in tests
+command_log: ContextVar[Optional[List[Tuple[str, str, str]]]] = ContextVar("command_log", default=None)
+_explaining: ContextVar[bool] = ContextVar("explaining", default=False)
+
+# Command fields that are not part of the query
+_SERVICE_FIELDS = {"$db", "lsid", "$clusterTime", "$readPreference", "txnNumber", "cursor", "batchSize"}
+_EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct", "findAndModify", "update", "delete"}
+
+
+def repository_operation(name: str):
+    """
+    Marks commands issued by the decorated coroutine with the operation name and records the call as a span
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            token = current_operation.set(name)
+            try:
+                with span(name):
+                    return await func(*args, **kwargs)
+            finally:
+                current_operation.reset(token)
+
+        return wrapper
+
+    return decorator
+
+
+def get_query_shape(value):
+    """
+    :return: query with values replaced by placeholders, so queries that differ only in values are equal
+    """
+    if isinstance(value, dict):
+        return {key: get_query_shape(x) for key, x in value.items()}
+    if isinstance(value, (list, tuple)):
+        shapes = [get_query_shape(x) for x in value if isinstance(x, (dict, list, tuple))]
+        return shapes if shapes else ["?"]
+    return "?"
+
+
+def _get_collection(command_name: str, command: dict) -> str:
+    if command_name == "getMore":
+        return command.get("collection", "")
+    collection = command.get(command_name)
+    return collection if isinstance(collection, str) else ""
+
+
+def _find_stages(plan, stage: str) -> bool:
+    if isinstance(plan, dict):
+        return plan.get("stage") == stage or any(_find_stages(x, stage) for x in plan.values())
+    if isinstance(plan, list):
+        return any(_find_stages(x, stage) for x in plan)
+    return False
+
+
+class CommandMonitor(monitoring.CommandListener):
+    """
+    Records latency of Mongo commands per command, collection and repository method and logs slow ones.
+    With `explain_slow_queries` the plan of every new slow query shape is explained once and
+    collection scans are reported.
+    """
+
+    def __init__(self, slow_query_ms: float, explain_slow_queries: bool = False, max_explained_shapes: int = 1000):
+        self.slow_query_ms = slow_query_ms
+        self.explain_slow_queries = explain_slow_queries
+        self._max_explained_shapes = max_explained_shapes
+        self._explained_shapes: Set[str] = set()
+        self._started: Dict[Tuple, Tuple[Optional[str], dict]] = {}
+        self._client: Optional[AsyncIOMotorClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def attach(self, client: AsyncIOMotorClient) -> None:
+        """
+        Sets client and event loop used to explain slow queries
+        """
+        self._client = client
+        self._loop = asyncio.get_running_loop()
+
+    @staticmethod
+    def _key(event) -> Tuple:
+        return event.connection_id, event.request_id
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        if _explaining.get():
+            return
+        self._started[self._key(event)] = (current_operation.get(), event.command)
+
+        log = command_log.get()
+        if log is not None:
+            log.append((
+                current_operation.get() or "unknown",
+                event.command_name,
+                _get_collection(event.command_name, event.command),
+            ))
+
+        queries = request_queries.get()
+        if queries is not None and event.command_name != "getMore":
+            shape = self._get_shape(event.command_name, event.command)
+            key = (current_operation.get() or "", shape)
+            queries[key] = queries.get(key, 0) + 1
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event, "success")
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event, "error")
+
+    def _finish(self, event, status: str) -> None:
+        started = self._started.pop(self._key(event), None)
+        if started is None:
+            return
+        operation, command = started
+        operation = operation or "unknown"
+        collection = _get_collection(event.command_name, command)
+        duration_ms = event.duration_micros / 1000
+        add_timing("db", duration_ms / 1000)
+
+        MONGO_COMMANDS.inc(command=event.command_name, collection=collection, operation=operation, status=status)
+        MONGO_COMMAND_DURATION.observe(
+            duration_ms / 1000, command=event.command_name, collection=collection, operation=operation,
+        )
+        if duration_ms < self.slow_query_ms:
+            return
+
+        shape = self._get_shape(event.command_name, command)
+        logger.warning(
+            "Slow query",
+            command=event.command_name,
+            collection=collection,
+            operation=operation,
+            duration_ms=duration_ms,
+            shape=shape,
+        )
+        if (
+                self.explain_slow_queries
+                and event.command_name in _EXPLAINABLE_COMMANDS
+                and shape not in self._explained_shapes
+                and len(self._explained_shapes) < self._max_explained_shapes
+                and self._loop is not None
+        ):
+            self._explained_shapes.add(shape)
+            self._loop.call_soon_threadsafe(
+                self._loop.create_task,
+                self.explain(event.database_name, command, operation=operation, shape=shape),
+            )
+
+    @staticmethod
+    def _get_shape(command_name: str, command: dict) -> str:
+        query = {key: value for key, value in command.items() if key not in _SERVICE_FIELDS and key != command_name}
+        return json.dumps(
+            {command_name: _get_collection(command_name, command), **get_query_shape(query)},
+            sort_keys=True,
+            default=str,
+        )
+
+    async def explain(self, database: str, command: dict, operation: str, shape: str) -> Optional[dict]:
+        _explaining.set(True)
+        explained = {key: value for key, value in command.items() if key not in _SERVICE_FIELDS - {"cursor"}}
+        try:
+            result = await self._client[database].command({"explain": explained, "verbosity": "executionStats"})
+        except Exception as e:
+            logger.error("Query explain failed", operation=operation, shape=shape, error=str(e))
+            return None
+        stats = result.get("executionStats", {})
+        collscan = _find_stages(result.get("queryPlanner", result), "COLLSCAN")
+        log = logger.warning if collscan else logger.info
+        log(
+            "Slow query plan",
+            operation=operation,
+            shape=shape,
+            collscan=collscan,
+            docs_examined=stats.get("totalDocsExamined"),
+            keys_examined=stats.get("totalKeysExamined"),
+            returned=stats.get("nReturned"),
+            execution_ms=stats.get("executionTimeMillis"),
+        )
+        return result
+
+
+def report_repeated_queries(queries: Dict[Tuple[str, str], int], threshold: int, handler: str) -> None:
+    """
+    Logs query shapes issued at least `threshold` times within one request, the N+1 pattern
+    """
+    for (operation, shape), count in queries.items():
+        if count >= threshold:
+            logger.warning("Repeated query", handler=handler, operation=operation, shape=shape, count=count)
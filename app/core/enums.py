@@ -7,7 +7,14 @@ class Environment(str, Enum):
     prod = "PROD"
 
 
+class StorageBackend(str, Enum):
+    mongo = "mongo"
+    memory = "memory"
+
+
 @unique
 class Collection(str, Enum):
     USERS = "users"
     ORDERS = "orders"
+    COUNTERS = "counters"
+    ORDER_DOCUMENTS = "order_documents"
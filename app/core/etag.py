@@ -0,0 +1,38 @@
+import hashlib
+
+from fastapi import status
+from fastapi.responses import Response
+from starlette.requests import Request
+
+
+def make_etag(*parts) -> str:
+    """
+    :param parts: values the representation depends on, e.g. document id and version
+    :return: str strong entity tag
+    """
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+
+
+def is_precondition_failed(request: Request, etag: str) -> bool:
+    """
+    :return: whether the request has If-Match and none of its tags is the current entity tag,
+    weak tags never match
+    """
+    if_match = request.headers.get("if-match")
+    if not if_match:
+        return False
+    tags = [tag.strip() for tag in if_match.split(",")]
+    return "*" not in tags and etag not in tags
+
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
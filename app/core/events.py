@@ -1,17 +1,38 @@
+import asyncio
+import os
 import ssl
+from typing import Optional
 
 import pytest
 import structlog
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo.errors import ServerSelectionTimeoutError
+from pymongo.errors import DuplicateKeyError, ServerSelectionTimeoutError
 
 import app.core.database
-from app.core.database import get_test_database
+from app.core.capture import start_traffic_capture, stop_traffic_capture
+from app.core.database import get_database, get_test_database, create_client
+from app.core.db_monitoring import CommandMonitor
 from app.core.enums import Collection
+from app.core.memory_database import MemoryClient
+from app.core.loop_monitor import LoopMonitor
+from app.core.metrics import registry
+from app.core.sampler import start_stack_sampler, stop_stack_sampler
+from app.core.tracing import start_tracing, tracer
+from app.orders.repositories.document import check_text_compression
+from app.orders.repositories.order import OrderRepository
 from app.settings import settings
+from app.users.migrations import find_duplicate_phones
+from app.users.repositories.user import UserRepository
 
 logger = structlog.get_logger('events')
 
+metrics_flush_task: Optional[asyncio.Task] = None
+loop_monitor_task: Optional[asyncio.Task] = None
+command_monitor = CommandMonitor(
+    slow_query_ms=settings.MONGO_SLOW_QUERY_MS,
+    explain_slow_queries=settings.MONGO_EXPLAIN_SLOW_QUERIES,
+)
+
 
 async def check_database_connection() -> None:
     """
@@ -21,32 +42,96 @@ async def check_database_connection() -> None:
     Если mongo_client не задан, выбрасывает RuntimeError
     """
     client = app.core.database.mongo_client
-    if not isinstance(client, AsyncIOMotorClient):
+    if not isinstance(client, (AsyncIOMotorClient, MemoryClient)):
         raise RuntimeError('Mongo client does not declared')
 
 
+async def create_indexes(db: AsyncIOMotorClient) -> None:
+    """
+    Создает индексы, объявленные в репозиториях. Существующие индексы не пересоздаются.
+    Если уникальный индекс телефонов не создается из-за дублей, телефоны логируются и запуск прерывается,
+    дубли объединяются командой python -m app.users.migrations
+    """
+    try:
+        await UserRepository.create_indexes(db)
+    except DuplicateKeyError:
+        logger.error(
+            "Duplicate customer phones, run python -m app.users.migrations",
+            phones=await find_duplicate_phones(db),
+        )
+        raise
+    await OrderRepository.create_indexes(db)
+
+
+def start_metrics_flush() -> None:
+    global metrics_flush_task
+    if settings.METRICS_DIR:
+        registry.directory = settings.METRICS_DIR
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        metrics_flush_task = asyncio.create_task(registry.run_flush(settings.METRICS_FLUSH_INTERVAL))
+
+
+def stop_metrics_flush() -> None:
+    if metrics_flush_task is not None:
+        metrics_flush_task.cancel()
+        registry.flush()
+
+
+def start_loop_monitor() -> None:
+    global loop_monitor_task
+    if settings.LOOP_MONITOR:
+        monitor = LoopMonitor(interval=settings.LOOP_LAG_INTERVAL, block_threshold=settings.LOOP_BLOCK_THRESHOLD)
+        loop_monitor_task = asyncio.create_task(monitor.run())
+
+
+def stop_loop_monitor() -> None:
+    if loop_monitor_task is not None:
+        loop_monitor_task.cancel()
+
+
 async def startup_event():
     logger.info('Startup')
-    app.core.database.mongo_client = AsyncIOMotorClient(settings.MONGO_URL)
+    check_text_compression()
+    start_metrics_flush()
+    start_loop_monitor()
+    start_tracing(file=settings.TRACING_FILE, url=settings.TRACING_URL, service_name=settings.SERVICE_NAME)
+    start_traffic_capture(settings.TRAFFIC_CAPTURE_FILE, settings.TRAFFIC_CAPTURE_SAMPLE_RATE)
+    if settings.STACK_SAMPLER:
+        start_stack_sampler(settings.STACK_SAMPLER_FREQUENCY)
+    app.core.database.mongo_client = create_client(
+        settings.STORAGE_BACKEND,
+        settings.MONGO_URL,
+        event_listeners=[command_monitor],
+    )
+    command_monitor.attach(app.core.database.mongo_client)
     try:
         await check_database_connection()
     except ServerSelectionTimeoutError as e:
         logger.error(e)
         shutdown_event()
         raise
+    await create_indexes(await get_database())
 
 
 def shutdown_event():
     logger.info('Shutdown')
+    stop_metrics_flush()
+    stop_stack_sampler()
+    stop_loop_monitor()
+    tracer.shutdown()
+    stop_traffic_capture()
     app.core.database.mongo_client.close()
 
 
 async def startup_test_event():
     logger.info('Startup tests')
-    app.core.database.mongo_client = AsyncIOMotorClient(
+    app.core.database.mongo_client = create_client(
+        settings.TEST_STORAGE_BACKEND,
         settings.TEST_MONGO_URL,
         serverSelectionTimeoutMS=1000,  # 1 second
+        event_listeners=[command_monitor],
     )
+    command_monitor.attach(app.core.database.mongo_client)
     try:
         await check_database_connection()
     except ServerSelectionTimeoutError as e:
@@ -58,6 +143,7 @@ async def startup_test_event():
         # Clear data
         for collection in Collection:
             await getattr(db, collection.value).delete_many({})
+        await create_indexes(db)
 
 
 async def shutdown_test_event():
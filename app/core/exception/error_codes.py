@@ -11,3 +11,7 @@ invalid_file_extension = 1010
 s3_client_error = 1011
 order_not_found = 1012
 order_wrong_operation_by_status = 1013
+diagnostics_disabled = 1014
+memory_snapshot_not_found = 1015
+unknown_order_fields = 1016
+user_version_conflict = 1017
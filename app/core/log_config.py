@@ -1,8 +1,16 @@
+import atexit
 import logging
 import logging.config
+import os
+import queue
+import random
 from enum import Enum
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
 
+import orjson
 import structlog
+import structlog.contextvars
 
 
 class LogFormat(Enum):
@@ -10,13 +18,76 @@ class LogFormat(Enum):
     json = 'json'
 
 
-def configure_logging(log_level: str = logging.INFO, log_format: str = LogFormat.json):
+def json_dumps(obj, default=None, **kwargs) -> str:
+    return orjson.dumps(obj, default=default).decode()
+
+
+class LogSampler:
+    """
+    Drops debug events of the given loggers, keeping the given share of them
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        self._rates = rates
+
+    def __call__(self, logger, method_name: str, event_dict: dict) -> dict:
+        if method_name == "debug" and self._rates:
+            rate = self._rates.get(logger.name)
+            if rate is not None and random.random() >= rate:
+                raise structlog.DropEvent
+        return event_dict
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Puts records to a bounded in-process queue as is, formatting and writing is left to the
+    listener thread. Records are dropped when the queue is full instead of blocking the event loop.
+    """
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            NonBlockingQueueHandler.dropped += 1
+
+
+_listener: Optional[QueueListener] = None
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _start_listener(log_queue: queue.Queue, handler: logging.Handler):
+    global _listener
+    _stop_listener()
+    _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+
+
+def configure_logging(
+        log_level: str = logging.INFO,
+        log_format: str = LogFormat.json,
+        sampling: Optional[Dict[str, float]] = None,
+        queue_size: int = 10000,
+):
     logging_processors = [
         structlog.stdlib.add_log_level,
         structlog.stdlib.add_logger_name,
         structlog.processors.format_exc_info,
     ]
-    all_processors = logging_processors + [
+    all_processors = [
+        structlog.stdlib.filter_by_level,
+        LogSampler(sampling or {}),
+        structlog.contextvars.merge_contextvars,
+    ] + logging_processors + [
         structlog.stdlib.PositionalArgumentsFormatter(),
         structlog.processors.StackInfoRenderer(),
         structlog.stdlib.ProcessorFormatter.wrap_for_formatter
@@ -43,7 +114,7 @@ def configure_logging(log_level: str = logging.INFO, log_format: str = LogFormat
             },
             LogFormat.json: {
                 "()": structlog.stdlib.ProcessorFormatter,
-                "processor": structlog.processors.JSONRenderer(),
+                "processor": structlog.processors.JSONRenderer(serializer=json_dumps),
                 "foreign_pre_chain": logging_processors,
             }
         },
@@ -62,3 +133,32 @@ def configure_logging(log_level: str = logging.INFO, log_format: str = LogFormat
             },
         }
     })
+
+    # Rendering and writing to stream is moved to the listener thread
+    root_logger = logging.getLogger()
+    stream_handler = root_logger.handlers[0]
+    log_queue = queue.Queue(maxsize=queue_size)
+    root_logger.removeHandler(stream_handler)
+    root_logger.addHandler(NonBlockingQueueHandler(log_queue))
+    _start_listener(log_queue, stream_handler)
+
+
+def _restart_listener_after_fork():
+    """
+    Threads do not survive fork and the queue of the parent may be left locked,
+    so the child gets a new queue and listener thread
+    """
+    global _listener
+    if _listener is None:
+        return
+    log_queue = queue.Queue(maxsize=_listener.queue.maxsize)
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, NonBlockingQueueHandler):
+            handler.queue = log_queue
+    _listener = QueueListener(log_queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+atexit.register(_stop_listener)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_listener_after_fork)
@@ -0,0 +1,96 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+import weakref
+from typing import Optional
+
+import structlog
+from starlette.types import Scope
+
+from app.core.metrics import Counter, Gauge, Histogram
+
+logger = structlog.get_logger("loop_monitor")
+
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds", "Delay of scheduled callbacks of the event loop",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+EVENT_LOOP_LAG_LAST = Gauge("event_loop_lag_last_seconds", "Last measured delay of the event loop")
+EVENT_LOOP_BLOCKS = Counter("event_loop_blocks_total", "Count of event loop blocks longer than threshold", ["handler"])
+
+# Requests handled by the tasks of the event loop, to find the route blocking the loop
+running_requests: "weakref.WeakKeyDictionary[asyncio.Task, Scope]" = weakref.WeakKeyDictionary()
+
+
+def track_request(scope: Scope) -> None:
+    task = asyncio.current_task()
+    if task is not None:
+        running_requests[task] = scope
+
+
+def untrack_request() -> None:
+    task = asyncio.current_task()
+    if task is not None:
+        running_requests.pop(task, None)
+
+
+class LoopMonitor:
+    """
+    Measures the event loop lag with a task sleeping for `interval`.
+    A watchdog thread captures the stack of the event loop thread when the task
+    has not woken up for `block_threshold` past the interval and logs it with the request in progress.
+    """
+
+    def __init__(self, interval: float = 0.1, block_threshold: float = 0.2):
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self.last_block: Optional[dict] = None
+        self._beat = 0.0
+        self._reported_beat = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._stop = threading.Event()
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        watchdog.start()
+        try:
+            while True:
+                self._beat = time.monotonic()
+                await asyncio.sleep(self.interval)
+                lag = max(time.monotonic() - self._beat - self.interval, 0)
+                EVENT_LOOP_LAG.observe(lag)
+                EVENT_LOOP_LAG_LAST.set(lag)
+        finally:
+            self._stop.set()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.block_threshold / 2):
+            beat = self._beat
+            blocked = time.monotonic() - beat - self.interval
+            if blocked >= self.block_threshold and beat != self._reported_beat:
+                self._reported_beat = beat
+                self._report(blocked)
+
+    def _report(self, blocked: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = "".join(traceback.format_stack(frame)) if frame is not None else None
+        task = asyncio.current_task(self._loop)
+        scope = running_requests.get(task) if task is not None else None
+        endpoint = scope.get("endpoint") if scope else None
+        self.last_block = {
+            "blocked_ms": round(blocked * 1000, 1),
+            "method": scope["method"] if scope else None,
+            "path": scope["path"] if scope else None,
+            "handler": getattr(endpoint, "__name__", None) if scope else None,
+            "task": task.get_name() if task is not None else None,
+            "stack": stack,
+        }
+        EVENT_LOOP_BLOCKS.inc(handler=self.last_block["handler"] or "unknown")
+        logger.warning("Event loop blocked", **self.last_block)
@@ -0,0 +1,744 @@
+"""
+In-memory storage backend with the Motor API subset used by repositories.
+
+Queries support equality on dotted paths and arrays, regular expressions, $eq, $ne, $in, $nin,
+$gt, $gte, $lt, $lte, $exists, $type with type aliases, $elemMatch, $size, $or, $and and $nor. Updates support $set, $setOnInsert,
+$unset, $inc, $min, $max and $push with $each, upserts included. Aggregations support $match, $sort,
+$skip, $limit, $project with field paths, $count and $facet. Unique indexes are enforced,
+other indexes are accepted and ignored.
+
+Every call is one round trip: it yields to the event loop, optionally sleeps `latency` seconds
+and is appended to the command log, so round trip budgets hold on both backends.
+"""
+import asyncio
+import re
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import IndexModel, ReturnDocument, InsertOne, UpdateOne, UpdateMany, DeleteOne, DeleteMany
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+from app.core.db_monitoring import command_log, current_operation
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+def _copy(value):
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
+
+
+def _resolve(value, parts: List[str]) -> list:
+    """
+    :return: values at the dotted path, arrays of documents on the way are traversed
+    """
+    if not parts:
+        return [value]
+    head, rest = parts[0], parts[1:]
+    if isinstance(value, dict):
+        return _resolve(value[head], rest) if head in value else []
+    if isinstance(value, list):
+        if head.isdigit():
+            index = int(head)
+            return _resolve(value[index], rest) if index < len(value) else []
+        result = []
+        for item in value:
+            if isinstance(item, dict):
+                result.extend(_resolve(item, parts))
+        return result
+    return []
+
+
+def get_values(document: dict, path: str) -> list:
+    return _resolve(document, path.split("."))
+
+
+def _candidates(values: list) -> Iterable:
+    # a condition on an array field matches the array itself or any of its elements
+    for value in values:
+        yield value
+        if isinstance(value, list):
+            yield from value
+
+
+def _equals(values: list, expected) -> bool:
+    if isinstance(expected, re.Pattern):
+        return any(isinstance(x, str) and expected.search(x) for x in _candidates(values))
+    if expected is None and not values:
+        return True
+    return any(x == expected for x in _candidates(values))
+
+
+def _compare(values: list, expected, compare: Callable[[Any, Any], bool]) -> bool:
+    for value in _candidates(values):
+        if _type_rank(value) != _type_rank(expected):
+            continue
+        if compare(value, expected):
+            return True
+    return False
+
+
+def _match_element(element, condition) -> bool:
+    if isinstance(condition, dict) and not _is_operator_dict(condition):
+        return isinstance(element, dict) and match(element, condition)
+    return _match_values([element], condition)
+
+
+def _is_operator_dict(condition) -> bool:
+    return isinstance(condition, dict) and bool(condition) and all(k.startswith("$") for k in condition)
+
+
+def _regex(pattern, options: str = "") -> re.Pattern:
+    if isinstance(pattern, re.Pattern):
+        return pattern
+    flags = 0
+    for option, flag in (("i", re.IGNORECASE), ("m", re.MULTILINE), ("s", re.DOTALL), ("x", re.VERBOSE)):
+        if option in options:
+            flags |= flag
+    return re.compile(pattern, flags)
+
+
+_TYPES = {
+    "string": (str,),
+    "int": (int,),
+    "double": (float,),
+    "bool": (bool,),
+    "object": (dict,),
+    "array": (list,),
+    "objectId": (ObjectId,),
+    "date": (datetime,),
+    "null": (type(None),),
+}
+
+
+def _is_type(value, alias: str) -> bool:
+    if alias not in _TYPES:
+        raise OperationFailure(f"unknown type name alias: {alias}")
+    if isinstance(value, bool) and alias != "bool":
+        return False
+    return isinstance(value, _TYPES[alias])
+
+
+def _match_operator(values: list, operator: str, argument, condition: dict) -> bool:
+    if operator == "$eq":
+        return _equals(values, argument)
+    if operator == "$ne":
+        return not _equals(values, argument)
+    if operator == "$in":
+        return any(_equals(values, x) for x in argument)
+    if operator == "$nin":
+        return not any(_equals(values, x) for x in argument)
+    if operator == "$gt":
+        return _compare(values, argument, lambda a, b: a > b)
+    if operator == "$gte":
+        return _compare(values, argument, lambda a, b: a >= b)
+    if operator == "$lt":
+        return _compare(values, argument, lambda a, b: a < b)
+    if operator == "$lte":
+        return _compare(values, argument, lambda a, b: a <= b)
+    if operator == "$exists":
+        return bool(values) == bool(argument)
+    if operator == "$type":
+        aliases = argument if isinstance(argument, list) else [argument]
+        return any(_is_type(x, alias) for x in values for alias in aliases)
+    if operator == "$elemMatch":
+        return any(
+            isinstance(x, list) and any(_match_element(element, argument) for element in x)
+            for x in values
+        )
+    if operator == "$size":
+        return any(isinstance(x, list) and len(x) == argument for x in values)
+    if operator == "$regex":
+        return _equals(values, _regex(argument, condition.get("$options", "")))
+    if operator == "$options":
+        return True
+    raise OperationFailure(f"unknown operator: {operator}")
+
+
+def _match_values(values: list, condition) -> bool:
+    if _is_operator_dict(condition):
+        return all(_match_operator(values, op, argument, condition) for op, argument in condition.items())
+    return _equals(values, condition)
+
+
+def match(document: dict, query: Optional[dict]) -> bool:
+    """
+    :return: whether the document matches the query filter
+    """
+    for key, condition in (query or {}).items():
+        if key == "$or":
+            if not any(match(document, x) for x in condition):
+                return False
+        elif key == "$and":
+            if not all(match(document, x) for x in condition):
+                return False
+        elif key == "$nor":
+            if any(match(document, x) for x in condition):
+                return False
+        elif key.startswith("$"):
+            raise OperationFailure(f"unknown top level operator: {key}")
+        elif not _match_values(get_values(document, key), condition):
+            return False
+    return True
+
+
+def _parent(document: dict, path: str, create: bool) -> Tuple[Any, Optional[str]]:
+    """
+    :return: container of the last path segment and the segment, None if the container is missing
+    """
+    parts = path.split(".")
+    target = document
+    for part in parts[:-1]:
+        if isinstance(target, list) and part.isdigit():
+            index = int(part)
+            target = target[index] if index < len(target) else None
+        elif isinstance(target, dict):
+            if part not in target:
+                if not create:
+                    return None, None
+                target[part] = {}
+            target = target[part]
+        else:
+            target = None
+            break
+    if not isinstance(target, (dict, list)):
+        if create:
+            raise OperationFailure(f"Cannot create field {path} in element {target!r}")
+        return None, None
+    return target, parts[-1]
+
+
+def _get(document: dict, path: str, default=None):
+    values = _resolve(document, path.split("."))
+    return values[0] if values else default
+
+
+def _set(document: dict, path: str, value) -> None:
+    target, key = _parent(document, path, create=True)
+    if isinstance(target, list):
+        index = int(key)
+        target.extend([None] * (index + 1 - len(target)))
+        target[index] = value
+    else:
+        target[key] = value
+
+
+def _unset(document: dict, path: str) -> None:
+    target, key = _parent(document, path, create=False)
+    if isinstance(target, dict):
+        target.pop(key, None)
+    elif isinstance(target, list) and key.isdigit() and int(key) < len(target):
+        target[int(key)] = None
+
+
+def apply_update(document: dict, update: dict, inserting: bool = False) -> None:
+    """
+    Applies update operators to the document in place
+    :param inserting: the document is being inserted by an upsert, $setOnInsert applies
+    """
+    if not update or not all(k.startswith("$") for k in update):
+        raise ValueError("update only works with $ operators")
+    for operator, fields in update.items():
+        for path, value in fields.items():
+            if operator == "$set" or operator == "$setOnInsert" and inserting:
+                _set(document, path, _copy(value))
+            elif operator == "$setOnInsert":
+                continue
+            elif operator == "$unset":
+                _unset(document, path)
+            elif operator == "$inc":
+                _set(document, path, _get(document, path, 0) + value)
+            elif operator == "$min":
+                current = _get(document, path)
+                if current is None or value < current:
+                    _set(document, path, _copy(value))
+            elif operator == "$max":
+                current = _get(document, path)
+                if current is None or value > current:
+                    _set(document, path, _copy(value))
+            elif operator == "$push":
+                items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                current = _get(document, path)
+                if current is None:
+                    current = []
+                    _set(document, path, current)
+                elif not isinstance(current, list):
+                    raise OperationFailure(f"The field '{path}' must be an array")
+                current.extend(_copy(items))
+            else:
+                raise OperationFailure(f"Unknown modifier: {operator}")
+
+
+def _upsert_document(query: dict) -> dict:
+    """
+    :return: document inserted by an upsert before the update is applied, made of equality conditions
+    """
+    document = {}
+    for key, condition in query.items():
+        if key.startswith("$"):
+            continue
+        if isinstance(condition, dict) and "$eq" in condition:
+            condition = condition["$eq"]
+        if not _is_operator_dict(condition) and not isinstance(condition, re.Pattern):
+            _set(document, key, _copy(condition))
+    return document
+
+
+def _include(source: dict, target: dict, parts: List[str]) -> None:
+    head, rest = parts[0], parts[1:]
+    if head not in source:
+        return
+    value = source[head]
+    if not rest:
+        target[head] = _copy(value)
+    elif isinstance(value, dict):
+        _include(value, target.setdefault(head, {}), rest)
+    elif isinstance(value, list):
+        items = [x for x in value if isinstance(x, dict)]
+        projected = target.setdefault(head, [{} for _ in items])
+        for item, projected_item in zip(items, projected):
+            _include(item, projected_item, rest)
+
+
+def project(document: dict, projection) -> dict:
+    """
+    :param projection: inclusion or exclusion of field paths, _id is included unless excluded
+    :return: projected copy of the document
+    """
+    if not projection:
+        return _copy(document)
+    if not isinstance(projection, dict):
+        projection = {x: 1 for x in projection}
+    fields = {k: v for k, v in projection.items() if k != "_id"}
+    if any(isinstance(v, (str, dict)) for v in fields.values()):
+        raise OperationFailure("projection expressions are not supported by the memory backend")
+    if fields and any(fields.values()):
+        if not all(fields.values()):
+            raise OperationFailure("Cannot do exclusion in inclusion projection")
+        result = {}
+        if projection.get("_id", 1) and "_id" in document:
+            result["_id"] = document["_id"]
+        for path in fields:
+            _include(document, result, path.split("."))
+        return result
+    result = _copy(document)
+    for path in fields:
+        _unset(result, path)
+    if not projection.get("_id", 1):
+        result.pop("_id", None)
+    return result
+
+
+def _type_rank(value) -> int:
+    # BSON comparison order of the types stored by the app
+    if value is None:
+        return 0
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 1
+    if isinstance(value, str):
+        return 2
+    if isinstance(value, dict):
+        return 3
+    if isinstance(value, list):
+        return 4
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 9
+    return 10
+
+
+def _sort_value(document: dict, path: str):
+    values = get_values(document, path)
+    value = values[0] if values else None
+    return _type_rank(value), value
+
+
+def _sort_spec(sort) -> List[Tuple[str, int]]:
+    if isinstance(sort, dict):
+        return list(sort.items())
+    if isinstance(sort, str):
+        return [(sort, 1)]
+    return list(sort)
+
+
+def sort_documents(documents: List[dict], sort) -> List[dict]:
+    # stable sorts from the last key to the first
+    for key, direction in reversed(_sort_spec(sort)):
+        documents = sorted(documents, key=lambda x: _sort_value(x, key), reverse=direction < 0)
+    return documents
+
+
+def aggregate(documents: List[dict], pipeline: List[dict]) -> List[dict]:
+    for stage in pipeline:
+        (name, argument), = stage.items()
+        if name == "$match":
+            documents = [x for x in documents if match(x, argument)]
+        elif name == "$sort":
+            documents = sort_documents(documents, argument)
+        elif name == "$skip":
+            documents = documents[argument:]
+        elif name == "$limit":
+            documents = documents[:argument]
+        elif name == "$project":
+            documents = [project(x, argument) for x in documents]
+        elif name == "$count":
+            documents = [{argument: len(documents)}] if documents else []
+        elif name == "$facet":
+            documents = [{key: aggregate(documents, value) for key, value in argument.items()}]
+        else:
+            raise OperationFailure(f"{name} stage is not supported by the memory backend")
+    return documents
+
+
+def _hashable(value):
+    if isinstance(value, dict):
+        return tuple((k, _hashable(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return tuple(_hashable(x) for x in value)
+    return value
+
+
+class UniqueIndex:
+
+    def __init__(self, model: IndexModel):
+        document = model.document
+        self.name: str = document["name"]
+        self.fields: List[str] = list(document["key"].keys())
+        self.sparse: bool = document.get("sparse", False)
+        self.partial: Optional[dict] = document.get("partialFilterExpression")
+        self.entries: Dict[Any, Any] = {}
+
+    def key(self, document: dict):
+        """
+        :return: indexed values of the document, None if the document is not indexed
+        """
+        if self.partial is not None and not match(document, self.partial):
+            return None
+        values = [get_values(document, x) for x in self.fields]
+        if self.sparse and not any(values):
+            return None
+        return tuple(_hashable(x[0]) if x else None for x in values)
+
+
+class MemoryCursor:
+    """
+    Result of find and aggregate, evaluated on the first read like the first batch of a Motor cursor
+    """
+
+    def __init__(self, collection: "MemoryCollection", command_name: str, evaluate: Callable[[], List[dict]]):
+        self._collection = collection
+        self._command_name = command_name
+        self._evaluate = evaluate
+        self._documents: Optional[List[dict]] = None
+
+    async def _load(self) -> List[dict]:
+        if self._documents is None:
+            await self._collection._round_trip(self._command_name)
+            self._documents = self._evaluate()
+        return self._documents
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in await self._load():
+            yield document
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        documents = await self._load()
+        return documents[:length] if length is not None else list(documents)
+
+
+class MemoryCollection:
+
+    def __init__(self, name: str, latency: float = 0, database: str = ""):
+        self.name = name
+        self.full_name = f"{database}.{name}"
+        self.latency = latency
+        self._documents: Dict[Any, dict] = {}
+        self._unique: List[UniqueIndex] = []
+
+    async def _round_trip(self, command_name: str) -> None:
+        log = command_log.get()
+        if log is not None:
+            log.append((current_operation.get() or "unknown", command_name, self.name))
+        await asyncio.sleep(self.latency)
+
+    def _filter(self, query: Optional[dict]) -> List[dict]:
+        if query and set(query) == {"_id"} and not _is_operator_dict(query["_id"]):
+            document = self._documents.get(query["_id"])
+            return [document] if document is not None else []
+        return [x for x in self._documents.values() if match(x, query)]
+
+    def _find(self, query, projection=None, sort=None, skip: int = 0, limit: int = 0) -> List[dict]:
+        documents = self._filter(query)
+        if sort:
+            documents = sort_documents(documents, sort)
+        documents = documents[skip:skip + limit] if limit else documents[skip:]
+        return [project(x, projection) for x in documents]
+
+    def _check_unique(self, old: Optional[dict], new: dict) -> None:
+        for index in self._unique:
+            key = index.key(new)
+            if key is not None and index.entries.get(key, new["_id"]) != new["_id"]:
+                raise DuplicateKeyError(
+                    f"E11000 duplicate key error collection: {self.name} index: {index.name} dup key: {key}",
+                    DUPLICATE_KEY_ERROR,
+                )
+        for index in self._unique:
+            if old is not None:
+                old_key = index.key(old)
+                if old_key is not None and index.entries.get(old_key) == old["_id"]:
+                    del index.entries[old_key]
+            key = index.key(new)
+            if key is not None:
+                index.entries[key] = new["_id"]
+
+    def _insert(self, document: dict) -> Any:
+        document.setdefault("_id", ObjectId())
+        if document["_id"] in self._documents:
+            raise DuplicateKeyError(
+                f"E11000 duplicate key error collection: {self.name} index: _id_ dup key: {document['_id']}",
+                DUPLICATE_KEY_ERROR,
+            )
+        stored = _copy(document)
+        self._check_unique(None, stored)
+        self._documents[stored["_id"]] = stored
+        return stored["_id"]
+
+    def _update(self, query: dict, update: dict, upsert: bool, multi: bool) -> Tuple[int, int, Any, List]:
+        """
+        :return: matched and modified counts, id of the upserted document and updated documents before and after
+        """
+        documents = self._filter(query)
+        if not multi:
+            documents = documents[:1]
+        if not documents:
+            if not upsert:
+                return 0, 0, None, []
+            document = _upsert_document(query)
+            apply_update(document, update, inserting=True)
+            upserted_id = self._insert(document)
+            return 0, 0, upserted_id, [(None, self._documents[upserted_id])]
+        changes = []
+        modified = 0
+        for document in documents:
+            updated = _copy(document)
+            apply_update(updated, update)
+            if updated.get("_id") != document["_id"]:
+                raise OperationFailure("Performing an update on the path '_id' would modify the immutable field '_id'")
+            if updated != document:
+                self._check_unique(document, updated)
+                self._documents[document["_id"]] = updated
+                modified += 1
+            changes.append((document, updated))
+        return len(documents), modified, None, changes
+
+    def _delete(self, query: dict, multi: bool) -> int:
+        documents = self._filter(query)
+        if not multi:
+            documents = documents[:1]
+        for document in documents:
+            del self._documents[document["_id"]]
+            for index in self._unique:
+                key = index.key(document)
+                if key is not None:
+                    index.entries.pop(key, None)
+        return len(documents)
+
+    async def find_one(self, filter: Optional[dict] = None, projection=None, sort=None, skip: int = 0):
+        await self._round_trip("find")
+        documents = self._find(filter, projection, sort=sort, skip=skip, limit=1)
+        return documents[0] if documents else None
+
+    def find(self, filter: Optional[dict] = None, projection=None, sort=None, skip: int = 0, limit: int = 0):
+        return MemoryCursor(self, "find", lambda: self._find(filter, projection, sort=sort, skip=skip, limit=limit))
+
+    def aggregate(self, pipeline: List[dict], **kwargs) -> MemoryCursor:
+        return MemoryCursor(
+            self,
+            "aggregate",
+            lambda: [_copy(x) for x in aggregate(list(self._documents.values()), pipeline)],
+        )
+
+    async def count_documents(self, filter: dict, skip: int = 0, limit: int = 0) -> int:
+        await self._round_trip("aggregate")
+        return len(self._find(filter, {"_id": 1}, skip=skip, limit=limit))
+
+    async def insert_one(self, document: dict) -> InsertOneResult:
+        await self._round_trip("insert")
+        return InsertOneResult(self._insert(document), True)
+
+    async def insert_many(self, documents: List[dict], ordered: bool = True) -> InsertManyResult:
+        await self._round_trip("insert")
+        inserted_ids, errors = [], []
+        for i, document in enumerate(documents):
+            try:
+                inserted_ids.append(self._insert(document))
+            except DuplicateKeyError as e:
+                errors.append({"index": i, "code": e.code, "errmsg": str(e), "op": document})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({
+                "writeErrors": errors, "writeConcernErrors": [], "nInserted": len(inserted_ids),
+                "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": [],
+            })
+        return InsertManyResult(inserted_ids, True)
+
+    @staticmethod
+    def _update_result(matched: int, modified: int, upserted_id) -> UpdateResult:
+        raw_result = {"n": matched, "nModified": modified}
+        if upserted_id is not None:
+            raw_result.update(n=1, upserted=upserted_id)
+        return UpdateResult(raw_result, True)
+
+    async def update_one(self, filter: dict, update: dict, upsert: bool = False) -> UpdateResult:
+        await self._round_trip("update")
+        matched, modified, upserted_id, _ = self._update(filter, update, upsert=upsert, multi=False)
+        return self._update_result(matched, modified, upserted_id)
+
+    async def update_many(self, filter: dict, update: dict, upsert: bool = False) -> UpdateResult:
+        await self._round_trip("update")
+        matched, modified, upserted_id, _ = self._update(filter, update, upsert=upsert, multi=True)
+        return self._update_result(matched, modified, upserted_id)
+
+    async def find_one_and_update(
+            self,
+            filter: dict,
+            update: dict,
+            projection=None,
+            sort=None,
+            upsert: bool = False,
+            return_document: bool = ReturnDocument.BEFORE,
+    ) -> Optional[dict]:
+        await self._round_trip("findAndModify")
+        if sort:
+            documents = self._find(filter, {"_id": 1}, sort=sort, limit=1)
+            if documents:
+                filter = {"_id": documents[0]["_id"]}
+        _, _, _, changes = self._update(filter, update, upsert=upsert, multi=False)
+        if not changes:
+            return None
+        before, after = changes[0]
+        document = after if return_document == ReturnDocument.AFTER else before
+        return project(document, projection) if document is not None else None
+
+    async def delete_one(self, filter: dict) -> DeleteResult:
+        await self._round_trip("delete")
+        return DeleteResult({"n": self._delete(filter, multi=False)}, True)
+
+    async def delete_many(self, filter: dict) -> DeleteResult:
+        await self._round_trip("delete")
+        return DeleteResult({"n": self._delete(filter, multi=True)}, True)
+
+    async def bulk_write(self, requests: List, ordered: bool = True) -> BulkWriteResult:
+        await self._round_trip("update")
+        result = {
+            "writeErrors": [], "writeConcernErrors": [], "nInserted": 0, "nUpserted": 0,
+            "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": [],
+        }
+        for i, request in enumerate(requests):
+            try:
+                if isinstance(request, InsertOne):
+                    self._insert(request._doc)
+                    result["nInserted"] += 1
+                elif isinstance(request, (UpdateOne, UpdateMany)):
+                    matched, modified, upserted_id, _ = self._update(
+                        request._filter,
+                        request._doc,
+                        upsert=bool(request._upsert),
+                        multi=isinstance(request, UpdateMany),
+                    )
+                    result["nMatched"] += matched
+                    result["nModified"] += modified
+                    if upserted_id is not None:
+                        result["nUpserted"] += 1
+                        result["upserted"].append({"index": i, "_id": upserted_id})
+                elif isinstance(request, (DeleteOne, DeleteMany)):
+                    result["nRemoved"] += self._delete(request._filter, multi=isinstance(request, DeleteMany))
+                else:
+                    raise TypeError(f"{request!r} is not supported by the memory backend")
+            except DuplicateKeyError as e:
+                result["writeErrors"].append({"index": i, "code": e.code, "errmsg": str(e), "op": request})
+                if ordered:
+                    break
+        if result["writeErrors"]:
+            raise BulkWriteError(result)
+        return BulkWriteResult(result, True)
+
+    async def create_indexes(self, indexes: List[IndexModel]) -> List[str]:
+        await self._round_trip("createIndexes")
+        for model in indexes:
+            if model.document.get("unique") and all(x.name != model.document["name"] for x in self._unique):
+                index = UniqueIndex(model)
+                for document in self._documents.values():
+                    key = index.key(document)
+                    if key is not None and key in index.entries:
+                        raise DuplicateKeyError(
+                            f"E11000 duplicate key error collection: {self.name} index: {index.name} dup key: {key}",
+                            DUPLICATE_KEY_ERROR,
+                        )
+                    if key is not None:
+                        index.entries[key] = document["_id"]
+                self._unique.append(index)
+        return [x.document["name"] for x in indexes]
+
+    async def create_index(self, keys, **kwargs) -> str:
+        return (await self.create_indexes([IndexModel(keys, **kwargs)]))[0]
+
+    async def drop(self) -> None:
+        await self._round_trip("drop")
+        self._documents.clear()
+        self._unique.clear()
+
+
+class MemoryDatabase:
+
+    def __init__(self, name: str, latency: float = 0):
+        self.name = name
+        self.latency = latency
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(name, latency=self.latency, database=self.name)
+        return self._collections[name]
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def list_collection_names(self) -> List[str]:
+        return list(self._collections)
+
+    async def drop_collection(self, name: str) -> None:
+        await self[name].drop()
+
+
+class MemoryClient:
+    """
+    Replaces AsyncIOMotorClient, databases live as long as the client
+    :param latency: seconds every call waits, to emulate the network round trip
+    """
+
+    def __init__(self, latency: float = 0):
+        self.latency = latency
+        self._databases: Dict[str, MemoryDatabase] = {}
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        if name not in self._databases:
+            self._databases[name] = MemoryDatabase(name, latency=self.latency)
+        return self._databases[name]
+
+    def close(self) -> None:
+        pass
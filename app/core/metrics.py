@@ -0,0 +1,281 @@
+import asyncio
+import functools
+import glob
+import json
+import os
+import threading
+import time
+from typing import Dict, Tuple, List, Optional, Iterable
+
+import structlog
+
+from app.core.tracing import span
+
+logger = structlog.get_logger("metrics")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+
+class Metric:
+    type: str
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = [
+                [list(key), list(value) if isinstance(value, list) else value]
+                for key, value in self._values.items()
+            ]
+        return {
+            "type": self.type,
+            "help": self.documentation,
+            "labelnames": list(self.labelnames),
+            "samples": samples,
+        }
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        """
+        :return: value counted by the worker for the labels
+        """
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            # Non cumulative bucket counts, then sum and count
+            values = self._values.get(key)
+            if values is None:
+                values = self._values[key] = [0] * (len(self.buckets) + 3)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    values[i] += 1
+                    break
+            else:
+                values[len(self.buckets)] += 1
+            values[-2] += value
+            values[-1] += 1
+
+    def snapshot(self) -> dict:
+        data = super().snapshot()
+        data["buckets"] = list(self.buckets)
+        return data
+
+
+class Registry:
+    """
+    Metrics of the worker process. If `directory` is set, every worker periodically stores a snapshot
+    of its metrics to `<directory>/<pid>.json` and the exposition merges snapshots of all workers.
+    Gauges are taken from alive workers only, counters and histograms of exited workers are kept.
+    The directory should be emptied before the server is started.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self.directory: Optional[str] = None
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+
+    def snapshot(self) -> dict:
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def _snapshot_path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"{pid}.json")
+
+    def flush(self) -> None:
+        if not self.directory:
+            return
+        path = self._snapshot_path(os.getpid())
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(f"{path}.tmp", path)
+
+    async def run_flush(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.flush()
+            except OSError as e:
+                logger.error("Metrics flush failed", error=str(e))
+
+    def _collect(self) -> List[Tuple[bool, dict]]:
+        """
+        :return: snapshots of workers with flag whether the worker is alive
+        """
+        snapshots = [(True, self.snapshot())]
+        if not self.directory:
+            return snapshots
+        for path in glob.glob(os.path.join(self.directory, "*.json")):
+            try:
+                pid = int(os.path.basename(path).split(".")[0])
+                if pid == os.getpid():
+                    continue
+                with open(path) as f:
+                    snapshots.append((_is_alive(pid), json.load(f)))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def render(self) -> str:
+        merged: Dict[str, dict] = {}
+        for alive, snapshot in self._collect():
+            for name, data in snapshot.items():
+                if data["type"] == "gauge" and not alive:
+                    continue
+                metric = merged.setdefault(name, {**data, "samples": {}})
+                for key, value in data["samples"]:
+                    key = tuple(key)
+                    if key not in metric["samples"]:
+                        metric["samples"][key] = value
+                    elif isinstance(value, list):
+                        metric["samples"][key] = [a + b for a, b in zip(metric["samples"][key], value)]
+                    else:
+                        metric["samples"][key] += value
+
+        lines = []
+        for name, metric in sorted(merged.items()):
+            lines.append(f"# HELP {name} {metric['help']}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+            for key, value in sorted(metric["samples"].items()):
+                labels = list(zip(metric["labelnames"], key))
+                if metric["type"] != "histogram":
+                    lines.append(f"{name}{_format_labels(labels)} {float(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric["buckets"] + ["+Inf"], value):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels + [('le', bound)])} {float(cumulative)}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {float(value[-2])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {float(value[-1])}")
+        return "\n".join(lines) + "\n"
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _format_labels(labels: List[Tuple[str, object]]) -> str:
+    if not labels:
+        return ""
+    values = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r'\"'))
+        for name, value in labels
+    )
+    return f"{{{values}}}"
+
+
+registry = Registry()
+
+REQUESTS = Counter("http_requests_total", "Count of handled requests", ["handler", "method", "status"])
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time until the response is sent", ["handler", "method"],
+)
+REQUESTS_IN_PROGRESS = Gauge("http_requests_in_progress", "Count of requests in progress")
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "Size of response body", ["handler"], buckets=SIZE_BUCKETS,
+)
+BACKGROUND_TASKS = Counter("background_tasks_total", "Count of finished background tasks", ["task", "status"])
+BACKGROUND_TASKS_IN_PROGRESS = Gauge(
+    "background_tasks_in_progress", "Count of background tasks in progress", ["task"],
+)
+BACKGROUND_TASK_DURATION = Histogram("background_task_duration_seconds", "Duration of background tasks", ["task"])
+CACHE_REQUESTS = Counter("cache_requests_total", "Count of cache lookups", ["cache", "result"])
+SINGLE_FLIGHT_CALLS = Counter(
+    "single_flight_calls_total",
+    "Count of reads that issued a query (leader) or shared an identical one in flight (coalesced)",
+    ["operation", "result"],
+)
+
+
+def track_background_task(func):
+    """
+    Wraps function passed to BackgroundTasks.add_task to count it in metrics and record it as a span
+    of the request, background tasks run after the response within the request context
+    """
+    task = func.__qualname__
+
+    def _start() -> float:
+        BACKGROUND_TASKS_IN_PROGRESS.inc(task=task)
+        return time.perf_counter()
+
+    def _finish(start: float, status: str) -> None:
+        BACKGROUND_TASKS_IN_PROGRESS.dec(task=task)
+        BACKGROUND_TASKS.inc(task=task, status=status)
+        BACKGROUND_TASK_DURATION.observe(time.perf_counter() - start, task=task)
+
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start, status = _start(), "error"
+            try:
+                with span(f"background {task}"):
+                    result = await func(*args, **kwargs)
+                status = "success"
+                return result
+            finally:
+                _finish(start, status)
+    else:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start, status = _start(), "error"
+            try:
+                with span(f"background {task}"):
+                    result = func(*args, **kwargs)
+                status = "success"
+                return result
+            finally:
+                _finish(start, status)
+    return wrapper
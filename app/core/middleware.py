@@ -0,0 +1,340 @@
+import asyncio
+import cProfile
+import hmac
+import re
+import time
+import uuid
+from typing import Optional
+
+import structlog
+import structlog.contextvars
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+
+from app.core import capture
+from app.core.capture import captured_request, new_entry
+from app.core.db_monitoring import request_queries, report_repeated_queries
+from app.core.loop_monitor import track_request, untrack_request
+from app.core.profiling import ProfileStorage
+from app.core.metrics import REQUESTS, REQUEST_DURATION, REQUESTS_IN_PROGRESS, RESPONSE_SIZE
+from app.core.timing import RequestTimings, request_timings, format_server_timing
+from app.core.tracing import span
+from app.core.unit_of_work import UnitOfWork, current_unit_of_work
+from app.settings import settings
+
+access_logger = structlog.get_logger("access")
+
+
+def get_handler_name(scope: Scope) -> str:
+    """
+    :return: name of the route endpoint, available after the request was routed
+    """
+    endpoint = scope.get("endpoint")
+    return getattr(endpoint, "__name__", "unmatched")
+
+
+class MetricsMiddleware:
+    """
+    Counts requests, response sizes and latency until the response body is sent per route endpoint.
+    Background tasks run after the response is sent and are not included in the latency.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+        response_size = 0
+        finished = False
+
+        def finish():
+            nonlocal finished
+            finished = True
+            handler = get_handler_name(scope)
+            REQUESTS_IN_PROGRESS.dec()
+            REQUESTS.inc(handler=handler, method=scope["method"], status=status_code)
+            REQUEST_DURATION.observe(time.perf_counter() - start, handler=handler, method=scope["method"])
+            RESPONSE_SIZE.observe(response_size, handler=handler)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+
+        REQUESTS_IN_PROGRESS.inc()
+        track_request(scope)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            untrack_request()
+            if not finished:
+                finish()
+
+
+class TrafficCaptureMiddleware:
+    """
+    Records sampled requests to the traffic capture for replay. Route and parameters are added
+    by logging_dependency after routing, the user role by auth.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        recorder = capture.traffic_capture
+        if scope["type"] != "http" or recorder is None or not recorder.is_sampled():
+            await self.app(scope, receive, send)
+            return
+
+        entry = new_entry(scope["method"])
+        token = captured_request.set(entry)
+        start = time.perf_counter()
+        status_code = 500
+        body_size = 0
+        finished = False
+
+        def finish():
+            nonlocal finished
+            finished = True
+            entry["body_size"] = body_size
+            entry["status"] = status_code
+            entry["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            recorder.record(entry)
+
+        async def receive_wrapper() -> Message:
+            nonlocal body_size
+            message = await receive()
+            if message["type"] == "http.request":
+                body_size += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            captured_request.reset(token)
+            if not finished:
+                finish()
+
+
+class QueryMonitoringMiddleware:
+    """
+    Counts Mongo query shapes issued while handling a request and logs the ones repeated
+    at least `repeated_threshold` times, which is usually a query in a loop.
+    """
+
+    def __init__(self, app: ASGIApp, repeated_threshold: int):
+        self.app = app
+        self.repeated_threshold = repeated_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries = {}
+        token = request_queries.set(queries)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_queries.reset(token)
+            report_repeated_queries(queries, self.repeated_threshold, handler=get_handler_name(scope))
+
+
+class UnitOfWorkMiddleware:
+    """
+    Opens the unit of work of the request for repositories. Deferred writes are flushed before
+    the response starts if the status is below 400, otherwise they are discarded.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        unit_of_work = UnitOfWork()
+        token = current_unit_of_work.set(unit_of_work)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and unit_of_work.enabled:
+                await unit_of_work.close(commit=message["status"] < 400)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_unit_of_work.reset(token)
+            if unit_of_work.enabled:
+                await unit_of_work.close(commit=False)
+
+
+def has_api_key(scope: Scope) -> bool:
+    """
+    :return: whether the request carries the valid API key, for privileged diagnostics
+    """
+    api_key = Headers(scope=scope).get(settings.API_KEY_NAME)
+    return api_key is not None and hmac.compare_digest(api_key, settings.API_KEY)
+
+
+class ServerTimingMiddleware:
+    """
+    Collects time spans of the request (auth, db, serialize, storage) and the time until the response start.
+    Spans are sent in the Server-Timing header if `header_enabled` or the request carries the API key,
+    and are written to the access log line after the response body is sent.
+    """
+
+    def __init__(self, app: ASGIApp, header_enabled: bool, access_log: bool):
+        self.app = app
+        self.header_enabled = header_enabled
+        self.access_log = access_log
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = request_timings.set(timings)
+        send_header = self.header_enabled or has_api_key(scope)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                timings.add("app", timings.elapsed())
+                if send_header:
+                    MutableHeaders(scope=message).append("Server-Timing", format_server_timing(timings.totals))
+            await send(message)
+            if (
+                    self.access_log
+                    and message["type"] == "http.response.body"
+                    and not message.get("more_body", False)
+            ):
+                access_logger.info(
+                    "Request",
+                    method=scope["method"],
+                    path=scope["path"],
+                    handler=get_handler_name(scope),
+                    status=status_code,
+                    duration_ms=round(timings.elapsed() * 1000, 1),
+                    **{f"{name}_ms": round(seconds * 1000, 1) for name, seconds in timings.totals.items()},
+                )
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_timings.reset(token)
+
+
+class ProfilingMiddleware:
+    """
+    Runs requests with the `profile_header` and the API key under cProfile and saves the profile
+    to the storage, the file name is returned in the same header. The profiler sees everything
+    running on the event loop meanwhile, so other requests are profiled one at a time.
+    """
+    profile_header = "x-profile"
+
+    def __init__(self, app: ASGIApp, storage: Optional[ProfileStorage]):
+        self.app = app
+        self.storage = storage
+        self._busy = False
+
+    def _is_requested(self, scope: Scope) -> bool:
+        return (
+            self.storage is not None
+            and scope["type"] == "http"
+            and self.profile_header in Headers(scope=scope)
+            and has_api_key(scope)
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not self._is_requested(scope):
+            await self.app(scope, receive, send)
+            return
+        if self._busy:
+            async def send_busy(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    MutableHeaders(scope=message).append(self.profile_header, "busy")
+                await send(message)
+
+            await self.app(scope, receive, send_busy)
+            return
+
+        name = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal name
+            if message["type"] == "http.response.start":
+                name = self.storage.get_name(get_handler_name(scope))
+                MutableHeaders(scope=message).append(self.profile_header, name)
+            await send(message)
+
+        self._busy = True
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.disable()
+            self._busy = False
+            if name is not None:
+                await asyncio.get_running_loop().run_in_executor(None, self.storage.save, profile, name)
+
+
+class RequestContextMiddleware:
+    """
+    Takes the request id from the `X-Request-ID` header or generates it, binds it to the log context
+    and returns it in the response. The request is recorded as the root span of a trace,
+    background tasks run within it.
+    """
+    header = "x-request-id"
+    _valid_request_id = re.compile(r"^[\w.:-]{1,128}$")
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    def get_request_id(self, scope: Scope) -> str:
+        request_id = Headers(scope=scope).get(self.header)
+        if request_id and self._valid_request_id.match(request_id):
+            return request_id
+        return uuid.uuid4().hex
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = self.get_request_id(scope)
+
+        with structlog.contextvars.bound_contextvars(request_id=request_id), \
+                span(f"{scope['method']} {scope['path']}", request_id=request_id) as root:
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    MutableHeaders(scope=message).append(self.header, request_id)
+                    if root is not None:
+                        root.attributes["http.status_code"] = message["status"]
+                        root.attributes["handler"] = get_handler_name(scope)
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,60 @@
+import cProfile
+import glob
+import itertools
+import os
+import time
+from typing import Optional
+
+import structlog
+
+logger = structlog.get_logger("profiling")
+
+
+class ProfileStorage:
+    """
+    Directory with pstats files of profiled requests, the oldest files are removed
+    to keep at most `max_files` files of at most `max_bytes` in total
+    """
+
+    def __init__(self, directory: str, max_files: int, max_bytes: int):
+        self.directory = directory
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self._counter = itertools.count(1)
+
+    def get_name(self, handler: str) -> str:
+        """
+        :return: file name unique across workers and requests profiled within the same second
+        """
+        return f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(self._counter)}-{handler}.pstats"
+
+    def save(self, profile: cProfile.Profile, name: str) -> Optional[str]:
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, name)
+        try:
+            profile.dump_stats(path)
+            self._cleanup()
+        except OSError as e:
+            logger.error("Profile saving failed", path=path, error=str(e))
+            return None
+        logger.info("Profile saved", path=path)
+        return path
+
+    def _cleanup(self) -> None:
+        files = []
+        for path in glob.glob(os.path.join(self.directory, "*.pstats")):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        files.sort(reverse=True)
+
+        total_size = 0
+        for i, (_, size, path) in enumerate(files):
+            total_size += size
+            if i >= self.max_files or total_size > self.max_bytes:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
@@ -1,24 +1,187 @@
+import asyncio
+import contextlib
+import functools
+import time
 from abc import ABCMeta, abstractmethod
-from typing import Type
+from typing import AsyncIterator, Type, List, Optional
 
+from bson import ObjectId
 from fastapi import Depends
 from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import IndexModel, ReturnDocument
 
 from app.core.database import AsyncIOMotorClient, get_database
+from app.core.db_monitoring import repository_operation, current_operation
 from app.core.enums import Collection
+from app.core.single_flight import shared_reads
+from app.core.unit_of_work import UnitOfWork, get_unit_of_work
+
+# Leases of sequence values not released for longer, e.g. by a killed worker, no longer hold back sync tokens
+SEQUENCE_LEASE_SECONDS = 60
+
+
+def deferred(func):
+    """
+    Marks repository methods that only queue writes to the unit of work,
+    they do not flush deferred writes before running
+    """
+    func.deferred = True
+    return func
+
+
+def _flushing(func):
+    """
+    Sends writes deferred by the request before the method reads or writes, so it sees them
+    """
+    if getattr(func, "deferred", False):
+        return func
+
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        if self._unit_of_work.has_pending:
+            await self._unit_of_work.flush()
+        return await func(self, *args, **kwargs)
+
+    return wrapper
 
 
 class BaseRepository(metaclass=ABCMeta):
+    indexes: List[IndexModel] = []
 
-    def __init__(self, db: AsyncIOMotorClient = Depends(get_database)):
+    def __init__(
+            self,
+            db: AsyncIOMotorClient = Depends(get_database),
+            unit_of_work: UnitOfWork = Depends(get_unit_of_work),
+    ):
         if not isinstance(self.collection_name, Collection):
             raise RuntimeError('Unsupported collection name')
         self._db: AsyncIOMotorCollection = db[self.collection_name.value]
+        self._counters: AsyncIOMotorCollection = db[Collection.COUNTERS.value]
+        if not isinstance(unit_of_work, UnitOfWork):
+            # created outside of a request, reads and writes go to Mongo directly
+            unit_of_work = UnitOfWork(enabled=False)
+        self._unit_of_work = unit_of_work
+
+    def __init_subclass__(cls, **kwargs):
+        """
+        Wraps coroutine methods of repositories so Mongo commands are attributed to the calling method
+        and writes deferred by the request are sent first
+        """
+        super().__init_subclass__(**kwargs)
+        for name, value in list(vars(cls).items()):
+            if asyncio.iscoroutinefunction(value):
+                setattr(cls, name, repository_operation(f"{cls.__name__}.{name}")(_flushing(value)))
 
     @property
     @abstractmethod
     def collection_name(self) -> Type[Collection]:
         pass
 
+    @classmethod
+    async def create_indexes(cls, db: AsyncIOMotorClient) -> None:
+        if cls.indexes:
+            await db[cls.collection_name.value].create_indexes(cls.indexes)
+
+    def _remember(self, row: Optional[dict]) -> Optional[dict]:
+        """
+        :param row: full document, partial projections must not be remembered
+        :return: the same row
+        """
+        return self._unit_of_work.remember(self.collection_name.value, row)
+
+    def _forget(self, query: Optional[dict] = None) -> None:
+        """
+        Called before writes: drops documents matched by the query from the identity map
+        and stops sharing reads of the collection that are in flight
+        """
+        if query is not None:
+            self._unit_of_work.forget(self.collection_name.value, query)
+        shared_reads.forget(self._db.full_name)
+
+    async def _defer(self, query: dict, update: dict, many: bool = False) -> None:
+        """
+        Queues the update until the response starts, see UnitOfWork.defer
+        """
+        self._forget(query)
+        await self._unit_of_work.defer(self._db, query, update, many=many)
+
+    async def _find_one(self, query: dict, projection: Optional[dict] = None) -> Optional[dict]:
+        """
+        Reads the document, concurrent identical reads of the worker share one query
+        :param projection: Mongo projection, partial documents are not remembered
+        :return: document, the full one is remembered in the identity map
+        """
+        row = await shared_reads.run(
+            (self._db.full_name, repr(query), repr(projection)),
+            functools.partial(self._db.find_one, query, projection),
+            operation=current_operation.get() or "unknown",
+        )
+        return self._remember(row) if projection is None else row
+
+    async def _find_by_id(self, document_id, projection: Optional[dict] = None) -> Optional[dict]:
+        """
+        :param projection: Mongo projection for the read, a document in the identity map is returned whole
+        :return: document from the identity map of the request, or read from Mongo
+        """
+        row = self._unit_of_work.get(self.collection_name.value, document_id)
+        if row is None:
+            row = await self._find_one({"_id": ObjectId(document_id)}, projection)
+        return row
+
+    @contextlib.asynccontextmanager
+    async def _sequence(self, count: int = 1) -> AsyncIterator[int]:
+        """
+        Reserves values of the monotonically increasing sequence of the collection for the writes in the block.
+        The reservation is leased until the block exits, so readers do not pass values whose writes are in flight
+        :param count: how many values of the sequence to reserve
+        :return: first reserved value
+        """
+        lease = str(ObjectId())
+        leased_at = time.time()
+        counter = await self._counters.find_one_and_update(
+            {"_id": self.collection_name.value},
+            {"$inc": {"seq": count}, "$set": {f"leases.{lease}": leased_at}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        last = counter["seq"]
+        try:
+            yield last - count + 1
+        finally:
+            await self._release_sequence(lease, leased_at, last)
+
+    async def _release_sequence(self, lease: str, leased_at: float, last: int) -> None:
+        """
+        The last reservation released while no other one is in flight marks the sequence committed up to its value
+        """
+        result = await self._counters.update_one(
+            {"_id": self.collection_name.value, "seq": last, "leases": {lease: leased_at}},
+            {"$unset": {"leases": ""}, "$set": {"committed": last}},
+        )
+        if not result.matched_count:
+            await self._counters.update_one(
+                {"_id": self.collection_name.value},
+                {"$unset": {f"leases.{lease}": ""}},
+            )
+
+    async def _sequence_watermark(self) -> int:
+        """
+        While writes are in flight, only values up to the last committed mark are known to be written.
+        Under continuously overlapping writes the mark lags until the writes pause
+        :return: the lowest sequence value that can still be written, documents below it are committed
+        """
+        counter = await self._counters.find_one({"_id": self.collection_name.value}) or {}
+        now = time.time()
+        leases = counter.get("leases") or {}
+        expired = [x for x, leased_at in leases.items() if now - leased_at > SEQUENCE_LEASE_SECONDS]
+        if expired:
+            await self._counters.update_one(
+                {"_id": self.collection_name.value},
+                {"$unset": {f"leases.{x}": "" for x in expired}},
+            )
+        if len(leases) > len(expired):
+            return counter.get("committed", 0) + 1
+        return counter.get("seq", 0) + 1
+
     async def drop(self):
         await self._db.drop()
@@ -0,0 +1,109 @@
+import os
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+from app.core.metrics import Gauge
+
+SAMPLER_OVERHEAD = Gauge("stack_sampler_overhead_ratio", "Share of wall time spent by the stack sampler")
+# Innermost functions of threads parked on a lock or in the idle event loop, their stacks are not sampled
+IDLE_FUNCTIONS = {"threading.py:wait", "threading.py:_wait_for_tstate_lock", "selectors.py:select"}
+
+
+class StackSampler:
+    """
+    Background thread taking stacks of all threads of the process `frequency` times per second.
+    Stacks are folded into counts in the collapsed format of flamegraph tools:
+    `thread;outer_function;...;inner_function count`
+    Threads parked in IDLE_FUNCTIONS are skipped, so the stacks show where the process does work
+    """
+
+    def __init__(self, frequency: float = 100, max_depth: int = 128, max_stacks: int = 100000):
+        self.interval = 1 / frequency
+        self.max_depth = max_depth
+        self.max_stacks = max_stacks
+        self.samples = 0
+        self.sampling_time = 0.0
+        self._stacks: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started_at = 0.0
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    @property
+    def overhead(self) -> float:
+        """
+        :return: share of wall time the sampler thread spent taking stacks
+        """
+        elapsed = time.perf_counter() - self._started_at
+        return self.sampling_time / elapsed if self._started_at and elapsed > 0 else 0.0
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            start = time.perf_counter()
+            self.sample(exclude=own_id)
+            self.sampling_time += time.perf_counter() - start
+            SAMPLER_OVERHEAD.set(self.overhead)
+
+    def sample(self, exclude: Optional[int] = None) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == exclude:
+                continue
+            code = frame.f_code
+            if f"{os.path.basename(code.co_filename)}:{code.co_name}" in IDLE_FUNCTIONS:
+                continue
+            functions = []
+            while frame is not None and len(functions) < self.max_depth:
+                code = frame.f_code
+                functions.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            functions.append(names.get(thread_id, str(thread_id)))
+            stacks.append(";".join(reversed(functions)))
+
+        with self._lock:
+            self.samples += 1
+            for stack in stacks:
+                if stack in self._stacks or len(self._stacks) < self.max_stacks:
+                    self._stacks[stack] = self._stacks.get(stack, 0) + 1
+
+    def collapsed(self, reset: bool = False) -> str:
+        with self._lock:
+            stacks = self._stacks if reset else dict(self._stacks)
+            if reset:
+                self._stacks = {}
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items()))
+
+
+stack_sampler: Optional[StackSampler] = None
+
+
+def start_stack_sampler(frequency: float) -> StackSampler:
+    global stack_sampler
+    if stack_sampler is None:
+        stack_sampler = StackSampler(frequency=frequency)
+    stack_sampler.start()
+    return stack_sampler
+
+
+def stop_stack_sampler() -> None:
+    if stack_sampler is not None:
+        stack_sampler.stop()
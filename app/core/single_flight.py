@@ -0,0 +1,66 @@
+import asyncio
+import copy
+from typing import Awaitable, Callable, Dict, Hashable, Tuple
+
+from app.core.metrics import SINGLE_FLIGHT_CALLS
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 1
+
+
+class SingleFlight:
+    """
+    Per-worker coalescing of identical concurrent reads: callers with the same key share one in-flight
+    call and its result. Only calls in flight are shared, results are not cached. Every caller gets
+    its own copy of a shared result, so it may be changed. Keys are (namespace, ...) tuples,
+    `forget` is called on writes to the namespace so later reads do not join a query started before the write.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Tuple[Hashable, ...], _Call] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def _run(self, key: Tuple[Hashable, ...], func: Callable[[], Awaitable]):
+        try:
+            return await func()
+        finally:
+            call = self._calls.get(key)
+            if call is not None and call.task is asyncio.current_task():
+                del self._calls[key]
+
+    async def run(self, key: Tuple[Hashable, ...], func: Callable[[], Awaitable], operation: str):
+        """
+        :param key: hashable key of the call, the first item is the namespace
+        :param func: issues the call, awaited once per key in flight
+        :param operation: name of the read in metrics
+        :return: result of func
+        """
+        call = self._calls.get(key)
+        if call is None:
+            # a separate task, so a caller cancelled meanwhile does not cancel the others
+            call = _Call(asyncio.get_running_loop().create_task(self._run(key, func)))
+            self._calls[key] = call
+            self.leaders += 1
+            SINGLE_FLIGHT_CALLS.inc(operation=operation, result="leader")
+        else:
+            call.waiters += 1
+            self.coalesced += 1
+            SINGLE_FLIGHT_CALLS.inc(operation=operation, result="coalesced")
+        result = await asyncio.shield(call.task)
+        return copy.deepcopy(result) if call.waiters > 1 else result
+
+    def forget(self, namespace: Hashable) -> None:
+        """
+        Stops sharing calls of the namespace that are in flight, their callers still get the result
+        """
+        for key in [x for x in self._calls if x[0] == namespace]:
+            del self._calls[key]
+
+
+shared_reads = SingleFlight()
@@ -0,0 +1,86 @@
+import asyncio
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+
+class RequestTimings:
+    """
+    Time spent by the request per span name. Nested spans with the same name are counted once,
+    spans with different names may overlap, e.g. auth includes db time of loading the user.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.totals: Dict[str, float] = {}
+        self._depth: Dict[str, int] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.totals[name] = self.totals.get(name, 0) + seconds
+
+    @contextmanager
+    def span(self, name: str):
+        depth = self._depth.get(name, 0)
+        self._depth[name] = depth + 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._depth[name] = depth
+            if depth == 0:
+                self.add(name, time.perf_counter() - start)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+
+request_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def span(name: str):
+    """
+    Adds time of the block to the span of the current request, does nothing outside a request
+    """
+    timings = request_timings.get()
+    if timings is None:
+        yield
+        return
+    with timings.span(name):
+        yield
+
+
+def add_timing(name: str, seconds: float) -> None:
+    timings = request_timings.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+def timed(name: str):
+    """
+    Decorator adding time of the function call to the span of the current request
+    """
+
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with span(name):
+                    return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def format_server_timing(totals: Dict[str, float]) -> str:
+    """
+    :return: value of the Server-Timing header with durations in milliseconds
+    """
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in totals.items())
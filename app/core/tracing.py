@@ -0,0 +1,241 @@
+import asyncio
+import functools
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from abc import ABCMeta, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, List
+
+import httpx
+import structlog
+
+logger = structlog.get_logger("tracing")
+
+
+def new_id(size: int = 16) -> str:
+    return uuid.uuid4().hex[:size]
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "end", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None, attributes: Optional[dict] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = new_id()
+        self.parent_id = parent_id
+        self.start = time.time_ns()
+        self.end: Optional[int] = None
+        self.attributes = attributes or {}
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        """
+        :return: span in the OTLP JSON layout
+        """
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "startTimeUnixNano": self.start,
+            "endTimeUnixNano": self.end,
+            "attributes": [
+                {"key": key, "value": {"stringValue": str(value)}} for key, value in self.attributes.items()
+            ],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+
+
+class SpanExporter(metaclass=ABCMeta):
+
+    @abstractmethod
+    def export(self, spans: List[dict]) -> None:
+        """
+        :param spans: finished spans in the OTLP JSON layout
+        """
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class FileSpanExporter(SpanExporter):
+    """
+    Appends spans to the file, one json per line
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: List[dict]) -> None:
+        with open(self.path, "a") as f:
+            f.writelines(json.dumps(x) + "\n" for x in spans)
+
+
+class HttpSpanExporter(SpanExporter):
+    """
+    Posts spans to the OTLP/HTTP JSON endpoint of a collector, e.g. http://collector:4318/v1/traces
+    """
+
+    def __init__(self, url: str, service_name: str, timeout: float = 5):
+        self.url = url
+        self.service_name = service_name
+        self._client = httpx.Client(timeout=timeout)
+
+    def export(self, spans: List[dict]) -> None:
+        response = self._client.post(self.url, json={"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+            "scopeSpans": [{"scope": {"name": "app"}, "spans": spans}],
+        }]})
+        response.raise_for_status()
+
+    def close(self) -> None:
+        self._client.close()
+
+
+class Tracer:
+    """
+    Finished spans are put to a bounded queue and exported in batches by a background thread.
+    Spans are dropped when the queue is full. Without exporter spans are not recorded at all.
+    """
+
+    def __init__(self):
+        self.exporter: Optional[SpanExporter] = None
+        self.dropped = 0
+        self._queue: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._batch_size = 512
+        self._interval = 1.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def start(self, exporter: SpanExporter, queue_size: int = 10000, batch_size: int = 512, interval: float = 1):
+        self.shutdown()
+        self.exporter = exporter
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._batch_size = batch_size
+        self._interval = interval
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def shutdown(self) -> None:
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self.exporter.close()
+        self.exporter = None
+        self._thread = None
+
+    def finish(self, span: Span) -> None:
+        span.end = time.time_ns()
+        try:
+            self._queue.put_nowait(span.to_dict())
+        except (queue.Full, AttributeError):
+            self.dropped += 1
+
+    def _run(self) -> None:
+        stopped = False
+        while not stopped:
+            batch = []
+            deadline = time.monotonic() + self._interval
+            while len(batch) < self._batch_size:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopped = True
+                    break
+                batch.append(item)
+            if batch:
+                try:
+                    self.exporter.export(batch)
+                except Exception as e:
+                    logger.error("Spans export failed", count=len(batch), error=str(e))
+
+
+tracer = Tracer()
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def get_current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Records the block as a child of the current span, or as the root span of a new trace
+    """
+    if not tracer.enabled:
+        yield None
+        return
+    parent = _current_span.get()
+    current = Span(
+        name,
+        trace_id=parent.trace_id if parent else new_id(32),
+        parent_id=parent.span_id if parent else None,
+        attributes=attributes,
+    )
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = repr(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        tracer.finish(current)
+
+
+# Calls of external services issued within the current context, used by round trip budgets in tests
+outbound_log: ContextVar[Optional[List[str]]] = ContextVar("outbound_log", default=None)
+
+
+def _log_outbound(name: str) -> None:
+    log = outbound_log.get()
+    if log is not None:
+        log.append(name)
+
+
+def traced(name: str, outbound: bool = False):
+    """
+    Decorator recording calls of the function as spans
+    :param outbound: the function calls an external service
+    """
+
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                if outbound:
+                    _log_outbound(name)
+                with span(name, kind="client" if outbound else "internal"):
+                    return await func(*args, **kwargs)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if outbound:
+                    _log_outbound(name)
+                with span(name, kind="client" if outbound else "internal"):
+                    return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def start_tracing(file: Optional[str], url: Optional[str], service_name: str) -> None:
+    if url:
+        tracer.start(HttpSpanExporter(url, service_name=service_name))
+    elif file:
+        os.makedirs(os.path.dirname(os.path.abspath(file)), exist_ok=True)
+        tracer.start(FileSpanExporter(file))
@@ -0,0 +1,106 @@
+import copy
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+import structlog
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import UpdateOne, UpdateMany
+
+from app.core.db_monitoring import repository_operation
+from app.core.single_flight import shared_reads
+
+logger = structlog.get_logger("unit_of_work")
+
+
+class UnitOfWork:
+    """
+    Identity map of documents loaded within a request and writes deferred until the response starts.
+
+    Repositories of the request share the identity map, so the same document is read from Mongo once.
+    Deferred writes are sent together with one bulk_write per collection on flush, before any read
+    of the repositories and before the response. After the request is finished, writes are sent immediately.
+    :param enabled: disabled for repositories created outside of requests, nothing is cached or deferred
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._documents: Dict[Tuple[str, str], dict] = {}
+        self._pending: Dict[str, Tuple[AsyncIOMotorCollection, List]] = {}
+
+    @property
+    def has_pending(self) -> bool:
+        return bool(self._pending)
+
+    def get(self, collection: str, document_id) -> Optional[dict]:
+        return self._documents.get((collection, str(document_id)))
+
+    def remember(self, collection: str, document: Optional[dict]) -> Optional[dict]:
+        """
+        Puts the full document read or written by the request to the identity map
+        :return: the same document
+        """
+        if self.enabled and document is not None:
+            self._documents[(collection, str(document["_id"]))] = document
+        return document
+
+    def forget(self, collection: str, query: dict) -> None:
+        """
+        Drops documents the write of the query may change: the ones listed by _id,
+        all documents of the collection for other queries
+        """
+        document_ids = query.get("_id") if set(query) == {"_id"} else None
+        if isinstance(document_ids, dict):
+            document_ids = document_ids.get("$in") if set(document_ids) == {"$in"} else None
+        elif document_ids is not None:
+            document_ids = [document_ids]
+        if document_ids is None:
+            keys = [k for k in self._documents if k[0] == collection]
+        else:
+            keys = [(collection, str(x)) for x in document_ids]
+        for key in keys:
+            self._documents.pop(key, None)
+
+    async def defer(self, db: AsyncIOMotorCollection, filter: dict, update: dict, many: bool = False) -> None:
+        """
+        Queues the update whose result the caller does not need, the caller drops updated documents
+        from the identity map. The filter and the update are copied, later changes of the caller's dicts
+        do not affect the queued write
+        :param many: update all matched documents, the first one by default
+        """
+        filter, update = copy.deepcopy(filter), copy.deepcopy(update)
+        request = UpdateMany(filter, update) if many else UpdateOne(filter, update)
+        if not self.enabled:
+            shared_reads.forget(db.full_name)
+            await db.bulk_write([request])
+            return
+        self._pending.setdefault(db.name, (db, []))[1].append(request)
+
+    @repository_operation("UnitOfWork.flush")
+    async def flush(self) -> None:
+        pending, self._pending = self._pending, {}
+        for db, requests in pending.values():
+            shared_reads.forget(db.full_name)
+            await db.bulk_write(requests, ordered=True)
+
+    async def close(self, commit: bool) -> None:
+        """
+        Flushes or discards deferred writes, then writes of background tasks are sent immediately
+        :param commit: whether the request succeeded
+        """
+        if commit:
+            await self.flush()
+        elif self._pending:
+            logger.warning("Deferred writes discarded", count=sum(len(x[1]) for x in self._pending.values()))
+            self._pending = {}
+        self.enabled = False
+        self._documents.clear()
+
+
+current_unit_of_work: ContextVar[Optional[UnitOfWork]] = ContextVar("current_unit_of_work", default=None)
+
+
+def get_unit_of_work() -> UnitOfWork:
+    """
+    :return: unit of work of the current request
+    """
+    return current_unit_of_work.get() or UnitOfWork(enabled=False)
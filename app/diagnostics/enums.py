@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class StatisticsGroup(str, Enum):
+    filename = "filename"
+    lineno = "lineno"
+    traceback = "traceback"
@@ -0,0 +1,31 @@
+from starlette import status
+
+from app.core.exception.base import AppBaseException, ErrorDescription
+from app.core.exception.error_codes import diagnostics_disabled, memory_snapshot_not_found
+
+
+class StackSamplerDisabled(AppBaseException):
+    _status_code = status.HTTP_404_NOT_FOUND
+    _code = diagnostics_disabled
+    _description = ErrorDescription(
+        en="Stack sampler is disabled",
+        ru="Сэмплирование стеков выключено",
+    )
+
+
+class MemoryTracingNotStarted(AppBaseException):
+    _status_code = status.HTTP_409_CONFLICT
+    _code = diagnostics_disabled
+    _description = ErrorDescription(
+        en="Memory tracing is not started",
+        ru="Трассировка памяти не запущена",
+    )
+
+
+class MemorySnapshotNotFound(AppBaseException):
+    _status_code = status.HTTP_404_NOT_FOUND
+    _code = memory_snapshot_not_found
+    _description = ErrorDescription(
+        en="Memory snapshot not found",
+        ru="Снимок памяти не найден",
+    )
@@ -0,0 +1,102 @@
+import gc
+import tracemalloc
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+from app.diagnostics.enums import StatisticsGroup
+
+_IGNORED_FILES = (tracemalloc.__file__, "<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>")
+
+
+class MemoryTracer:
+    """
+    Starts and stops tracemalloc and keeps the last `max_snapshots` snapshots for comparison
+    """
+
+    def __init__(self, max_snapshots: int = 5):
+        self.max_snapshots = max_snapshots
+        self._snapshots: "OrderedDict[int, tracemalloc.Snapshot]" = OrderedDict()
+        self._last_id = 0
+
+    @property
+    def is_tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 1) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+        self._snapshots.clear()
+
+    def take_snapshot(self) -> int:
+        """
+        :return: id of the snapshot
+        """
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, filename) for filename in _IGNORED_FILES]
+        )
+        self._last_id += 1
+        self._snapshots[self._last_id] = snapshot
+        while len(self._snapshots) > self.max_snapshots:
+            self._snapshots.popitem(last=False)
+        return self._last_id
+
+    def get_snapshot(self, snapshot_id: int) -> Optional[tracemalloc.Snapshot]:
+        return self._snapshots.get(snapshot_id)
+
+    @staticmethod
+    def top(snapshot: tracemalloc.Snapshot, group_by: StatisticsGroup, limit: int) -> List[dict]:
+        return [
+            {
+                "location": _format_traceback(stat.traceback),
+                "size": stat.size,
+                "count": stat.count,
+            }
+            for stat in snapshot.statistics(group_by.value)[:limit]
+        ]
+
+    @staticmethod
+    def diff(
+            old: tracemalloc.Snapshot,
+            new: tracemalloc.Snapshot,
+            group_by: StatisticsGroup,
+            limit: int,
+    ) -> List[dict]:
+        """
+        :return: allocations grown the most from the old snapshot to the new one
+        """
+        return [
+            {
+                "location": _format_traceback(stat.traceback),
+                "size": stat.size,
+                "size_diff": stat.size_diff,
+                "count": stat.count,
+                "count_diff": stat.count_diff,
+            }
+            for stat in new.compare_to(old, group_by.value)[:limit]
+        ]
+
+
+def _format_traceback(traceback: tracemalloc.Traceback) -> str:
+    return " <- ".join(f"{frame.filename}:{frame.lineno}" for frame in traceback)
+
+
+def count_models() -> Dict[str, int]:
+    """
+    :return: count of live pydantic model instances per class, descending
+    """
+    counts: Dict[str, int] = {}
+    for obj in gc.get_objects():
+        # type() instead of isinstance, which reads __class__ and may trigger lazy proxies
+        cls = type(obj)
+        if issubclass(cls, BaseModel):
+            name = f"{cls.__module__}.{cls.__qualname__}"
+            counts[name] = counts.get(name, 0) + 1
+    return dict(sorted(counts.items(), key=lambda x: x[1], reverse=True))
+
+
+memory_tracer = MemoryTracer()
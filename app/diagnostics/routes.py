@@ -0,0 +1,99 @@
+import tracemalloc
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import PlainTextResponse
+
+from app.core import sampler
+from app.core.security import get_api_key
+from app.diagnostics.enums import StatisticsGroup
+from app.diagnostics.exceptions import StackSamplerDisabled, MemoryTracingNotStarted, MemorySnapshotNotFound
+from app.diagnostics.memory import memory_tracer, count_models
+from app.diagnostics.schemas import MemoryTracingResponse, MemorySnapshotResponse, MemoryStatsResponse, \
+    ModelCountsResponse
+
+diagnostics_router = APIRouter(tags=['diagnostics'], prefix="/service", dependencies=[Depends(get_api_key)])
+
+
+@diagnostics_router.get(path="/profile/stacks", response_class=PlainTextResponse)
+async def get_profile_stacks(reset: bool = False):
+    """
+    Stacks sampled since start or the last reset in the collapsed format of flamegraph tools
+    """
+    if sampler.stack_sampler is None:
+        raise StackSamplerDisabled()
+    return PlainTextResponse(
+        content=sampler.stack_sampler.collapsed(reset=reset),
+        headers={"x-sampler-overhead": f"{sampler.stack_sampler.overhead:.4f}"},
+    )
+
+
+def _get_tracing_response() -> MemoryTracingResponse:
+    if not memory_tracer.is_tracing:
+        return MemoryTracingResponse(tracing=False)
+    traced_memory, peak_memory = tracemalloc.get_traced_memory()
+    return MemoryTracingResponse(tracing=True, traced_memory=traced_memory, peak_memory=peak_memory)
+
+
+@diagnostics_router.get(path="/memory/tracing", response_model=MemoryTracingResponse)
+async def get_memory_tracing():
+    return _get_tracing_response()
+
+
+@diagnostics_router.post(path="/memory/tracing/start", response_model=MemoryTracingResponse)
+async def start_memory_tracing(frames: int = Query(1, ge=1, le=50)):
+    memory_tracer.start(frames)
+    return _get_tracing_response()
+
+
+@diagnostics_router.post(path="/memory/tracing/stop", response_model=MemoryTracingResponse)
+async def stop_memory_tracing():
+    memory_tracer.stop()
+    return _get_tracing_response()
+
+
+@diagnostics_router.post(path="/memory/snapshots", response_model=MemorySnapshotResponse)
+def take_memory_snapshot():
+    if not memory_tracer.is_tracing:
+        raise MemoryTracingNotStarted()
+    return MemorySnapshotResponse(id=memory_tracer.take_snapshot())
+
+
+@diagnostics_router.get(
+    path="/memory/snapshots/{snapshot_id}",
+    response_model=MemoryStatsResponse,
+    response_model_exclude_none=True,
+)
+def get_memory_snapshot(
+        snapshot_id: int,
+        group_by: StatisticsGroup = StatisticsGroup.lineno,
+        limit: int = Query(20, ge=1, le=1000),
+):
+    snapshot = memory_tracer.get_snapshot(snapshot_id)
+    if snapshot is None:
+        raise MemorySnapshotNotFound()
+    return MemoryStatsResponse(items=memory_tracer.top(snapshot, group_by=group_by, limit=limit))
+
+
+@diagnostics_router.get(
+    path="/memory/snapshots/{snapshot_id}/diff/{old_snapshot_id}",
+    response_model=MemoryStatsResponse,
+)
+def get_memory_snapshots_diff(
+        snapshot_id: int,
+        old_snapshot_id: int,
+        group_by: StatisticsGroup = StatisticsGroup.lineno,
+        limit: int = Query(20, ge=1, le=1000),
+):
+    snapshot = memory_tracer.get_snapshot(snapshot_id)
+    old_snapshot = memory_tracer.get_snapshot(old_snapshot_id)
+    if snapshot is None or old_snapshot is None:
+        raise MemorySnapshotNotFound()
+    return MemoryStatsResponse(items=memory_tracer.diff(old_snapshot, snapshot, group_by=group_by, limit=limit))
+
+
+@diagnostics_router.get(path="/memory/models", response_model=ModelCountsResponse)
+def get_model_counts():
+    """
+    Live pydantic model instances per class, walks all objects tracked by gc
+    """
+    return ModelCountsResponse(items=count_models())
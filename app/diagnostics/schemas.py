@@ -0,0 +1,29 @@
+from typing import Optional, List, Dict
+
+from pydantic import BaseModel
+
+
+class MemoryTracingResponse(BaseModel):
+    tracing: bool
+    traced_memory: Optional[int]
+    peak_memory: Optional[int]
+
+
+class MemorySnapshotResponse(BaseModel):
+    id: int
+
+
+class MemoryStatResponse(BaseModel):
+    location: str
+    size: int
+    count: int
+    size_diff: Optional[int]
+    count_diff: Optional[int]
+
+
+class MemoryStatsResponse(BaseModel):
+    items: List[MemoryStatResponse]
+
+
+class ModelCountsResponse(BaseModel):
+    items: Dict[str, int]
@@ -0,0 +1,58 @@
+import time
+from typing import Dict, Optional, Tuple
+
+from app.core.metrics import CACHE_REQUESTS
+from app.settings import settings
+
+
+class PublishedOrdersCache:
+    """
+    Per-worker cache of rendered pages of the published orders feed.
+    Only pages within the first `depth` orders are cached. Other workers are not
+    notified about invalidation, so `ttl` bounds staleness across workers.
+    """
+
+    def __init__(self, ttl: float, depth: int):
+        self._ttl = ttl
+        self._depth = depth
+        self._pages: Dict[Tuple[int, int], Tuple[float, str, str]] = {}
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def is_cacheable(self, offset: int, limit: int) -> bool:
+        return self._ttl > 0 and offset + limit <= self._depth
+
+    def get(self, offset: int, limit: int) -> Optional[Tuple[str, str]]:
+        """
+        :return: rendered page and its entity tag
+        """
+        if not self.is_cacheable(offset, limit):
+            return None
+        page = self._pages.get((offset, limit))
+        if page is None or page[0] < time.monotonic():
+            CACHE_REQUESTS.inc(cache="published_orders", result="miss")
+            return None
+        CACHE_REQUESTS.inc(cache="published_orders", result="hit")
+        return page[1], page[2]
+
+    def set(self, offset: int, limit: int, content: str, etag: str, generation: int) -> None:
+        """
+        :param generation: value of `generation` taken before the page was read from database,
+        the page is dropped if the cache was invalidated in the meantime
+        """
+        if generation != self._generation or not self.is_cacheable(offset, limit):
+            return
+        self._pages[(offset, limit)] = (time.monotonic() + self._ttl, content, etag)
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._pages.clear()
+
+
+published_orders_cache = PublishedOrdersCache(
+    ttl=settings.PUBLISHED_ORDERS_CACHE_TTL,
+    depth=settings.PUBLISHED_ORDERS_CACHE_DEPTH,
+)
@@ -20,3 +20,14 @@ class VulnerabilityStatus(str, Enum):
 class FileType(str, Enum):
     img = "image"
     doc = "document"
+
+
+class DocumentPart(str, Enum):
+    input = "input"
+    result = "result"
+
+
+class OrderAction(str, Enum):
+    cancel = "cancel"
+    confirm = "confirm"
+    complete = "complete"
@@ -2,7 +2,7 @@ from starlette import status
 
 from app.core.exception.base import AppBaseException, ErrorDescription
 from app.core.exception.error_codes import invalid_file_size, invalid_file_extension, s3_client_error, order_not_found, \
-    order_wrong_operation_by_status
+    order_wrong_operation_by_status, unknown_order_fields
 
 
 class FileSizeIsNotAllow(AppBaseException):
@@ -48,3 +48,12 @@ class OrderOperationWrongSatus(AppBaseException):
         en="This operation prohibited for orders in this status",
         ru="Для заказов в текущем статусе данная операция запрещена",
     )
+
+
+class OrderFieldsUnknown(AppBaseException):
+    _status_code = status.HTTP_400_BAD_REQUEST
+    _code = unknown_order_fields
+    _description = ErrorDescription(
+        en="Unknown fields requested, allowed: id, name, description, status, rating, customer, expert, document",
+        ru="Запрошены неизвестные поля, допустимые: id, name, description, status, rating, customer, expert, document",
+    )
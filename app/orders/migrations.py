@@ -0,0 +1,93 @@
+"""
+Migrations of orders written by earlier versions:
+
+    python -m app.orders.migrations
+
+assign_order_sequence gives seq values to orders created before delta sync, oldest first,
+so the first sync of clients returns them. split_order_documents moves OCR texts and image lists
+inlined in orders to order_documents. Orders are updated in batches and the migrations
+can be interrupted and rerun.
+"""
+import asyncio
+
+from pymongo import UpdateOne
+
+from app.core.database import AsyncIOMotorClient, create_client
+from app.core.enums import Collection
+from app.orders.enums import DocumentPart
+from app.orders.repositories.document import check_text_compression, encode_text
+from app.orders.repositories.order import OrderRepository
+from app.settings import settings
+
+INLINE_FIELDS = ["document.text"] + [f"document.{part.value}.images" for part in DocumentPart]
+
+
+async def assign_order_sequence(db: AsyncIOMotorClient, batch_size: int = 500) -> int:
+    """
+    :return: number of orders that got seq
+    """
+    orders = db[Collection.ORDERS.value]
+    repository = OrderRepository(db)
+    assigned = 0
+    while True:
+        cursor = orders.find({"seq": {"$exists": False}}, {"_id": 1}, sort=[("_id", 1)], limit=batch_size)
+        order_ids = [x["_id"] async for x in cursor]
+        if not order_ids:
+            return assigned
+        assigned += await repository.update_orders([(x, {}) for x in order_ids])
+
+
+async def split_order_documents(db: AsyncIOMotorClient, batch_size: int = 500) -> int:
+    """
+    :return: number of moved orders
+    """
+    orders = db[Collection.ORDERS.value]
+    documents = db[Collection.ORDER_DOCUMENTS.value]
+    repository = OrderRepository(db)
+    inline = {"$or": [{field: {"$exists": True}} for field in INLINE_FIELDS]}
+    moved = 0
+    while True:
+        rows = await orders.find(inline, {"document": 1}, limit=batch_size).to_list(length=batch_size)
+        if not rows:
+            return moved
+        document_requests, order_updates = [], []
+        for row in rows:
+            document = row["document"]
+            moved_fields, summary = {}, {}
+            if document.get("text") is not None:
+                moved_fields.update(encode_text(document["text"], settings.ORDER_TEXT_COMPRESSION))
+                summary["document.has_text"] = True
+            for part in DocumentPart:
+                images = (document.get(part.value) or {}).get("images")
+                if images is not None:
+                    moved_fields[f"{part.value}.images"] = images
+                    summary[f"document.{part.value}.images_count"] = len(images)
+            if moved_fields:
+                document_requests.append(UpdateOne({"_id": row["_id"]}, {"$set": moved_fields}, upsert=True))
+            update = {"$unset": dict.fromkeys(INLINE_FIELDS, "")}
+            if summary:
+                update["$set"] = summary
+            order_updates.append((row["_id"], update))
+        # documents go first, an interrupted batch is moved again by the next run.
+        # Summary fields are a part of OrderResponse, the orders get new seq for delta sync clients
+        if document_requests:
+            await documents.bulk_write(document_requests, ordered=False)
+        await repository.update_orders(order_updates)
+        moved += len(rows)
+
+
+async def main() -> None:
+    check_text_compression()
+    client = create_client(settings.STORAGE_BACKEND, settings.MONGO_URL)
+    db = client[settings.MONGO_INITDB_DATABASE]
+    try:
+        assigned = await assign_order_sequence(db)
+        moved = await split_order_documents(db)
+    finally:
+        client.close()
+    print(f"Assigned seq to {assigned} orders")
+    print(f"Moved documents of {moved} orders")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -8,14 +8,17 @@ from app.orders.enums import OrderStatus, VulnerabilityStatus
 
 class DocumentContent(BaseModel):
     file: Optional[str]
-    images: List[str] = []
+    images_count: int = 0
 
 
 class Document(BaseModel):
-    text: Optional[str]
+    """
+    Fixed-size summary of the order document, text and images are kept in OrderDocument
+    """
     input: Optional[DocumentContent]
     result: Optional[DocumentContent]
     vulnerability: VulnerabilityStatus = VulnerabilityStatus.unknown
+    has_text: bool = False
 
 
 class Order(BaseModel):
@@ -27,3 +30,18 @@ class Order(BaseModel):
     name: str
     description: Optional[str]
     document: Optional[Document]
+    seq: Optional[int]
+
+
+class DocumentFiles(BaseModel):
+    images: List[str] = []
+
+
+class OrderDocument(BaseModel):
+    """
+    OCR text and image manifests of an order document, stored apart from the order with the same id
+    """
+    id: PydanticObjectId = Field(None, alias="_id")
+    text: Optional[str]
+    input: DocumentFiles = DocumentFiles()
+    result: DocumentFiles = DocumentFiles()
@@ -0,0 +1,78 @@
+from typing import Optional
+
+from bson import Binary, ObjectId
+
+from app.core.enums import Collection
+from app.core.repository import BaseRepository
+from app.orders.enums import DocumentPart
+from app.orders.models import OrderDocument
+from app.settings import settings
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+ZSTD_ENCODING = "zstd"
+# shorter texts are stored as is, compression does not pay off
+COMPRESSION_MIN_LENGTH = 1024
+
+
+def check_text_compression() -> None:
+    """
+    Called on startup, so texts are not stored uncompressed silently
+    :raise RuntimeError: ORDER_TEXT_COMPRESSION is on and zstandard is not installed
+    """
+    if settings.ORDER_TEXT_COMPRESSION and zstandard is None:
+        raise RuntimeError("ORDER_TEXT_COMPRESSION requires zstandard, install with poetry install -E compression")
+
+
+def encode_text(text: str, compress: bool) -> dict:
+    """
+    :return: fields of the stored text, compressed with zstd if compress and zstandard is installed
+    """
+    data = text.encode()
+    if not compress or zstandard is None or len(data) < COMPRESSION_MIN_LENGTH:
+        return {"text": text, "text_encoding": None}
+    return {"text": Binary(zstandard.ZstdCompressor().compress(data)), "text_encoding": ZSTD_ENCODING}
+
+
+def decode_text(row: dict) -> Optional[str]:
+    if row.get("text_encoding") == ZSTD_ENCODING:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read compressed order texts")
+        return zstandard.ZstdDecompressor().decompress(row["text"]).decode()
+    return row.get("text")
+
+
+class OrderDocumentRepository(BaseRepository):
+    """
+    Text and image manifests of order documents, read only by the document detail endpoint,
+    so orders stay small however many images are uploaded
+    """
+    collection_name: Collection = Collection.ORDER_DOCUMENTS
+
+    async def get_document(self, order_id: str) -> OrderDocument:
+        """
+        :return: document of the order, empty if nothing was uploaded
+        """
+        row = await self._find_by_id(order_id)
+        if not row:
+            return OrderDocument(_id=ObjectId(order_id))
+        return OrderDocument(**{**row, "text": decode_text(row)})
+
+    async def add_image(self, order_id: str, part: DocumentPart, link: str) -> None:
+        self._forget({"_id": ObjectId(order_id)})
+        await self._db.update_one(
+            {"_id": ObjectId(order_id)},
+            {"$push": {f"{part.value}.images": link}},
+            upsert=True,
+        )
+
+    async def set_text(self, order_id: str, text: str) -> None:
+        self._forget({"_id": ObjectId(order_id)})
+        await self._db.update_one(
+            {"_id": ObjectId(order_id)},
+            {"$set": encode_text(text, settings.ORDER_TEXT_COMPRESSION)},
+            upsert=True,
+        )
@@ -1,109 +1,330 @@
-from typing import List, Optional
+from typing import List, Optional, Iterable, Tuple
 
 from bson import ObjectId
+from fastapi import Depends
+from pymongo import IndexModel, ASCENDING, ReturnDocument, UpdateOne
 
-from app.core.database import PydanticObjectId
+from app.core.database import AsyncIOMotorClient, get_database
 from app.core.enums import Collection
 from app.core.repository import BaseRepository
-from app.orders.enums import OrderStatus, FileType
+from app.core.unit_of_work import UnitOfWork, get_unit_of_work
+from app.orders.cache import published_orders_cache
+from app.orders.enums import OrderStatus, FileType, DocumentPart
 from app.orders.models import Order
-from app.orders.schemas import CreateOrderDTO, FileInfoDTO
+from app.orders.repositories.document import OrderDocumentRepository
+from app.orders.schemas import CreateOrderDTO, FileInfoDTO, ORDER_RESPONSE_FIELDS
 from app.users.models import User
 
+BULK_WRITE_BATCH_SIZE = 1000
+
 
 class OrderRepository(BaseRepository):
     collection_name: Collection = Collection.ORDERS
+    indexes = [
+        IndexModel([("customer", ASCENDING), ("seq", ASCENDING)]),
+        IndexModel([("expert", ASCENDING), ("seq", ASCENDING)]),
+    ]
+    # Order fields read for each field of OrderResponse, fields are listed so that orders
+    # not moved by split_order_documents yet do not bring inline text and images
+    response_projections = {
+        "name": ["name"],
+        "description": ["description"],
+        "status": ["status"],
+        "rating": ["rating"],
+        "customer": ["customer"],
+        "expert": ["expert"],
+        "document": [
+            "document.input.file",
+            "document.input.images_count",
+            "document.result.file",
+            "document.result.images_count",
+            "document.vulnerability",
+            "document.has_text",
+        ],
+    }
+    # Fields required by Order and seq of sync tokens
+    required_fields = ["customer", "name", "seq"]
+
+    def __init__(
+            self,
+            db: AsyncIOMotorClient = Depends(get_database),
+            unit_of_work: UnitOfWork = Depends(get_unit_of_work),
+    ):
+        super().__init__(db, unit_of_work)
+        self._documents = OrderDocumentRepository(db, self._unit_of_work)
+
+    @classmethod
+    def get_projection(cls, fields: Optional[Iterable[str]] = None) -> dict:
+        """
+        :param fields: fields of OrderResponse, all of them by default
+        :return: Mongo projection of the orders read for the response
+        """
+        projection = dict.fromkeys(cls.required_fields, 1)
+        for field in ORDER_RESPONSE_FIELDS if fields is None else fields:
+            projection.update(dict.fromkeys(cls.response_projections.get(field, []), 1))
+        return projection
+
+    async def _update_order(self, order_id: str, update: dict) -> Optional[Order]:
+        async with self._sequence() as seq:
+            update.setdefault("$set", {})["seq"] = seq
+            self._forget()
+            order = self._remember(await self._db.find_one_and_update(
+                {"_id": ObjectId(order_id)},
+                update,
+                return_document=ReturnDocument.AFTER,
+            ))
+        if not order:
+            return None
+        order = Order(**order)
+        if order.status == OrderStatus.published or "status" in update["$set"]:
+            published_orders_cache.invalidate()
+        return order
+
+    async def _get_orders_versions(self, conditions: dict, limit: int, offset: int) -> (int, List[dict]):
+        """
+        Reads the page with the same pipeline as the full read, but projected to the fields
+        a response version depends on, and the total count in one round trip
+        :return: total count and rows with _id, seq, customer and expert of orders in the page
+        """
+        result = await self._db.aggregate([
+            {"$match": conditions},
+            {"$facet": {
+                "items": [
+                    {"$skip": offset},
+                    {"$limit": limit},
+                    {"$project": {"seq": 1, "customer": 1, "expert": 1}},
+                ],
+                "total": [{"$count": "value"}],
+            }},
+        ]).to_list(length=1)
+        total = result[0]["total"][0]["value"] if result[0]["total"] else 0
+        return total, result[0]["items"]
+
+    @staticmethod
+    def _published_orders_conditions() -> dict:
+        return {"status": OrderStatus.published}
+
+    @staticmethod
+    def _self_orders_conditions(user: User, statuses: List[OrderStatus]) -> dict:
+        conditions = {"$or": [
+            {"customer": str(user.id)},
+            {"expert": str(user.id)},
+        ]}
+        if statuses:
+            conditions["status"] = {"$in": statuses}
+        return conditions
 
     async def get_order_by_id(self, order_id: str) -> Optional[Order]:
-        order = await self._db.find_one({"_id": ObjectId(order_id)})
+        order = await self._find_by_id(order_id)
         return Order(**order) if order else None
 
+    async def get_orders_by_ids(self, order_ids: List[str]) -> List[Order]:
+        """
+        :return: found orders without document, invalid ids are skipped
+        """
+        cursor = self._db.find(
+            {"_id": {"$in": [ObjectId(x) for x in order_ids if ObjectId.is_valid(x)]}},
+            {"document": 0},
+        )
+        return [Order(**x) async for x in cursor]
+
     async def get_published_orders(
             self,
             limit: int,
             offset: int,
+            fields: Optional[Iterable[str]] = None,
     ) -> (int, List[Order]):
+        """
+        :param fields: fields of OrderResponse to read, all of them by default
+        """
+        conditions = self._published_orders_conditions()
         cursor = self._db.aggregate([
-            {"$match": {"status": OrderStatus.published}},
+            {"$match": conditions},
             {"$skip": offset},
             {"$limit": limit},
+            {"$project": self.get_projection(fields)},
         ])
         orders = [Order(**x) async for x in cursor]
-        total = await self._db.count_documents({})
+        total = await self._db.count_documents(conditions)
         return total, orders
 
+    async def get_published_orders_versions(
+            self,
+            limit: int,
+            offset: int,
+    ) -> (int, List[dict]):
+        return await self._get_orders_versions(self._published_orders_conditions(), limit=limit, offset=offset)
+
     async def get_self_orders(
             self,
             user: User,
             limit: int,
             offset: int,
             statuses: List[OrderStatus],
+            fields: Optional[Iterable[str]] = None,
     ) -> (int, List[Order]):
-        conditions = {"$or": [
-            {"customer": str(user.id)},
-            {"expert": str(user.id)},
-        ]}
-        if statuses:
-            conditions["status"] = {"$in": statuses}
+        """
+        :param fields: fields of OrderResponse to read, all of them by default
+        """
+        conditions = self._self_orders_conditions(user=user, statuses=statuses)
         cursor = self._db.aggregate([
             {"$match": conditions},
             {"$skip": offset},
             {"$limit": limit},
+            {"$project": self.get_projection(fields)},
         ])
         orders = [Order(**x) async for x in cursor]
         total = await self._db.count_documents(conditions)
         return total, orders
 
+    async def get_self_orders_versions(
+            self,
+            user: User,
+            limit: int,
+            offset: int,
+            statuses: List[OrderStatus],
+    ) -> (int, List[dict]):
+        return await self._get_orders_versions(
+            self._self_orders_conditions(user=user, statuses=statuses),
+            limit=limit,
+            offset=offset,
+        )
+
+    async def get_changed_orders(
+            self,
+            user: User,
+            since: int,
+            limit: int,
+            fields: Optional[Iterable[str]] = None,
+    ) -> List[Order]:
+        """
+        :param user: customer or expert of the orders
+        :param since: sync token, the last seq the client has seen
+        :param limit: max count of returned orders
+        :param fields: fields of OrderResponse to read, all of them by default
+        :return: orders created or updated after since, ordered by seq. Orders after a seq
+            still being written are left for the next sync, so the client token never passes it
+        """
+        watermark = await self._sequence_watermark()
+        cursor = self._db.find(
+            {
+                "$or": [
+                    {"customer": str(user.id)},
+                    {"expert": str(user.id)},
+                ],
+                "seq": {"$gt": since, "$lt": watermark},
+            },
+            self.get_projection(fields),
+            sort=[("seq", ASCENDING)],
+            limit=limit,
+        )
+        return [Order(**x) async for x in cursor]
+
     async def create_order(self, order: CreateOrderDTO, user: User) -> Order:
-        insert_result = await self._db.insert_one(
-            Order(
+        async with self._sequence() as seq:
+            order_row = Order(
                 customer=str(user.id),
                 name=order.name,
-                description=order.description
+                description=order.description,
+                seq=seq,
             ).dict(exclude_none=True)
-        )
-        inserted_order = await self._db.find_one({"_id": insert_result.inserted_id})
-        return Order(**inserted_order)
+            self._forget()
+            await self._db.insert_one(order_row)
+        return Order(**self._remember(order_row))
 
     async def change_oder_status(self, order_id: str, status: OrderStatus) -> Order:
-        await self._db.update_one({"_id": ObjectId(order_id)}, {"$set": {"status": status}})
-        return Order(**await self._db.find_one({"_id": ObjectId(order_id)}))
+        return await self._update_order(order_id, {"$set": {"status": status}})
+
+    async def bulk_change_status(self, orders: List[Order], status: OrderStatus) -> List[str]:
+        """
+        Changes status of orders with one bulk_write per BULK_WRITE_BATCH_SIZE orders.
+        Every update is guarded by the status the order had when it was read,
+        so an order changed concurrently is left untouched
+        :return: ids of updated orders
+        """
+        if not orders:
+            return []
+        self._forget({"_id": {"$in": [ObjectId(order.id) for order in orders]}})
+        matched_count = 0
+        async with self._sequence(count=len(orders)) as seq:
+            requests = [
+                UpdateOne(
+                    {"_id": ObjectId(order.id), "status": order.status},
+                    {"$set": {"status": status, "seq": seq + i}},
+                )
+                for i, order in enumerate(orders)
+            ]
+            for start in range(0, len(requests), BULK_WRITE_BATCH_SIZE):
+                result = await self._db.bulk_write(requests[start:start + BULK_WRITE_BATCH_SIZE], ordered=False)
+                matched_count += result.matched_count
+        published_orders_cache.invalidate()
+
+        if matched_count == len(orders):
+            return [str(order.id) for order in orders]
+        cursor = self._db.find(
+            {
+                "_id": {"$in": [ObjectId(order.id) for order in orders]},
+                "status": status,
+                "seq": {"$gte": seq},
+            },
+            {"_id": 1},
+        )
+        return [str(x["_id"]) async for x in cursor]
+
+    async def change_customer(self, customer_ids: List[str], customer_id: str) -> int:
+        """
+        Moves orders of the customers to another customer, e.g. when duplicate customers are merged
+        :return: number of moved orders
+        """
+        cursor = self._db.find({"customer": {"$in": customer_ids}}, {"_id": 1})
+        return await self.update_orders([(x["_id"], {"$set": {"customer": customer_id}}) async for x in cursor])
+
+    async def update_orders(self, updates: List[Tuple[ObjectId, dict]]) -> int:
+        """
+        Applies updates of migrations and maintenance with bulk_write, every order gets a new seq
+        so delta sync clients receive the change
+        :param updates: ids of orders and their updates
+        :return: number of updated orders
+        """
+        if not updates:
+            return 0
+        self._forget({"_id": {"$in": [order_id for order_id, _ in updates]}})
+        async with self._sequence(count=len(updates)) as seq:
+            requests = [
+                UpdateOne({"_id": order_id}, {**update, "$set": {**update.get("$set", {}), "seq": seq + i}})
+                for i, (order_id, update) in enumerate(updates)
+            ]
+            for start in range(0, len(requests), BULK_WRITE_BATCH_SIZE):
+                await self._db.bulk_write(requests[start:start + BULK_WRITE_BATCH_SIZE], ordered=False)
+        published_orders_cache.invalidate()
+        return len(updates)
 
     async def set_expert(self, order_id: str, expert_id: str) -> Order:
-        await self._db.update_one(
-            {"_id": ObjectId(order_id)},
-            {"$set": {"status": OrderStatus.handling, "expert": expert_id}})
-        return Order(**await self._db.find_one({"_id": ObjectId(order_id)}))
+        return await self._update_order(
+            order_id,
+            {"$set": {"status": OrderStatus.handling, "expert": expert_id}},
+        )
 
     async def set_rating(self, order_id: str, rating: float) -> Order:
-        await self._db.update_one({"_id": ObjectId(order_id)}, {"$set": {"rating": rating}})
-        return Order(**await self._db.find_one({"_id": ObjectId(order_id)}))
+        return await self._update_order(order_id, {"$set": {"rating": rating}})
 
     async def set_document_text(self, order_id: str, text: str):
-        await self._db.update_one({"_id": ObjectId(order_id)}, {"$set": {"document.text": text}})
+        await self._documents.set_text(order_id, text)
+        await self._update_order(order_id, {"$set": {"document.has_text": True}})
 
-    async def add_file_to_order_input(self, order_id: str, file: FileInfoDTO) -> Order:
-        order_id = PydanticObjectId(order_id)
+    async def _add_file(self, order_id: str, part: DocumentPart, file: FileInfoDTO) -> Order:
+        """
+        Images are appended to the manifest in OrderDocument, the order keeps their count
+        """
         if file.file_type == FileType.img:
-            setter = {"$push": {"document.input.images": file.file_link}}
+            await self._documents.add_image(order_id, part, file.file_link)
+            setter = {"$inc": {f"document.{part.value}.images_count": 1}}
         else:
-            setter = {"$set": {"document.input.file": file.file_link}}
-        await self._db.update_one(
-            {"_id": order_id},
-            setter,
-        )
-        updated_order = await self._db.find_one({"_id": order_id})
-        return Order(**updated_order)
+            setter = {"$set": {f"document.{part.value}.file": file.file_link}}
+        return await self._update_order(order_id, setter)
+
+    async def add_file_to_order_input(self, order_id: str, file: FileInfoDTO) -> Order:
+        return await self._add_file(order_id, DocumentPart.input, file)
 
     async def add_file_to_order_result(self, order_id: str, file: FileInfoDTO) -> Order:
-        order_id = PydanticObjectId(order_id)
-        if file.file_type == FileType.img:
-            setter = {"$push": {"document.result.images": file.file_link}}
-        else:
-            setter = {"$set": {"document.result.file": file.file_link}}
-        await self._db.update_one(
-            {"_id": order_id},
-            setter,
-        )
-        updated_order = await self._db.find_one({"_id": order_id})
-        return Order(**updated_order)
+        return await self._add_file(order_id, DocumentPart.result, file)
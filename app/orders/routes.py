@@ -1,13 +1,21 @@
-from typing import List
+from typing import List, Optional, FrozenSet
 
 from fastapi import APIRouter, Depends, Query, Body, UploadFile, Header, File
+from fastapi.responses import Response
+from starlette.requests import Request
 
+from app.core.etag import is_not_modified, not_modified_response
+from app.orders.cache import published_orders_cache
 from app.orders.enums import OrderStatus, FileType
 from app.orders.exceptions import FileExtensionIsNotAllow, FileSizeIsNotAllow, ClientFileUploadingError, OrderNotFound, \
-    OrderOperationWrongSatus
+    OrderOperationWrongSatus, OrderFieldsUnknown
+from app.orders.repositories.document import OrderDocumentRepository
 from app.orders.repositories.order import OrderRepository
-from app.orders.schemas import OrdersResponse, OrderResponse, CreateOrderDTO, FileInfoDTO, RateOrderDTO
+from app.orders.schemas import OrdersResponse, OrderResponse, CreateOrderDTO, FileInfoDTO, RateOrderDTO, \
+    OrderChangesResponse, BulkOrdersDTO, BulkOrdersResponse, DocumentDetailResponse, ORDER_RESPONSE_FIELDS
 from app.orders.serializer import OrderSerializer
+from app.orders.transitions import check_cancel, check_confirm, check_complete, check_view, ACTION_CHECKS, \
+    ACTION_STATUSES
 from app.services.s3_service.exceptions import S3FileExtensionIsNotAllowException, S3FileSizeIsNotAllowException, \
     S3ClientException
 from app.services.s3_service.service import S3Service
@@ -17,6 +25,23 @@ from app.users.models import User
 order_router = APIRouter(tags=['orders'], prefix="/orders")
 
 
+def get_order_fields(
+        fields: Optional[str] = Query(
+            None,
+            description="Comma separated fields of orders to return, id is always returned. All fields by default",
+        ),
+) -> Optional[FrozenSet[str]]:
+    """
+    :return: requested fields of OrderResponse besides id, None for all of them
+    """
+    if fields is None:
+        return None
+    requested = {x.strip() for x in fields.split(",") if x.strip()} - {"id"}
+    if not requested <= set(ORDER_RESPONSE_FIELDS):
+        raise OrderFieldsUnknown()
+    return frozenset(requested)
+
+
 @order_router.get(
     path="/",
     response_model=OrdersResponse,
@@ -24,19 +49,43 @@ order_router = APIRouter(tags=['orders'], prefix="/orders")
     response_model_by_alias=True,
 )
 async def get_published_orders(
+        request: Request,
         offset: int = Query(0, ge=0),
         limit: int = Query(10, ge=1),
+        fields: Optional[FrozenSet[str]] = Depends(get_order_fields),
         user: User = Depends(get_expert),
         order_repository: OrderRepository = Depends(),
         order_serializer: OrderSerializer = Depends(),
 ):
-    total, orders = await order_repository.get_published_orders(limit=limit, offset=offset)
-    return await order_serializer.get_orders_response(
-        orders=orders,
-        total=total,
-        limit=limit,
-        offset=offset,
-    )
+    # only pages with all fields are cached
+    page = published_orders_cache.get(offset=offset, limit=limit) if fields is None else None
+    if page is not None:
+        content, etag = page
+    else:
+        generation = published_orders_cache.generation
+        # versions are checked before the page is read only for conditional requests
+        if request.headers.get("if-none-match"):
+            total, versions = await order_repository.get_published_orders_versions(limit=limit, offset=offset)
+            etag = await order_serializer.get_orders_etag(total, versions, fields, offset, limit)
+            if is_not_modified(request, etag):
+                return not_modified_response(etag)
+        total, orders = await order_repository.get_published_orders(limit=limit, offset=offset, fields=fields)
+        users = await order_serializer.get_users(orders, fields)
+        etag = order_serializer.get_page_etag(total, orders, users, fields, offset, limit)
+        orders_response = await order_serializer.get_orders_response(
+            orders=orders,
+            total=total,
+            limit=limit,
+            offset=offset,
+            fields=fields,
+            users=users,
+        )
+        content = orders_response.json(exclude_none=True, by_alias=True)
+        if fields is None:
+            published_orders_cache.set(offset=offset, limit=limit, content=content, etag=etag, generation=generation)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    return Response(content=content, media_type="application/json", headers={"ETag": etag})
 
 
 @order_router.get(
@@ -46,24 +95,68 @@ async def get_published_orders(
     response_model_by_alias=True,
 )
 async def get_self_orders(
+        request: Request,
+        response: Response,
         offset: int = Query(0, ge=0),
         limit: int = Query(10, ge=1),
         statuses: List[OrderStatus] = Query([]),
+        fields: Optional[FrozenSet[str]] = Depends(get_order_fields),
         user: User = Depends(get_current_user),
         order_repository: OrderRepository = Depends(),
         order_serializer: OrderSerializer = Depends(),
 ):
+    if request.headers.get("if-none-match"):
+        total, versions = await order_repository.get_self_orders_versions(
+            limit=limit,
+            offset=offset,
+            statuses=statuses,
+            user=user,
+        )
+        etag = await order_serializer.get_orders_etag(total, versions, fields, str(user.id), offset, limit, statuses)
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+
     total, orders = await order_repository.get_self_orders(
         limit=limit,
         offset=offset,
         statuses=statuses,
         user=user,
+        fields=fields,
+    )
+    users = await order_serializer.get_users(orders, fields)
+    response.headers["ETag"] = order_serializer.get_page_etag(
+        total, orders, users, fields, str(user.id), offset, limit, statuses,
     )
     return await order_serializer.get_orders_response(
         orders=orders,
         total=total,
         limit=limit,
         offset=offset,
+        fields=fields,
+        users=users,
+    )
+
+
+@order_router.get(
+    path="/self/changes/",
+    response_model=OrderChangesResponse,
+    response_model_exclude_none=True,
+    response_model_by_alias=True,
+)
+async def get_self_orders_changes(
+        since: int = Query(0, ge=0),
+        limit: int = Query(100, ge=1, le=1000),
+        fields: Optional[FrozenSet[str]] = Depends(get_order_fields),
+        user: User = Depends(get_current_user),
+        order_repository: OrderRepository = Depends(),
+        order_serializer: OrderSerializer = Depends(),
+):
+    orders = await order_repository.get_changed_orders(user=user, since=since, limit=limit + 1, fields=fields)
+    return await order_serializer.get_changes_response(
+        orders=orders[:limit],
+        since=since,
+        has_more=len(orders) > limit,
+        fields=fields,
     )
 
 
@@ -83,6 +176,35 @@ async def create_order(
     return await order_serializer.get_order_response(order)
 
 
+@order_router.post(
+    path="/bulk/",
+    response_model=BulkOrdersResponse,
+    response_model_exclude_none=True,
+    response_model_by_alias=True,
+)
+async def bulk_orders_operation(
+        bulk_request: BulkOrdersDTO = Body(),
+        user: User = Depends(get_current_user),
+        order_repository: OrderRepository = Depends(),
+        order_serializer: OrderSerializer = Depends(),
+):
+    order_ids = list(dict.fromkeys(bulk_request.order_ids))
+    orders = {str(order.id): order for order in await order_repository.get_orders_by_ids(order_ids)}
+    check = ACTION_CHECKS[bulk_request.action]
+    errors = {order_id: check(orders.get(order_id), user) for order_id in order_ids}
+    status = ACTION_STATUSES[bulk_request.action]
+    updated_ids = await order_repository.bulk_change_status(
+        orders=[orders[order_id] for order_id, error in errors.items() if error is None],
+        status=status,
+    )
+    return order_serializer.get_bulk_response(
+        order_ids=order_ids,
+        errors=errors,
+        updated_ids=updated_ids,
+        status=status,
+    )
+
+
 @order_router.post(
     path="/{order_id}/file/input/",
     response_model=OrderResponse,
@@ -177,13 +299,8 @@ async def cancel_order(
         order_serializer: OrderSerializer = Depends(),
 ):
     order = await order_repository.get_order_by_id(order_id=order_id)
-    if not order or order.customer != str(user.id) and order.expert != str(user.id):
-        raise OrderNotFound()
-    if any([
-        order.customer == str(user.id) and order.status not in [OrderStatus.draft, OrderStatus.published],
-        order.expert == str(user.id) and order.status != OrderStatus.handling,
-    ]):
-        raise OrderOperationWrongSatus()
+    if error := check_cancel(order, user):
+        raise error()
     order = await order_repository.change_oder_status(order_id=order_id, status=OrderStatus.cancelled)
     return await order_serializer.get_order_response(order)
 
@@ -201,10 +318,8 @@ async def confirm_order(
         order_serializer: OrderSerializer = Depends(),
 ):
     order = await order_repository.get_order_by_id(order_id=order_id)
-    if not order or order.customer != str(user.id):
-        raise OrderNotFound()
-    if order.status != OrderStatus.draft.value:
-        raise OrderOperationWrongSatus()
+    if error := check_confirm(order, user):
+        raise error()
     order = await order_repository.change_oder_status(order_id=order_id, status=OrderStatus.published)
     return await order_serializer.get_order_response(order)
 
@@ -265,9 +380,25 @@ async def complete_order(
         order_serializer: OrderSerializer = Depends(),
 ):
     order = await order_repository.get_order_by_id(order_id=order_id)
-    if not order or order.customer != str(user.id):
-        raise OrderNotFound()
-    if order.status != OrderStatus.handling.value:
-        raise OrderOperationWrongSatus()
+    if error := check_complete(order, user):
+        raise error()
     order = await order_repository.change_oder_status(order_id=order_id, status=OrderStatus.done)
     return await order_serializer.get_order_response(order)
+
+
+@order_router.get(
+    path="/{order_id}/document/",
+    response_model=DocumentDetailResponse,
+    response_model_exclude_none=True,
+)
+async def get_order_document(
+        order_id: str,
+        user: User = Depends(get_current_user),
+        order_repository: OrderRepository = Depends(),
+        document_repository: OrderDocumentRepository = Depends(),
+):
+    order = await order_repository.get_order_by_id(order_id=order_id)
+    if error := check_view(order, user):
+        raise error()
+    document = await document_repository.get_document(order_id)
+    return DocumentDetailResponse.from_models(order, document)
@@ -1,21 +1,24 @@
 from typing import Optional, List, Type
 
-from pydantic import BaseModel
+from pydantic import BaseModel, conlist
 
-from app.orders.enums import OrderStatus, VulnerabilityStatus, FileType
-from app.orders.models import Document, DocumentContent
+from app.core.exception.base import ErrorDescription
+from app.orders.enums import OrderStatus, VulnerabilityStatus, FileType, OrderAction
+from app.orders.models import Document, DocumentContent, Order, OrderDocument
 from app.users.schemas import UserFullResponse
 
+# Fields of OrderResponse that can be requested with `fields` of list endpoints, id is always returned
+ORDER_RESPONSE_FIELDS = ("name", "description", "status", "rating", "customer", "expert", "document")
 
 class DocumentContentResponse(BaseModel):
     file: Optional[str]
-    images: List[str] = []
+    images_count: int = 0
 
     @classmethod
     def from_model(cls: Type[BaseModel], content: DocumentContent):
         return cls(
             file=content.file,
-            images=content.images,
+            images_count=content.images_count,
         )
 
 
@@ -23,6 +26,7 @@ class DocumentResponse(BaseModel):
     input: Optional[DocumentContentResponse]
     result: Optional[DocumentContentResponse]
     vulnerability: VulnerabilityStatus
+    has_text: bool = False
 
     @classmethod
     def from_model(cls: Type[BaseModel], document: Document):
@@ -30,16 +34,47 @@ class DocumentResponse(BaseModel):
             input=DocumentContentResponse.from_model(document.input) if document.input else None,
             result=DocumentContentResponse.from_model(document.result) if document.result else None,
             vulnerability=document.vulnerability,
+            has_text=document.has_text,
+        )
+
+
+class DocumentFilesResponse(BaseModel):
+    file: Optional[str]
+    images: List[str] = []
+
+
+class DocumentDetailResponse(BaseModel):
+    id: str
+    text: Optional[str]
+    input: DocumentFilesResponse
+    result: DocumentFilesResponse
+    vulnerability: VulnerabilityStatus
+
+    @classmethod
+    def from_models(cls: Type[BaseModel], order: Order, document: OrderDocument):
+        summary = order.document or Document()
+        return cls(
+            id=str(order.id),
+            text=document.text,
+            input=DocumentFilesResponse(
+                file=summary.input.file if summary.input else None,
+                images=document.input.images,
+            ),
+            result=DocumentFilesResponse(
+                file=summary.result.file if summary.result else None,
+                images=document.result.images,
+            ),
+            vulnerability=summary.vulnerability,
         )
 
 
 class OrderResponse(BaseModel):
     id: str
-    name: str
+    name: Optional[str]
     description: Optional[str]
-    status: OrderStatus
-    rating: float
-    customer: UserFullResponse
+    status: Optional[OrderStatus]
+    rating: Optional[float]
+    customer: Optional[UserFullResponse]
     expert: Optional[UserFullResponse]
     document: Optional[DocumentResponse]
 
@@ -55,6 +90,27 @@ class OrdersResponse(BaseModel):
     pagination: Pagination
 
 
+class OrderChangesResponse(BaseModel):
+    items: List[OrderResponse]
+    token: int
+    has_more: bool
+
+
+class BulkOrderError(BaseModel):
+    code: int
+    description: ErrorDescription
+
+
+class BulkOrderResult(BaseModel):
+    id: str
+    status: Optional[OrderStatus]
+    error: Optional[BulkOrderError]
+
+
+class BulkOrdersResponse(BaseModel):
+    items: List[BulkOrderResult]
+
+
 class FileInfoDTO(BaseModel):
     file_link: str
     file_name: str
@@ -66,5 +122,10 @@ class CreateOrderDTO(BaseModel):
     description: Optional[str]
 
 
+class BulkOrdersDTO(BaseModel):
+    order_ids: conlist(str, min_items=1, max_items=10000)
+    action: OrderAction
+
+
 class RateOrderDTO(BaseModel):
     rating: float
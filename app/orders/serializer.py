@@ -1,44 +1,169 @@
-from typing import List
+from typing import List, Dict, Optional, Type, AbstractSet
 
 from fastapi import Depends
 
+from app.core.etag import make_etag
+from app.core.timing import timed
+from app.core.exception.base import AppBaseException
+from app.orders.enums import OrderStatus
+from app.orders.exceptions import OrderOperationWrongSatus
 from app.orders.models import Order
-from app.orders.schemas import OrdersResponse, OrderResponse, DocumentResponse, Pagination
+from app.orders.schemas import OrdersResponse, OrderResponse, DocumentResponse, Pagination, OrderChangesResponse, \
+    BulkOrdersResponse, BulkOrderResult, BulkOrderError, ORDER_RESPONSE_FIELDS
+from app.users.models import User
 from app.users.repositories.user import UserRepository
 from app.users.schemas import UserFullResponse
 
 
 class OrderSerializer:
+    # Fields of users rendered by UserFullResponse and version of entity tags
+    user_projection = {"name": 1, "phone": 1, "email.value": 1, "rating": 1, "md": 1, "version": 1}
 
     def __init__(self, user_repository: UserRepository = Depends()):
         self.user_repository = user_repository
 
-    async def get_order_response(self, order: Order) -> OrderResponse:
-        customer = await self.user_repository.get_user_by_id(order.customer)
-        expert = await self.user_repository.get_user_by_id(order.expert)
-        return OrderResponse(
-            id=str(order.id),
-            name=order.name,
-            description=order.description,
-            status=order.status,
-            rating=order.rating,
-            customer=UserFullResponse.from_model(customer) if customer else None,
-            expert=UserFullResponse.from_model(expert) if expert else None,
-            document=DocumentResponse.from_model(order.document) if order.document else None,
+    @staticmethod
+    def _get_user_fields(fields: Optional[AbstractSet[str]]) -> List[str]:
+        return [x for x in ("customer", "expert") if fields is None or x in fields]
+
+    async def get_users(self, orders: List[Order], fields: Optional[AbstractSet[str]] = None) -> Dict[str, User]:
+        """
+        Reads customers and experts of the orders rendered in the fields with one query
+        :return: users by id
+        """
+        user_fields = self._get_user_fields(fields)
+        user_ids = {getattr(order, x) for order in orders for x in user_fields if getattr(order, x)}
+        if not user_ids:
+            return {}
+        return await self.user_repository.get_users_by_ids(user_ids, projection=self.user_projection)
+
+    @timed("serialize")
+    async def get_order_response(
+            self,
+            order: Order,
+            fields: Optional[AbstractSet[str]] = None,
+            users: Optional[Dict[str, User]] = None,
+    ) -> OrderResponse:
+        """
+        :param fields: fields of the response to fill, all of them by default
+        :param users: customer and expert of the order, read if not given
+        """
+        if users is None:
+            users = await self.get_users([order], fields)
+        values = {}
+        for field in ORDER_RESPONSE_FIELDS if fields is None else fields:
+            if field in ("customer", "expert"):
+                user = users.get(getattr(order, field))
+                values[field] = UserFullResponse.from_model(user) if user else None
+            elif field == "document":
+                values[field] = DocumentResponse.from_model(order.document) if order.document else None
+            else:
+                values[field] = getattr(order, field)
+        return OrderResponse(id=str(order.id), **values)
+
+    async def get_orders_etag(
+            self,
+            total: int,
+            orders: List[dict],
+            fields: Optional[AbstractSet[str]],
+            *scope,
+    ) -> str:
+        """
+        Entity tag checked before the page is read, equal to get_page_etag of the same page
+        :param total: total count of orders matched by the list request
+        :param orders: order rows with _id, seq, customer and expert
+        :param fields: fields of the response, all of them by default
+        :param scope: request parameters the list depends on
+        :return: str entity tag of the orders page, that changes with any order or rendered user in it
+        """
+        user_fields = self._get_user_fields(fields)
+        user_ids = {x[key] for x in orders for key in user_fields if x.get(key)}
+        users_versions = await self.user_repository.get_users_versions(user_ids)
+        return make_etag(
+            *scope,
+            fields and sorted(fields),
+            total,
+            [(str(x["_id"]), x.get("seq")) for x in orders],
+            sorted(users_versions.items()),
+        )
+
+    def get_page_etag(
+            self,
+            total: int,
+            orders: List[Order],
+            users: Dict[str, User],
+            fields: Optional[AbstractSet[str]],
+            *scope,
+    ) -> str:
+        """
+        Entity tag of the page already read, see get_orders_etag
+        :param users: users of the page read by get_users
+        """
+        return make_etag(
+            *scope,
+            fields and sorted(fields),
+            total,
+            [(str(x.id), x.seq) for x in orders],
+            sorted((user_id, user.version) for user_id, user in users.items()),
         )
 
+    @timed("serialize")
     async def get_orders_response(
             self,
             orders: List[Order],
             total: int,
             limit: int,
             offset: int,
+            fields: Optional[AbstractSet[str]] = None,
+            users: Optional[Dict[str, User]] = None,
     ) -> OrdersResponse:
+        """
+        :param users: users of the orders, read if not given
+        """
+        if users is None:
+            users = await self.get_users(orders, fields)
         return OrdersResponse(
-            items=[await self.get_order_response(order) for order in orders],
+            items=[await self.get_order_response(order, fields, users) for order in orders],
             pagination=Pagination(
                 offset=offset,
                 limit=limit,
                 total=total,
             ),
         )
+
+    @timed("serialize")
+    async def get_changes_response(
+            self,
+            orders: List[Order],
+            since: int,
+            has_more: bool,
+            fields: Optional[AbstractSet[str]] = None,
+    ) -> OrderChangesResponse:
+        users = await self.get_users(orders, fields)
+        return OrderChangesResponse(
+            items=[await self.get_order_response(order, fields, users) for order in orders],
+            token=orders[-1].seq if orders else since,
+            has_more=has_more,
+        )
+
+    @staticmethod
+    @timed("serialize")
+    def get_bulk_response(
+            order_ids: List[str],
+            errors: Dict[str, Optional[Type[AppBaseException]]],
+            updated_ids: List[str],
+            status: OrderStatus,
+    ) -> BulkOrdersResponse:
+        updated_ids = set(updated_ids)
+        items = []
+        for order_id in order_ids:
+            error = errors[order_id]
+            if error is None and order_id not in updated_ids:
+                # Order status was changed concurrently after the check
+                error = OrderOperationWrongSatus
+            items.append(BulkOrderResult(
+                id=order_id,
+                status=status if error is None else None,
+                error=BulkOrderError(**error._get_message()) if error else None,
+            ))
+        return BulkOrdersResponse(items=items)
@@ -0,0 +1,61 @@
+from typing import Optional, Type, Callable, Dict
+
+from app.core.exception.base import AppBaseException
+from app.orders.enums import OrderAction, OrderStatus
+from app.orders.exceptions import OrderNotFound, OrderOperationWrongSatus
+from app.orders.models import Order
+from app.users.enums import UserRole
+from app.users.models import User
+
+OrderCheck = Callable[[Optional[Order], User], Optional[Type[AppBaseException]]]
+
+
+def check_cancel(order: Optional[Order], user: User) -> Optional[Type[AppBaseException]]:
+    if not order or order.customer != str(user.id) and order.expert != str(user.id):
+        return OrderNotFound
+    if any([
+        order.customer == str(user.id) and order.status not in [OrderStatus.draft, OrderStatus.published],
+        order.expert == str(user.id) and order.status != OrderStatus.handling,
+    ]):
+        return OrderOperationWrongSatus
+    return None
+
+
+def check_confirm(order: Optional[Order], user: User) -> Optional[Type[AppBaseException]]:
+    if not order or order.customer != str(user.id):
+        return OrderNotFound
+    if order.status != OrderStatus.draft:
+        return OrderOperationWrongSatus
+    return None
+
+
+def check_complete(order: Optional[Order], user: User) -> Optional[Type[AppBaseException]]:
+    if not order or order.expert != str(user.id):
+        return OrderNotFound
+    if order.status != OrderStatus.handling:
+        return OrderOperationWrongSatus
+    return None
+
+
+def check_view(order: Optional[Order], user: User) -> Optional[Type[AppBaseException]]:
+    if not order:
+        return OrderNotFound
+    if str(user.id) in (order.customer, order.expert):
+        return None
+    # experts choose among published orders
+    if order.status == OrderStatus.published and user.md.role == UserRole.expert:
+        return None
+    return OrderNotFound
+
+
+ACTION_CHECKS: Dict[OrderAction, OrderCheck] = {
+    OrderAction.cancel: check_cancel,
+    OrderAction.confirm: check_confirm,
+    OrderAction.complete: check_complete,
+}
+
+ACTION_STATUSES: Dict[OrderAction, OrderStatus] = {
+    OrderAction.cancel: OrderStatus.cancelled,
+    OrderAction.confirm: OrderStatus.published,
+    OrderAction.complete: OrderStatus.done,
+}
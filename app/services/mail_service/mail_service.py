@@ -1,5 +1,6 @@
 import smtplib
 
+from app.core.tracing import traced
 from app.settings import settings
 
 
@@ -7,6 +8,7 @@ class MailService:
     _email_from = settings.EMAIL_FROM
     _password = settings.EMAIL_PASSWORD
     _mail_server = settings.EMAIL_SERVER
+    _smtp_class = smtplib.SMTP_SSL if settings.EMAIL_USE_SSL else smtplib.SMTP
 
     def get_message(self, to: str, subject: str, text: str):
         return "\r\n".join((
@@ -17,8 +19,9 @@ class MailService:
             f"{text}"
         ))
 
+    @traced("smtp.send", outbound=True)
     def send_verification_message(self, to: str, confirm_code: str):
-        server = smtplib.SMTP_SSL(self._mail_server)
+        server = self._smtp_class(self._mail_server)
         server.login(user=self._email_from, password=self._password)
         server.sendmail(
             from_addr=self._email_from,
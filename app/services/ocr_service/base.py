@@ -1,6 +1,5 @@
 from abc import ABCMeta, abstractmethod
-
-from app.orders.models import Document
+from typing import List
 
 
 class BaseOCRService(metaclass=ABCMeta):
@@ -15,11 +14,11 @@ class BaseOCRService(metaclass=ABCMeta):
         pass
 
     @abstractmethod
-    async def apply_ocr(self, order_id: str, document: Document):
+    async def apply_ocr(self, order_id: str, images: List[str]):
         """
 
         :param order_id: str id of order relative to document
-        :param document: document object that contained images links
+        :param images: links of input images of the order document
         :return: update order in database and return None
         """
         pass
@@ -1,10 +1,11 @@
 import os
+from typing import List
 
 import googleapiclient
 from fastapi import Depends
 from google.oauth2 import service_account
 
-from app.orders.models import Document
+from app.core.tracing import traced
 from app.orders.repositories.order import OrderRepository
 from app.services.ocr_service.base import BaseOCRService
 from app.services.s3_service.service import S3Service
@@ -41,15 +42,16 @@ class OCRService(BaseOCRService):
             }]
         }
 
+    @traced("ocr.annotate", outbound=True)
     async def get_image_text(self, image_link: str) -> str:
         image_request = await self._get_request_data(image_link=image_link)
         request = self._service.images().annotate(body=image_request)
         response = request.execute()
         return response['responses'][0]['textAnnotations'][0]['description']
 
-    async def apply_ocr(self, order_id: str, document: Document):
+    async def apply_ocr(self, order_id: str, images: List[str]):
         text = ""
-        for image in document.input.images:
+        for image in images:
             text += await self.get_image_text(image_link=image)
         if text:
             await self._order_repository.set_document_text(order_id=order_id, text=text)
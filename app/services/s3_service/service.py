@@ -4,6 +4,8 @@ import structlog
 from botocore.exceptions import ClientError
 from fastapi import UploadFile
 
+from app.core.timing import timed
+from app.core.tracing import traced
 from app.services.s3_service.base import BaseS3
 from app.services.s3_service.exceptions import S3FileExtensionIsNotAllowException, S3FileSizeIsNotAllowException, \
     S3ClientException
@@ -18,10 +20,10 @@ class S3Service(BaseS3):
 
     def check_file(self, ext: str, file_size: int) -> None:
         if ext not in settings.ALLOW_FILE_EXTENSION:
-            logger.debug(f'File extension {ext} not allowed')
+            logger.debug('File extension not allowed', ext=ext)
             raise S3FileExtensionIsNotAllowException()
         elif file_size > settings.MAX_FILE_SIZE:
-            logger.debug(f'File size {file_size} not allowed')
+            logger.debug('File size not allowed', file_size=file_size)
             raise S3FileSizeIsNotAllowException()
 
     def get_key(self, user_id: str, ext: str) -> str:
@@ -32,9 +34,9 @@ class S3Service(BaseS3):
 
     def guess_extension(self, upload_file: UploadFile) -> str:
         if ext_by_content_type := mimetypes.guess_extension(upload_file.content_type):
-            logger.debug(f'Extension guessed by Content-Type: {upload_file.content_type} -> {ext_by_content_type}')
+            logger.debug('Extension guessed by Content-Type', content_type=upload_file.content_type, ext=ext_by_content_type)
             return ext_by_content_type
-        logger.debug(f'Could not guess extension by Content-Type: {upload_file.content_type}')
+        logger.debug('Could not guess extension by Content-Type', content_type=upload_file.content_type)
         ext_by_filename = upload_file.filename.split('.')[-1]
         return f'.{ext_by_filename}'
 
@@ -45,7 +47,7 @@ class S3Service(BaseS3):
 
         key: str = self.get_key(user_id, ext)
 
-        logger.debug(f'Uploading cv file: Start! UserId: {user_id}')
+        logger.debug('Uploading file: Start!', user_id=user_id)
 
         return await self._upload(
             upload_file=upload_file,
@@ -53,6 +55,8 @@ class S3Service(BaseS3):
             user_id=user_id
         )
 
+    @timed("storage")
+    @traced("s3.put_object", outbound=True)
     async def _upload(self, upload_file: UploadFile, key: str, user_id: str) -> str:
         try:
             async with self._session.create_client(
@@ -70,9 +74,9 @@ class S3Service(BaseS3):
                     ContentType=upload_file.content_type,
                 )
         except ClientError as e:
-            logger.error(f"Uploading file finished with error: {e.response.get('Error')}")
+            logger.error("Uploading file finished with error", error=e.response.get('Error'))
             raise S3ClientException()
 
-        logger.debug(f'Uploading file: Success! UserId: {user_id}')
+        logger.debug('Uploading file: Success!', user_id=user_id)
 
         return self.get_url(domain=settings.S3_ENDPOINT, key=key)
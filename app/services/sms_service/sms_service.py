@@ -1,32 +1,36 @@
 import requests
 import structlog
-from fastapi import Depends
 
 from app.core.enums import Environment
+from app.core.security import generate_code
+from app.core.tracing import traced
 from app.services.sms_service.exceptions import SMSCError
 from app.settings import settings
-from app.users.repositories.user import UserRepository
 
 logger = structlog.get_logger("sms_service")
 
 
 class SMSService:
 
-    def __init__(self, user_repository: UserRepository = Depends()):
-        self.user_repository = user_repository
+    def __init__(self):
         self.test_phones = [f"791000000{str(i).zfill(2)}" for i in range(100)]
 
-    async def send_sms(self, phone: str, code: str) -> None:
+    def get_code(self, phone: str) -> str:
         """
-        Sends SMS to account's phone, returns status code of response.
-        You probably should save code to base and generate message here.
+        Returns sign in code for the phone, test phones always get 0000
         """
         if phone in self.test_phones:
-            code = "0000"
+            return "0000"
+        return generate_code()
+
+    async def send_sms(self, phone: str, code: str) -> None:
+        """
+        Sends SMS with the code to account's phone. The code is saved by the caller.
+        """
         if phone not in self.test_phones or settings.ENVIRONMENT == Environment.prod:
             self._send_request(phone=phone, code=code)
-        await self.user_repository.update_user_code(phone=phone, code=code)
 
+    @traced("sms.send", outbound=True)
     def _send_request(self, phone: str, code: str):
         try:
             response = requests.get(
@@ -36,15 +40,15 @@ class SMSService:
                 )
             )
         except Exception as e:
-            logger.error(f'{e.args} - SMS was not sent')
+            logger.error('SMS was not sent', error=e.args)
             raise ConnectionError('SMSC API request failed')
         if b'ERROR' in response.content:
-            logger.error(f'{response.content.decode("utf-8")} - SMS was not sent')
+            logger.error('SMS was not sent', response=response.content.decode("utf-8"))
             raise SMSCError()
 
     @staticmethod
     def _generate_request(phone: str, message: str) -> str:
-        return (f"https://smsc.ru/sys/send.php"
+        return (f"{settings.SMSC_URL}"
                 f"?login={settings.SMSC_LOGIN}"
                 f"&psw={settings.SMSC_PASS}"
                 f"&phones={phone}"
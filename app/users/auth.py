@@ -2,11 +2,14 @@ from fastapi import Depends, HTTPException, status
 from fastapi_jwt_auth import AuthJWT
 from fastapi_jwt_auth.exceptions import JWTDecodeError, MissingTokenError
 
+from app.core.capture import capture_role
+from app.core.timing import timed
 from app.users.enums import UserRole
 from app.users.models import User
 from app.users.repositories.user import UserRepository
 
 
+@timed("auth")
 async def _get_user(
     user_repository: UserRepository = Depends(),
     authorize: AuthJWT = Depends(),
@@ -39,6 +42,7 @@ async def _get_user(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not exists")
 
+    capture_role(user.md.role)
     return user
 
 
@@ -2,7 +2,7 @@ from fastapi import status
 
 from app.core.exception.base import AppBaseException, ErrorDescription
 from app.core.exception.error_codes import invalid_code, user_already_exists, invalid_email_or_password, \
-    email_not_confirmed, user_without_password, invalid_confirm_email, user_not_found
+    email_not_confirmed, user_without_password, invalid_confirm_email, user_not_found, user_version_conflict
 
 
 class InvalidCodeException(AppBaseException):
@@ -57,3 +57,12 @@ class UserNotFoundException(AppBaseException):
     _status_code = status.HTTP_404_NOT_FOUND
     _code = user_not_found
     _description = ErrorDescription(en="User not found", ru="Пользователь не найден")
+
+
+class UserVersionConflictException(AppBaseException):
+    _status_code = status.HTTP_412_PRECONDITION_FAILED
+    _code = user_version_conflict
+    _description = ErrorDescription(
+        en="Profile was changed meanwhile, reload it and try again",
+        ru="Профиль был изменен, обновите его и попробуйте снова",
+    )
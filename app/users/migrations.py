@@ -0,0 +1,83 @@
+"""
+Merges customers created twice for the same phone by earlier versions, before the unique phone index is built:
+
+    python -m app.users.migrations
+
+The oldest customer of the phone is kept, refresh tokens and orders of the other ones are moved to it
+and the other ones are deleted. The migration can be interrupted and rerun. The app does not start
+while duplicates exist, because the unique phone index can not be built.
+"""
+import asyncio
+from typing import AsyncIterator, List
+
+import structlog
+
+from app.core.database import AsyncIOMotorClient, create_client
+from app.core.enums import Collection
+from app.orders.repositories.order import OrderRepository
+from app.settings import settings
+
+logger = structlog.get_logger("migrations")
+
+
+async def _customers_by_phone(db: AsyncIOMotorClient) -> AsyncIterator[List[dict]]:
+    """
+    :return: customers sharing a phone, the oldest first, phones of one customer are skipped
+    """
+    cursor = db[Collection.USERS.value].find(
+        {"phone": {"$type": "string"}},
+        {"phone": 1, "tokens": 1},
+        sort=[("phone", 1), ("_id", 1)],
+    )
+    group: List[dict] = []
+    async for row in cursor:
+        if group and group[0]["phone"] != row["phone"]:
+            if len(group) > 1:
+                yield group
+            group = []
+        group.append(row)
+    if len(group) > 1:
+        yield group
+
+
+async def find_duplicate_phones(db: AsyncIOMotorClient) -> List[str]:
+    return [group[0]["phone"] async for group in _customers_by_phone(db)]
+
+
+async def merge_duplicate_phones(db: AsyncIOMotorClient) -> int:
+    """
+    :return: number of deleted duplicates
+    """
+    merged = 0
+    async for group in _customers_by_phone(db):
+        merged += await _merge(db, group)
+    return merged
+
+
+async def _merge(db: AsyncIOMotorClient, rows: List[dict]) -> int:
+    kept, duplicates = rows[0], rows[1:]
+    duplicate_ids = [str(x["_id"]) for x in duplicates]
+    tokens = [token for row in duplicates for token in row.get("tokens") or []]
+    # the kept customer is updated first, an interrupted merge is repeated by the next run
+    await db[Collection.USERS.value].update_one(
+        {"_id": kept["_id"]},
+        {"$push": {"tokens": {"$each": tokens}}, "$inc": {"version": 1}},
+    )
+    # orders get new seq values, so synced clients of the kept customer receive them
+    await OrderRepository(db).change_customer(duplicate_ids, str(kept["_id"]))
+    await db[Collection.USERS.value].delete_many({"_id": {"$in": [x["_id"] for x in duplicates]}})
+    logger.warning("Duplicate customers merged", phone=kept["phone"], kept=str(kept["_id"]), deleted=duplicate_ids)
+    return len(duplicates)
+
+
+async def main() -> None:
+    client = create_client(settings.STORAGE_BACKEND, settings.MONGO_URL)
+    try:
+        merged = await merge_duplicate_phones(client[settings.MONGO_INITDB_DATABASE])
+    finally:
+        client.close()
+    print(f"Merged {merged} duplicate customers")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
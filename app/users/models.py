@@ -47,6 +47,7 @@ class User(BaseModel):
     tokens: List[UserToken] = Field([])
     rating: Optional[float]
     md: UserMD
+    version: int = 0
 
     class Config:
         allow_population_by_field_name = True
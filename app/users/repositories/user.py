@@ -1,11 +1,14 @@
 import re
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Dict, Iterable
 from uuid import uuid4
 
+from pymongo import IndexModel, ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
 from app.core.database import PydanticObjectId
 from app.core.enums import Collection
-from app.core.repository import BaseRepository
+from app.core.repository import BaseRepository, deferred
 from app.core.security import get_refresh_token, get_password_hash
 from app.users.enums import UserRole
 from app.users.models import User, UserMD, UserEmail, UserACL, ACLPassword
@@ -15,18 +18,63 @@ from app.users.schemas import CreateExpertDTO, UpdateUserDTO
 
 class UserRepository(BaseRepository):
     collection_name: Collection = Collection.USERS
+    indexes = [
+        # Experts are stored with phone null, only customers' phones are unique
+        IndexModel([("phone", ASCENDING)], unique=True, partialFilterExpression={"phone": {"$type": "string"}}),
+    ]
 
-    async def get_user_by_id(self, user_id: str) -> Optional[User]:
-        user_row = await self._db.find_one({"_id": PydanticObjectId(user_id)})
+    async def get_user_by_id(self, user_id: Optional[str], projection: Optional[dict] = None) -> Optional[User]:
+        """
+        :param projection: fields the caller needs, md is required by User
+        """
+        if not user_id:
+            return None
+        user_row = await self._find_by_id(user_id, projection)
         if not user_row:
             return None
         return User(**user_row)
 
+    async def get_users_by_ids(self, user_ids: Iterable[str], projection: Optional[dict] = None) -> Dict[str, User]:
+        """
+        Users of the identity map are taken from it, the other ones are read with one query
+        :param projection: fields the caller needs, md is required by User
+        :return: found users by id
+        """
+        users = {}
+        missing = []
+        for user_id in set(user_ids):
+            user_row = self._unit_of_work.get(self.collection_name.value, user_id)
+            if user_row is not None:
+                users[user_id] = User(**user_row)
+            else:
+                missing.append(PydanticObjectId(user_id))
+        if missing:
+            cursor = self._db.find({"_id": {"$in": missing}}, projection)
+            async for user_row in cursor:
+                if projection is None:
+                    self._remember(user_row)
+                users[str(user_row["_id"])] = User(**user_row)
+        return users
+
+    async def get_users_versions(self, user_ids: Iterable[str]) -> Dict[str, int]:
+        versions = {}
+        missing = []
+        for user_id in user_ids:
+            user_row = self._unit_of_work.get(self.collection_name.value, user_id)
+            if user_row is not None:
+                versions[user_id] = user_row.get("version", 0)
+            else:
+                missing.append(PydanticObjectId(user_id))
+        if missing:
+            cursor = self._db.find({"_id": {"$in": missing}}, {"version": 1})
+            versions.update({str(x["_id"]): x.get("version", 0) async for x in cursor})
+        return versions
+
     async def get_user_by_email(
             self,
             email: str,
     ) -> Optional[User]:
-        user_row = await self._db.find_one(
+        user_row = await self._find_one(
             {"email.value": re.compile(email, re.IGNORECASE)}
         )
         if not user_row:
@@ -37,46 +85,60 @@ class UserRepository(BaseRepository):
             self,
             phone: str,
     ) -> Optional[User]:
-        user_row = await self._db.find_one(
+        user_row = await self._find_one(
             {"phone": phone}
         )
         if not user_row:
             return None
         return User(**user_row)
 
-    async def update_user_code(self, phone: str, code: str):
-        await self._db.update_one({"phone": phone}, {"$set": {"acl.code": code}})
+    async def get_or_create_user_by_phone(self, phone: str, code: str) -> (User, bool):
+        """
+        Saves the sign in code of the customer and creates the customer if the phone is new, with one upsert
+        :param code: sign in code sent by SMS
+        :return: user and whether it was created
+        """
+        user_id = PydanticObjectId()
+        now = int(datetime.utcnow().timestamp())
+        update = {
+            "$set": {"acl.code": code},
+            "$inc": {"version": 1},
+            "$setOnInsert": {
+                "_id": user_id,
+                "md": UserMD(lmt=now, ect=now, role=UserRole.customer).dict(exclude_none=True),
+                "tokens": [],
+            },
+        }
+        self._forget({"phone": phone})
+        try:
+            user_row = await self._upsert_by_phone(phone, update)
+        except DuplicateKeyError:
+            # A concurrent request has inserted the same phone, the retry updates it
+            user_row = await self._upsert_by_phone(phone, update)
+        return User(**self._remember(user_row)), user_row["_id"] == user_id
 
-    async def get_or_create_user_by_phone(self, phone: str) -> (User, bool):
-        created = False
-        user = await self.get_user_by_phone(phone)
-        if not user:
-            user = await self._db.insert_one(
-                User(
-                    _id=PydanticObjectId(),
-                    phone=phone,
-                    md=UserMD(
-                        lmt=int(datetime.utcnow().timestamp()),
-                        ect=int(datetime.utcnow().timestamp()),
-                        role=UserRole.customer,
-                    )
-                ).dict(exclude_none=True)
-            )
-            user = await self._db.find_one({"_id": user.inserted_id})
-            user = User(**user)
-            created = True
-        return user, created
+    async def _upsert_by_phone(self, phone: str, update: dict) -> dict:
+        return await self._db.find_one_and_update(
+            {"phone": phone},
+            update,
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
 
+    @deferred
     async def add_refresh_token(self, phone: Optional[str] = None, email: Optional[str] = None) -> str:
+        """
+        The token is saved with the writes of the request before the response is sent
+        """
         if not phone and not email:
             raise Exception
         refresh_token = get_refresh_token()
-        await self._db.update_one(
-            {"$or": [
-                {"email.value": email},
-                {"phone": phone},
-            ]},
-            {"$push": {"tokens": {"value": refresh_token}}},
+        conditions = [{"email.value": email}] if email else []
+        if phone:
+            conditions.append({"phone": phone})
+        await self._defer(
+            {"$or": conditions},
+            {"$push": {"tokens": {"value": refresh_token}}, "$inc": {"version": 1}},
         )
         return refresh_token
 
@@ -85,34 +147,32 @@ class UserRepository(BaseRepository):
         if user:
             raise UserInDBAlreadyExistsException()
 
-        user = await self._db.insert_one(
-            User(
-                name=user_data.name,
-                email=UserEmail(value=user_data.email, accept=str(uuid4())),
-                acl=UserACL(
-                    password=ACLPassword(hash=get_password_hash(user_data.password))
-                ),
-                md=UserMD(
-                    lmt=int(datetime.utcnow().timestamp()),
-                    ect=int(datetime.utcnow().timestamp()),
-                    role=UserRole.expert,
-                ),
-            ).dict()
-        )
-        new_user = await self._db.find_one({"_id": user.inserted_id})
-        return User(**new_user)
+        user_row = User(
+            name=user_data.name,
+            email=UserEmail(value=user_data.email, accept=str(uuid4())),
+            acl=UserACL(
+                password=ACLPassword(hash=get_password_hash(user_data.password))
+            ),
+            md=UserMD(
+                lmt=int(datetime.utcnow().timestamp()),
+                ect=int(datetime.utcnow().timestamp()),
+                role=UserRole.expert,
+            ),
+        ).dict()
+        self._forget()
+        await self._db.insert_one(user_row)
+        return User(**self._remember(user_row))
 
     async def confirm_email_by_code(self, code: str) -> User:
-        user = await self._db.find_one({"email.accept": code})
+        user = self._remember(await self._db.find_one({"email.accept": code}))
         if not user:
             raise UserInDBNotFoundException()
-        await self._db.update_one(
-            {"email.accept": code}, {"$set": {"email.confirmed": True}}
-        )
-        return User(**user)
+        response = User(**user)
+        await self._defer({"_id": user["_id"]}, {"$set": {"email.confirmed": True}, "$inc": {"version": 1}})
+        return response
 
     async def get_by_refresh_token(self, token: str) -> Optional[User]:
-        user_row = await self._db.find_one({"tokens": {"$elemMatch": {"value": token}}})
+        user_row = self._remember(await self._db.find_one({"tokens": {"$elemMatch": {"value": token}}}))
 
         if not user_row:
             raise UserInDBNotFoundException()
@@ -122,18 +182,34 @@ class UserRepository(BaseRepository):
             self,
             user: User,
             user_dto: UpdateUserDTO,
-    ):
-        update_dict = user_dto.dict(exclude_unset=True)
-        if "name" in update_dict:
-            user.name = user_dto.name
-        if "phone" in update_dict:
-            user.phone = user_dto.phone
-        if "email" in update_dict:
-            user.email.value = user_dto.email
-        if "rating" in update_dict:
-            user.rating = user_dto.rating
-        await self._db.update_one(
-            {"_id": PydanticObjectId(user.id)}, {"$set": user.dict()}
+            expected_version: Optional[int] = None,
+    ) -> Optional[User]:
+        """
+        Sets only the fields of user_dto that differ from the user, without a write if none does
+        :param expected_version: the update is applied only if the stored user has this version
+        :return: updated user, None if the stored version differs from expected_version
+        """
+        changes = {}
+        for field, value in user_dto.dict(exclude_unset=True).items():
+            if field != "email":
+                if value != getattr(user, field):
+                    changes[field] = value
+            elif user.email is None:
+                changes["email"] = UserEmail(value=value).dict()
+            elif value != user.email.value:
+                changes["email.value"] = value
+        if not changes:
+            return user if expected_version in (None, user.version) else None
+
+        query = {"_id": PydanticObjectId(user.id)}
+        if expected_version is not None:
+            query["version"] = expected_version
+        self._forget({"_id": PydanticObjectId(user.id)})
+        user_row = await self._db.find_one_and_update(
+            query,
+            {"$set": changes, "$inc": {"version": 1}},
+            return_document=ReturnDocument.AFTER,
         )
-        updated_user = await self._db.find_one({"_id": PydanticObjectId(user.id)})
-        return User(**updated_user)
+        if not user_row:
+            return None
+        return User(**self._remember(user_row))
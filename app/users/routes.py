@@ -1,14 +1,18 @@
 from fastapi import APIRouter, Depends, Body, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi_jwt_auth import AuthJWT
+from starlette.requests import Request
 
-from app.core.security import generate_code, verify_password
+from app.core.etag import make_etag, is_not_modified, not_modified_response, is_precondition_failed
+from app.core.metrics import track_background_task
+from app.core.security import verify_password
 from app.services.mail_service.mail_service import MailService
 from app.services.sms_service.sms_service import SMSService
 from app.users.auth import get_current_user
 from app.users.enums import UserRole
 from app.users.exceptions import InvalidCodeException, UserAlreadyExistsException, InvalidEmailOrPasswordException, \
-    UserWithoutPasswordException, EmailNotConfirmedException, InvalidConfirmEmailException, UserNotFoundException
+    UserWithoutPasswordException, EmailNotConfirmedException, InvalidConfirmEmailException, UserNotFoundException, \
+    UserVersionConflictException
 from app.users.models import User
 from app.users.repositories.exceptions import UserInDBAlreadyExistsException, UserInDBNotFoundException
 from app.users.repositories.user import UserRepository
@@ -36,8 +40,14 @@ user_router = APIRouter(tags=['user'], prefix="/user")
     response_model_by_alias=True
 )
 async def get_current_user_profile(
+        request: Request,
+        response: Response,
         user: User = Depends(get_current_user),
 ) -> UserFullResponse:
+    etag = make_etag(str(user.id), user.version)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    response.headers["ETag"] = etag
     return UserFullResponse.from_model(user)
 
 
@@ -48,8 +58,9 @@ async def auth_customer(
         user_auth: CustomerAuthRequest = Body(...),
         user_repository: UserRepository = Depends(),
 ):
-    user, created = await user_repository.get_or_create_user_by_phone(phone=user_auth.phone)
-    background_tasks.add_task(sms_service.send_sms, user.phone, generate_code())
+    code = sms_service.get_code(user_auth.phone)
+    user, created = await user_repository.get_or_create_user_by_phone(phone=user_auth.phone, code=code)
+    background_tasks.add_task(track_background_task(sms_service.send_sms), user.phone, code)
     return CustomerAuthResponse(
         data="Код для входа был отправлен по смс",
         created=created,
@@ -87,7 +98,11 @@ async def create_expert(
     except UserInDBAlreadyExistsException:
         raise UserAlreadyExistsException()
 
-    background_tasks.add_task(mail_service.send_verification_message, new_user.email.value, new_user.email.accept)
+    background_tasks.add_task(
+        track_background_task(mail_service.send_verification_message),
+        new_user.email.value,
+        new_user.email.accept,
+    )
 
     return ExpertResponse.from_model(user=new_user)
 
@@ -155,12 +170,21 @@ async def refresh_token(
     response_model_exclude_none=True,
 )
 async def update_user(
+        request: Request,
+        response: Response,
         user: User = Depends(get_current_user),
         user_repository: UserRepository = Depends(),
         update_user_request: UpdateUserRequest = Body(),
 ):
+    # If-Match with the ETag of the profile makes the update conditional on its version
+    if is_precondition_failed(request, make_etag(str(user.id), user.version)):
+        raise UserVersionConflictException()
     user = await user_repository.update_user(
         user=user,
-        user_dto=UpdateUserDTO(**update_user_request.dict(exclude_none=True))
+        user_dto=UpdateUserDTO(**update_user_request.dict(exclude_none=True)),
+        expected_version=user.version if "if-match" in request.headers else None,
     )
+    if user is None:
+        raise UserVersionConflictException()
+    response.headers["ETag"] = make_etag(str(user.id), user.version)
     return UserFullResponse.from_model(user).dict(exclude_none=True, by_alias=True)
@@ -0,0 +1,33 @@
+"""
+Microbenchmarks of hot paths, runnable offline:
+
+    python -m benchmarks run -o benchmarks/baselines/main.json
+    python -m benchmarks run -o current.json
+    python -m benchmarks compare benchmarks/baselines/main.json current.json
+
+Settings required by the app are filled with placeholders unless set in the environment,
+nothing connects to Mongo or external services, app benchmarks run on the memory storage backend.
+"""
+import os
+
+for _name, _value in {
+    "ENVIRONMENT": "benchmark",
+    "MONGO_URL": "mongodb://localhost:27017",
+    "MONGO_INITDB_DATABASE": "benchmark",
+    "JWT_SECRET_KEY": "benchmark",
+    "API_KEY": "benchmark",
+    "S3_ACCESS_KEY": "benchmark",
+    "S3_SECRET_ACCESS_KEY": "benchmark",
+    "S3_BUCKET": "benchmark",
+    "SMSC_LOGIN": "benchmark",
+    "SMSC_PASS": "benchmark",
+    "SMSC_SENDER": "benchmark",
+    "EMAIL_FROM": "benchmark@example.com",
+    "EMAIL_PASSWORD": "benchmark",
+    "EMAIL_SERVER": "localhost",
+    "LOG_LEVEL": "WARNING",
+    "STORAGE_BACKEND": "memory",
+    "ACCESS_LOG": "false",
+    "LOOP_MONITOR": "false",
+}.items():
+    os.environ.setdefault(_name, _value)
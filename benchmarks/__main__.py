@@ -0,0 +1,43 @@
+import argparse
+import json
+import sys
+
+from benchmarks.runner import run, compare
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run benchmarks and print results as json")
+    run_parser.add_argument("-k", "--filter", default="", help="run benchmarks with the substring in name")
+    run_parser.add_argument("-o", "--output", help="file to store results, e.g. a new baseline")
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument("--min-time", type=float, default=0.2, help="seconds per repeat")
+
+    compare_parser = commands.add_parser("compare", help="compare results with the baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="slowdown treated as regression")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        results = run(pattern=args.filter, repeat=args.repeat, min_time=args.min_time)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+        else:
+            print(json.dumps(results, indent=2, sort_keys=True))
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    report, regressions = compare(baseline, current, threshold=args.threshold)
+    print(report)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
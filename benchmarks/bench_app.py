@@ -0,0 +1,50 @@
+import asyncio
+
+import httpx
+from fastapi_jwt_auth import AuthJWT
+
+import app.core.database
+from app.app import create_app
+from app.orders.enums import OrderStatus
+from app.settings import settings
+from app.users.enums import UserRole
+from benchmarks.data import user_row, order_row
+from benchmarks.runner import benchmark
+
+
+def _app_request(method: str, url: str, orders: int = 50, **kwargs):
+    """
+    Starts the app on the memory storage backend with a customer and an expert sharing `orders` orders
+    :return: callable sending the request of the customer through the ASGI transport
+    """
+    loop = asyncio.new_event_loop()
+    application = create_app()
+
+    async def setup() -> httpx.AsyncClient:
+        await application.router.startup()
+        db = app.core.database.mongo_client[settings.MONGO_INITDB_DATABASE]
+        customer, expert = user_row(role=UserRole.customer), user_row(role=UserRole.expert)
+        await db.users.insert_many([customer, expert])
+        await db.orders.insert_many([
+            {**order_row(customer=str(customer["_id"]), expert=str(expert["_id"])), "seq": i, "status": status}
+            for i, status in zip(range(orders), [OrderStatus.handling, OrderStatus.published] * orders)
+        ])
+        token = AuthJWT().create_access_token(subject=customer["phone"])
+        return httpx.AsyncClient(
+            app=application,
+            base_url="http://benchmark",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+
+    client = loop.run_until_complete(setup())
+    return lambda: loop.run_until_complete(client.request(method, url, **kwargs))
+
+
+@benchmark("app.get_self_orders_50")
+def get_self_orders():
+    return _app_request("GET", "/orders/self/", params={"limit": 50})
+
+
+@benchmark("app.get_profile")
+def get_profile():
+    return _app_request("GET", "/user/")
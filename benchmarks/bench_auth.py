@@ -0,0 +1,39 @@
+from fastapi import UploadFile
+from fastapi_jwt_auth import AuthJWT
+
+from app.app import get_config  # noqa: F401, loads JWT settings
+from app.core.security import generate_code
+from app.services.s3_service.service import S3Service
+from benchmarks.runner import benchmark
+
+
+@benchmark("auth.jwt_create")
+def jwt_create():
+    authorize = AuthJWT()
+    return lambda: authorize.create_access_token(subject="79100000000")
+
+
+@benchmark("auth.jwt_verify")
+def jwt_verify():
+    authorize = AuthJWT()
+    token = authorize.create_access_token(subject="79100000000")
+    return lambda: authorize.get_raw_jwt(token)
+
+
+@benchmark("auth.generate_code")
+def generate_code_():
+    return generate_code
+
+
+@benchmark("s3.guess_extension_by_content_type")
+def guess_extension_by_content_type():
+    service = S3Service()
+    upload_file = UploadFile(filename="contract.pdf", content_type="application/pdf")
+    return lambda: service.guess_extension(upload_file)
+
+
+@benchmark("s3.guess_extension_by_filename")
+def guess_extension_by_filename():
+    service = S3Service()
+    upload_file = UploadFile(filename="contract.docx", content_type="application/octet-stream")
+    return lambda: service.guess_extension(upload_file)
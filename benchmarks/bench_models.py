@@ -0,0 +1,30 @@
+from app.orders.models import Order
+from app.users.enums import UserRole
+from app.users.models import User
+from app.users.schemas import UserFullResponse
+from benchmarks.data import user_row, order_row
+from benchmarks.runner import benchmark
+
+
+@benchmark("models.user_from_row")
+def user_from_row():
+    row = user_row()
+    return lambda: User(**row)
+
+
+@benchmark("models.user_from_row_100_tokens")
+def user_from_row_100_tokens():
+    row = user_row(tokens=100)
+    return lambda: User(**row)
+
+
+@benchmark("models.order_from_row")
+def order_from_row():
+    row = order_row(customer="customer", expert="expert")
+    return lambda: Order(**row)
+
+
+@benchmark("schemas.user_full_response_from_model")
+def user_full_response_from_model():
+    user = User(**user_row(role=UserRole.expert))
+    return lambda: UserFullResponse.from_model(user)
@@ -0,0 +1,63 @@
+import json
+from typing import Dict, Iterable, Optional
+
+from fastapi.encoders import jsonable_encoder
+
+from app.core.log_config import json_dumps
+from app.orders.models import Order
+from app.orders.serializer import OrderSerializer
+from app.users.enums import UserRole
+from app.users.models import User
+from benchmarks.data import user_row, order_row
+from benchmarks.runner import benchmark, run_async
+
+
+class StubUserRepository:
+    """
+    Returns users from memory, so only the serialization is measured
+    """
+
+    def __init__(self, *users: User):
+        self._users = {str(x.id): x for x in users}
+
+    async def get_user_by_id(self, user_id: str, projection: Optional[dict] = None) -> Optional[User]:
+        return self._users.get(user_id)
+
+    async def get_users_by_ids(self, user_ids: Iterable[str], projection: Optional[dict] = None) -> Dict[str, User]:
+        return {x: self._users[x] for x in user_ids if x in self._users}
+
+
+def _orders_page(count: int = 50):
+    customer = User(**user_row(role=UserRole.customer))
+    expert = User(**user_row(role=UserRole.expert))
+    orders = [Order(**order_row(customer=str(customer.id), expert=str(expert.id))) for _ in range(count)]
+    return OrderSerializer(user_repository=StubUserRepository(customer, expert)), orders
+
+
+@benchmark("serializer.get_orders_response_50")
+def get_orders_response():
+    serializer, orders = _orders_page()
+    return run_async(lambda: serializer.get_orders_response(orders, total=1000, limit=50, offset=0))
+
+
+def _response():
+    serializer, orders = _orders_page()
+    return run_async(lambda: serializer.get_orders_response(orders, total=1000, limit=50, offset=0))()
+
+
+@benchmark("encoding.jsonable_encoder_50")
+def encode_jsonable_encoder():
+    response = _response()
+    return lambda: json.dumps(jsonable_encoder(response, exclude_none=True, by_alias=True))
+
+
+@benchmark("encoding.model_json_50")
+def encode_model_json():
+    response = _response()
+    return lambda: response.json(exclude_none=True, by_alias=True)
+
+
+@benchmark("encoding.model_dict_json_dumps_50")
+def encode_model_dict():
+    response = _response()
+    return lambda: json_dumps(response.dict(exclude_none=True, by_alias=True), default=str)
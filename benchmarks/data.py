@@ -0,0 +1,46 @@
+import itertools
+
+from bson import ObjectId
+
+from app.orders.enums import OrderStatus
+from app.users.enums import UserRole
+
+# phones are unique among users
+_phones = itertools.count(79100000000)
+
+
+def user_row(role: UserRole = UserRole.customer, tokens: int = 10) -> dict:
+    """
+    :return: users document as stored in Mongo
+    """
+    return {
+        "_id": ObjectId(),
+        "name": "Benchmark User",
+        "phone": str(next(_phones)),
+        "email": {"value": "user@example.com", "confirmed": True},
+        "acl": {"password": {"hash": "$2b$12$" + "x" * 53}, "code": 1234},
+        "tokens": [{"value": f"{ObjectId()}{i}"} for i in range(tokens)],
+        "rating": 4.5,
+        "md": {"lmt": "1640995200", "ect": "1640995200", "role": role},
+        "version": 3,
+    }
+
+
+def order_row(customer: str, expert: str, images: int = 5) -> dict:
+    """
+    :return: orders document as stored in Mongo, text and images are kept in order_documents
+    """
+    return {
+        "_id": ObjectId(),
+        "status": OrderStatus.handling,
+        "customer": customer,
+        "expert": expert,
+        "name": "Benchmark order",
+        "description": "Check the contract " * 10,
+        "document": {
+            "input": {"file": "https://storage/input.pdf", "images_count": images},
+            "result": {"file": "https://storage/result.pdf", "images_count": 0},
+            "has_text": True,
+        },
+        "seq": 1,
+    }
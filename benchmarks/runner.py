@@ -0,0 +1,98 @@
+import asyncio
+import importlib
+import pkgutil
+import platform
+import statistics
+import sys
+import timeit
+from typing import Callable, Dict, Any, List, Tuple
+
+# name -> setup function returning the callable to measure
+BENCHMARKS: Dict[str, Callable[[], Callable[[], Any]]] = {}
+
+
+def benchmark(name: str):
+    """
+    Registers the setup function of the benchmark, setup is not measured
+    """
+
+    def decorator(setup):
+        if name in BENCHMARKS:
+            raise ValueError(f"Benchmark {name} already registered")
+        BENCHMARKS[name] = setup
+        return setup
+
+    return decorator
+
+
+def run_async(coroutine_function: Callable) -> Callable[[], Any]:
+    """
+    :return: callable running the coroutine in a loop reused between calls,
+    the loop overhead is included in the measurement
+    """
+    loop = asyncio.new_event_loop()
+    return lambda: loop.run_until_complete(coroutine_function())
+
+
+def load() -> None:
+    import benchmarks
+    for module in pkgutil.iter_modules(benchmarks.__path__):
+        if module.name.startswith("bench_"):
+            importlib.import_module(f"benchmarks.{module.name}")
+
+
+def measure(func: Callable[[], Any], repeat: int = 5, min_time: float = 0.2) -> dict:
+    """
+    :return: timings of one call in microseconds
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(int(number * min_time / 0.2), 1)
+    times = [x / number * 1e6 for x in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "min_us": round(min(times), 3),
+        "median_us": round(statistics.median(times), 3),
+        "stdev_us": round(statistics.stdev(times), 3) if len(times) > 1 else 0,
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def run(pattern: str = "", repeat: int = 5, min_time: float = 0.2) -> dict:
+    load()
+    results = {}
+    for name, setup in sorted(BENCHMARKS.items()):
+        if pattern not in name:
+            continue
+        results[name] = measure(setup(), repeat=repeat, min_time=min_time)
+        print(f"{name:<50} {results[name]['min_us']:>12.2f} us", file=sys.stderr)
+    return {
+        "machine": {"python": platform.python_version(), "platform": platform.platform()},
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> Tuple[str, List[str]]:
+    """
+    Compares min timings, which are the least affected by noise
+    :param threshold: relative slowdown reported as regression, e.g. 0.1 for 10%
+    :return: report table and names of regressed benchmarks
+    """
+    lines = [f"{'benchmark':<50} {'baseline us':>12} {'current us':>12} {'change':>8}"]
+    regressions = []
+    names = sorted(set(baseline["results"]) | set(current["results"]))
+    for name in names:
+        old = baseline["results"].get(name)
+        new = current["results"].get(name)
+        if old is None or new is None:
+            lines.append(f"{name:<50} {old['min_us'] if old else '-':>12} {new['min_us'] if new else '-':>12}")
+            continue
+        change = new["min_us"] / old["min_us"] - 1
+        mark = ""
+        if change > threshold:
+            regressions.append(name)
+            mark = " !"
+        lines.append(f"{name:<50} {old['min_us']:>12.2f} {new['min_us']:>12.2f} {change:>+8.1%}{mark}")
+    if baseline.get("machine") != current.get("machine"):
+        lines.append("Results were taken on different machines")
+    return "\n".join(lines), regressions
@@ -0,0 +1,19 @@
+"""
+Load test of customer and expert flows with fake S3, SMSC and SMTP servers started in process.
+
+In process, the app from create_app() is driven through the httpx ASGI transport
+and connects to MONGO_URL (a local mongod by default):
+
+    python -m loadtest --customers 20 --experts 5 --orders 10
+
+Against a running server, start the server with the settings printed by
+`python -m loadtest settings --fakes-port 9025`, then run the load test, which serves the fakes on that port:
+
+    python -m loadtest --url http://0.0.0.0:8008 --fakes-port 9025 --customers 20 --experts 5
+
+Traffic captured by the app with TRAFFIC_CAPTURE_FILE is replayed in process or against a running server
+at the given speed-up, then latency percentiles of two replays, or of a capture and a replay, are compared:
+
+    python -m loadtest replay capture.ndjson --url http://staging:8008 --speed 10 -o build-a.json --token expert=...
+    python -m loadtest compare build-a.json build-b.json
+"""
@@ -0,0 +1,186 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from contextlib import asynccontextmanager
+from typing import Dict
+
+import httpx
+
+from loadtest.fakes import FakeServices
+from loadtest.replay import load_capture, replay, load_summary
+from loadtest.scenarios import Session, StepFailed, customer_flow, expert_flow
+from loadtest.stats import Recorder, format_summary, compare_summaries
+
+# Settings the app requires, not used by the load test
+PLACEHOLDER_SETTINGS = {
+    "MONGO_URL": "mongodb://localhost:27017",
+    "MONGO_INITDB_DATABASE": "loadtest",
+    "JWT_SECRET_KEY": "loadtest",
+    "API_KEY": "loadtest",
+    "S3_ACCESS_KEY": "loadtest",
+    "S3_SECRET_ACCESS_KEY": "loadtest",
+    "SMSC_LOGIN": "loadtest",
+    "SMSC_PASS": "loadtest",
+    "SMSC_SENDER": "loadtest",
+    "EMAIL_FROM": "loadtest@example.com",
+    "EMAIL_PASSWORD": "loadtest",
+    "LOG_LEVEL": "WARNING",
+    "ACCESS_LOG": "false",
+}
+
+
+@asynccontextmanager
+async def get_client(url: str, fakes: FakeServices):
+    if url:
+        async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+            yield client
+        return
+
+    # In process the app reads settings at import
+    os.environ.update(fakes.settings())
+    for name, value in PLACEHOLDER_SETTINGS.items():
+        os.environ.setdefault(name, value)
+    from asgi_lifespan import LifespanManager
+    from app.app import create_app
+
+    app = create_app()
+    async with LifespanManager(app), httpx.AsyncClient(app=app, base_url="http://loadtest", timeout=60) as client:
+        yield client
+
+
+async def run_flow(flow, *args) -> None:
+    try:
+        await flow(*args)
+    except StepFailed:
+        pass
+
+
+async def run(args) -> dict:
+    fakes = FakeServices(http_port=args.fakes_port).start()
+    run_id = random.Random(args.seed).randrange(10000)
+    try:
+        async with get_client(args.url, fakes) as client:
+            recorder = Recorder()
+            await asyncio.gather(
+                *[
+                    run_flow(customer_flow, Session(client, recorder), fakes, f"78{run_id:04d}{i:05d}", args.orders)
+                    for i in range(args.customers)
+                ],
+                *[
+                    run_flow(expert_flow, Session(client, recorder), fakes, f"expert{i}.{run_id}@loadtest.local",
+                             args.customers * args.orders // max(args.experts, 1))
+                    for i in range(args.experts)
+                ],
+            )
+            recorder.finish()
+    finally:
+        fakes.stop()
+    return recorder.summary()
+
+
+async def create_replay_users(run_id: int) -> Dict[str, str]:
+    """
+    Creates a customer and an expert in the database of the in process app
+    :return: access tokens per role
+    """
+    from fastapi_jwt_auth import AuthJWT
+    from app.core.database import get_database
+    from app.users.enums import UserRole
+    from app.users.models import User, UserMD, UserEmail
+
+    db = await get_database()
+    now = str(int(time.time()))
+    customer = User(phone=f"77{run_id:04d}00000", md=UserMD(lmt=now, ect=now, role=UserRole.customer))
+    expert = User(
+        email=UserEmail(value=f"replay.{run_id}@loadtest.local", confirmed=True),
+        md=UserMD(lmt=now, ect=now, role=UserRole.expert),
+    )
+    await db.users.insert_many([customer.dict(exclude_none=True), expert.dict(exclude_none=True)])
+    return {
+        UserRole.customer.value: AuthJWT().create_access_token(subject=customer.phone),
+        UserRole.expert.value: AuthJWT().create_access_token(subject=expert.email.value),
+    }
+
+
+async def run_replay(args) -> dict:
+    entries = load_capture(args.files[0])
+    fakes = FakeServices(http_port=args.fakes_port).start()
+    try:
+        async with get_client(args.url, fakes) as client:
+            tokens = dict(x.split("=", 1) for x in args.token)
+            if not args.url:
+                tokens = {**await create_replay_users(random.Random(args.seed).randrange(10000)), **tokens}
+            summary, skipped = await replay(
+                client,
+                entries,
+                tokens=tokens,
+                speed=args.speed,
+                concurrency=args.concurrency,
+                writes=args.writes,
+            )
+    finally:
+        fakes.stop()
+    summary["skipped"] = skipped
+    return summary
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m loadtest")
+    parser.add_argument("command", nargs="?", choices=["run", "settings", "replay", "compare"], default="run")
+    parser.add_argument("files", nargs="*", help="capture file to replay, or baseline and current summaries to compare")
+    parser.add_argument("--url", help="running server, by default the app is driven in process")
+    parser.add_argument("--customers", type=int, default=10, help="concurrent customers")
+    parser.add_argument("--experts", type=int, default=3, help="concurrent experts")
+    parser.add_argument("--orders", type=int, default=5, help="orders per customer")
+    parser.add_argument("--fakes-port", type=int, default=0, help="port of fake SMSC and S3, SMTP on the next one")
+    parser.add_argument("--seed", type=int, help="seed of phones and emails, random by default")
+    parser.add_argument("-o", "--output", help="file to store the summary as json")
+    replay_group = parser.add_argument_group("replay")
+    replay_group.add_argument("--speed", type=float, default=1, help="speed-up of the captured traffic, 0 for no pauses")
+    replay_group.add_argument("--concurrency", type=int, default=100, help="requests in flight at most")
+    replay_group.add_argument("--writes", action="store_true", help="replay captured writes without body too")
+    replay_group.add_argument("--token", action="append", default=[], help="access token of a role, e.g. expert=...")
+    compare_group = parser.add_argument_group("compare")
+    compare_group.add_argument("--threshold", type=float, default=0.1, help="p90 growth treated as regression")
+    args = parser.parse_args()
+
+    if args.command == "settings":
+        if not args.fakes_port:
+            parser.error("--fakes-port is required to print settings")
+        fakes = FakeServices(http_port=args.fakes_port)
+        print("\n".join(f"{name}={value}" for name, value in fakes.settings().items()))
+        fakes.stop()
+        return 0
+
+    if args.command == "compare":
+        if len(args.files) != 2:
+            parser.error("compare requires baseline and current summaries or capture files")
+        report, regressions = compare_summaries(
+            load_summary(args.files[0]),
+            load_summary(args.files[1]),
+            threshold=args.threshold,
+        )
+        print(report)
+        return 1 if regressions else 0
+
+    if args.command == "replay":
+        if len(args.files) != 1:
+            parser.error("replay requires the capture file")
+        summary = asyncio.run(run_replay(args))
+        if summary["skipped"]:
+            print("skipped " + ", ".join(f"{reason}: {count}" for reason, count in summary["skipped"].items()))
+    else:
+        summary = asyncio.run(run(args))
+    print(format_summary(summary))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+import re
+import socketserver
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Optional
+from urllib.parse import urlparse, parse_qs
+
+BUCKET = "loadtest"
+
+
+class Inbox:
+    """
+    Codes received by fake services per recipient, waited by scenarios
+    """
+
+    def __init__(self):
+        self._codes: Dict[str, str] = {}
+        self._condition = threading.Condition()
+
+    def put(self, recipient: str, code: str) -> None:
+        with self._condition:
+            self._codes[recipient] = code
+            self._condition.notify_all()
+
+    def wait(self, recipient: str, timeout: float) -> Optional[str]:
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while recipient not in self._codes:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+            return self._codes.pop(recipient)
+
+
+class _HTTPHandler(BaseHTTPRequestHandler):
+    """
+    SMSC send.php and S3 PutObject
+    """
+    protocol_version = "HTTP/1.1"
+    sms: Inbox
+    uploaded_bytes = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, body: bytes = b"", headers: Optional[dict] = None) -> None:
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/sys/send.php":
+            self._reply(404)
+            return
+        query = parse_qs(url.query)
+        code = re.search(r"\d{4}", query.get("mes", [""])[0])
+        if code:
+            self.sms.put(query["phones"][0], code.group())
+        self._reply(200, b"OK - 1 SMS, ID - 1")
+
+    def do_PUT(self):
+        length = int(self.headers.get("Content-Length", 0))
+        _HTTPHandler.uploaded_bytes += len(self.rfile.read(length))
+        self._reply(200, headers={"ETag": '"fake"'})
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """
+    Plain SMTP with AUTH PLAIN, confirmation codes of messages go to the inbox
+    """
+    mail: Inbox
+
+    def _send(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self._send("220 fake ESMTP")
+        recipients = []
+        while line := self.rfile.readline():
+            command = line.decode(errors="replace").strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb in ("EHLO", "HELO"):
+                self._send("250-fake")
+                self._send("250 AUTH PLAIN")
+            elif verb == "AUTH":
+                self._send("235 Authentication successful")
+            elif verb == "MAIL":
+                recipients = []
+                self._send("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command.split(":", 1)[1].strip(" <>"))
+                self._send("250 OK")
+            elif verb == "DATA":
+                self._send("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                while (data_line := self.rfile.readline()) not in (b".\r\n", b".\n", b""):
+                    data.append(data_line.decode(errors="replace"))
+                code = re.search(r"register-confirm/([\w-]+)/", "".join(data))
+                if code:
+                    for recipient in recipients:
+                        self.mail.put(recipient, code.group(1))
+                self._send("250 OK")
+            elif verb == "QUIT":
+                self._send("221 Bye")
+                return
+            else:
+                self._send("250 OK")
+
+
+class _SMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeServices:
+    """
+    Fake SMSC and S3 on `http_port` and SMTP on `http_port + 1`, 0 picks free ports
+    """
+
+    def __init__(self, host: str = "127.0.0.1", http_port: int = 0):
+        self.sms = Inbox()
+        self.mail = Inbox()
+        http_handler = type("HTTPHandler", (_HTTPHandler,), {"sms": self.sms})
+        smtp_handler = type("SMTPHandler", (_SMTPHandler,), {"mail": self.mail})
+        self._http = ThreadingHTTPServer((host, http_port), http_handler)
+        self._http.daemon_threads = True
+        smtp_port = http_port + 1 if http_port else 0
+        self._smtp = _SMTPServer((host, smtp_port), smtp_handler)
+        self.host = host
+        self._started = False
+
+    @property
+    def http_url(self) -> str:
+        return f"http://{self.host}:{self._http.server_address[1]}"
+
+    @property
+    def smtp_server(self) -> str:
+        return f"{self.host}:{self._smtp.server_address[1]}"
+
+    def settings(self) -> Dict[str, str]:
+        """
+        :return: environment of the app to use the fakes
+        """
+        return {
+            "ENVIRONMENT": "loadtest",
+            "S3_ENDPOINT": self.http_url,
+            "S3_BUCKET": BUCKET,
+            "SMSC_URL": f"{self.http_url}/sys/send.php",
+            "EMAIL_SERVER": self.smtp_server,
+            "EMAIL_USE_SSL": "false",
+        }
+
+    def start(self) -> "FakeServices":
+        for server in (self._http, self._smtp):
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        self._started = True
+        return self
+
+    def stop(self) -> None:
+        for server in (self._http, self._smtp):
+            if self._started:
+                server.shutdown()
+            server.server_close()
@@ -0,0 +1,124 @@
+import asyncio
+import json
+import time
+from typing import List, Dict, Optional, Tuple
+
+import httpx
+
+from loadtest.stats import Recorder
+
+MASK = "*"
+READ_METHODS = ("GET", "HEAD")
+
+
+def load_capture(path: str) -> List[dict]:
+    """
+    :return: captured requests ordered by time
+    """
+    with open(path) as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    return sorted(entries, key=lambda x: x["ts"])
+
+
+def step_name(entry: dict) -> str:
+    return f"{entry['method']} {entry['route']}"
+
+
+def build_request(entry: dict, tokens: Dict[str, str], writes: bool) -> Tuple[Optional[dict], Optional[str]]:
+    """
+    :return: arguments of httpx request, or None and the reason the entry can not be replayed
+    """
+    if entry.get("route") is None:
+        return None, "unmatched"
+    if MASK in entry["path_params"].values():
+        return None, "sanitized"
+    if entry.get("body_size"):
+        # bodies are not captured
+        return None, "body"
+    if entry["method"] not in READ_METHODS and not writes:
+        return None, "write"
+    headers = {}
+    if entry.get("role"):
+        if entry["role"] not in tokens:
+            return None, "no_token"
+        headers["Authorization"] = f"Bearer {tokens[entry['role']]}"
+    return {
+        "method": entry["method"],
+        "url": entry["route"].format(**entry["path_params"]),
+        "params": [(name, value) for name, value in entry["query"] if value != MASK],
+        "headers": headers,
+    }, None
+
+
+async def replay(
+        client: httpx.AsyncClient,
+        entries: List[dict],
+        tokens: Dict[str, str],
+        speed: float,
+        concurrency: int,
+        writes: bool = False,
+) -> Tuple[dict, Dict[str, int]]:
+    """
+    Reissues captured requests keeping their relative time divided by speed, speed 0 replays without pauses.
+    Responses with status 400 and above are counted as errors.
+    :return: summary of the replay and counts of skipped entries per reason
+    """
+    recorder = Recorder()
+    skipped: Dict[str, int] = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(step: str, request: dict) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.request(**request)
+            except httpx.HTTPError as e:
+                recorder.add(step, time.perf_counter() - start, error=type(e).__name__)
+                return
+            duration = time.perf_counter() - start
+            recorder.add(step, duration, error=str(response.status_code) if response.status_code >= 400 else None)
+
+    tasks = []
+    started = time.perf_counter()
+    for entry in entries:
+        request, reason = build_request(entry, tokens, writes)
+        if request is None:
+            skipped[reason] = skipped.get(reason, 0) + 1
+            continue
+        if speed > 0:
+            delay = (entry["ts"] - entries[0]["ts"]) / speed - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(step_name(entry), request)))
+    await asyncio.gather(*tasks)
+    recorder.finish()
+    return recorder.summary(), skipped
+
+
+def capture_summary(entries: List[dict]) -> dict:
+    """
+    :return: latencies measured by the captured build in the format of a replay summary
+    """
+    recorder = Recorder()
+    for entry in entries:
+        if entry.get("route") is None:
+            continue
+        error = str(entry["status"]) if entry["status"] >= 400 else None
+        recorder.add(step_name(entry), entry["duration_ms"] / 1000, error=error)
+    if entries:
+        recorder.start, recorder.end = entries[0]["ts"], max(entries[-1]["ts"], entries[0]["ts"] + 1)
+    return recorder.summary()
+
+
+def load_summary(path: str) -> dict:
+    """
+    :return: summary stored by a load test or replay, or computed from a capture file
+    """
+    with open(path) as f:
+        try:
+            summary = json.load(f)
+        except json.JSONDecodeError:
+            summary = None
+    if isinstance(summary, dict) and "steps" in summary:
+        return summary
+    return capture_summary(load_capture(path))
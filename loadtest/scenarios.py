@@ -0,0 +1,138 @@
+import asyncio
+import time
+from typing import Optional, Iterable
+
+import httpx
+
+from loadtest.fakes import FakeServices
+from loadtest.stats import Recorder
+
+DELIVERY_TIMEOUT = 30  # seconds to wait for SMS and email sent in background tasks
+PDF = b"%PDF-1.4\n" + b"0" * 100000
+
+
+class StepFailed(Exception):
+    pass
+
+
+class Session:
+    """
+    Client of one virtual user, every call is recorded as a step
+    """
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder):
+        self.client = client
+        self.recorder = recorder
+        self.headers = {}
+
+    async def call(
+            self,
+            step: str,
+            method: str,
+            url: str,
+            expected: Iterable[int] = (200,),
+            **kwargs,
+    ) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+        except httpx.HTTPError as e:
+            self.recorder.add(step, time.perf_counter() - start, error=type(e).__name__)
+            raise StepFailed(step)
+        duration = time.perf_counter() - start
+        if response.status_code not in expected:
+            self.recorder.add(step, duration, error=str(response.status_code))
+            raise StepFailed(step)
+        self.recorder.add(step, duration)
+        return response
+
+    async def wait_code(self, step: str, inbox, recipient: str) -> str:
+        """
+        Waits for the code sent to the recipient by a background task of the app
+        """
+        start = time.perf_counter()
+        code = await asyncio.get_running_loop().run_in_executor(None, inbox.wait, recipient, DELIVERY_TIMEOUT)
+        if code is None:
+            self.recorder.add(step, time.perf_counter() - start, error="timeout")
+            raise StepFailed(step)
+        self.recorder.add(step, time.perf_counter() - start)
+        return code
+
+    def authorize(self, access_token: str) -> None:
+        self.headers = {"Authorization": f"Bearer {access_token}"}
+
+
+async def customer_flow(session: Session, fakes: FakeServices, phone: str, orders: int) -> None:
+    """
+    Auth by SMS code, then create, fill and publish orders
+    """
+    await session.call("customer.auth", "POST", "/user/auth/customer/", json={"phone": phone})
+    code = await session.wait_code("customer.sms_delivery", fakes.sms, phone)
+    response = await session.call(
+        "customer.signin", "POST", "/user/signin/customer/", json={"phone": phone, "code": int(code)},
+    )
+    session.authorize(response.json()["access_token"])
+
+    for i in range(orders):
+        try:
+            response = await session.call(
+                "customer.create_order", "POST", "/orders/",
+                json={"name": f"Contract {i}", "description": "Check the contract"},
+            )
+            order_id = response.json()["id"]
+            await session.call(
+                "customer.upload_input", "POST", f"/orders/{order_id}/file/input/",
+                data={"fileType": "document"},
+                files={"file": ("contract.pdf", PDF, "application/pdf")},
+            )
+            await session.call("customer.confirm", "POST", f"/orders/{order_id}/confirm/")
+            await session.call("customer.self_orders", "GET", "/orders/self/", params={"limit": 20})
+        except StepFailed:
+            continue
+
+
+async def _accept_published(session: Session, attempts: int = 50) -> Optional[str]:
+    """
+    Browses published orders and accepts one, other experts may accept the same order first
+    """
+    for _ in range(attempts):
+        response = await session.call("expert.browse", "GET", "/orders/", params={"limit": 20})
+        for order in response.json()["items"]:
+            try:
+                await session.call("expert.accept", "POST", f"/orders/{order['id']}/accept/")
+            except StepFailed:
+                continue
+            return order["id"]
+        await asyncio.sleep(0.1)
+    return None
+
+
+async def expert_flow(session: Session, fakes: FakeServices, email: str, orders: int) -> None:
+    """
+    Sign up with email confirmation, then accept and complete published orders
+    """
+    password = "loadtest-password"
+    await session.call(
+        "expert.signup", "POST", "/user/signup/expert/",
+        json={"name": "Expert", "email": email, "password": password},
+    )
+    code = await session.wait_code("expert.mail_delivery", fakes.mail, email)
+    await session.call("expert.confirm_email", "GET", f"/user/register-confirm/{code}/")
+    response = await session.call(
+        "expert.signin", "POST", "/user/signin/expert/", json={"email": email, "password": password},
+    )
+    session.authorize(response.json()["access_token"])
+
+    for _ in range(orders):
+        try:
+            order_id = await _accept_published(session)
+            if order_id is None:
+                return
+            await session.call(
+                "expert.upload_result", "POST", f"/orders/{order_id}/file/result/",
+                data={"fileType": "document"},
+                files={"file": ("result.pdf", PDF, "application/pdf")},
+            )
+            await session.call("expert.complete", "POST", f"/orders/{order_id}/complete/")
+        except StepFailed:
+            continue
@@ -0,0 +1,98 @@
+import time
+from typing import Dict, List
+
+
+def percentile(values: List[float], share: float) -> float:
+    """
+    :return: nearest rank percentile of sorted values
+    """
+    if not values:
+        return 0.0
+    index = min(int(round(share * len(values) + 0.5)) - 1, len(values) - 1)
+    return values[max(index, 0)]
+
+
+class StepStats:
+
+    def __init__(self):
+        self.durations: List[float] = []
+        self.errors: Dict[str, int] = {}
+
+    def add(self, duration: float, error: str = None) -> None:
+        if error is None:
+            self.durations.append(duration)
+        else:
+            self.errors[error] = self.errors.get(error, 0) + 1
+
+
+class Recorder:
+    """
+    Latencies of successful calls and counts of errors per scenario step
+    """
+
+    def __init__(self):
+        self.steps: Dict[str, StepStats] = {}
+        self.start = time.perf_counter()
+        self.end = None
+
+    def add(self, step: str, duration: float, error: str = None) -> None:
+        self.steps.setdefault(step, StepStats()).add(duration, error)
+
+    def finish(self) -> None:
+        self.end = time.perf_counter()
+
+    def summary(self) -> dict:
+        elapsed = (self.end or time.perf_counter()) - self.start
+        steps = {}
+        for name, stats in self.steps.items():
+            durations = sorted(stats.durations)
+            steps[name] = {
+                "count": len(durations),
+                "errors": stats.errors,
+                "rps": round(len(durations) / elapsed, 2),
+                "p50_ms": round(percentile(durations, 0.5) * 1000, 1),
+                "p90_ms": round(percentile(durations, 0.9) * 1000, 1),
+                "p99_ms": round(percentile(durations, 0.99) * 1000, 1),
+                "max_ms": round(durations[-1] * 1000, 1) if durations else 0.0,
+            }
+        return {"elapsed_s": round(elapsed, 2), "steps": steps}
+
+
+def format_summary(summary: dict) -> str:
+    lines = [
+        f"{'step':<28} {'count':>7} {'errors':>7} {'rps':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}",
+    ]
+    for name, step in summary["steps"].items():
+        lines.append(
+            f"{name:<28} {step['count']:>7} {sum(step['errors'].values()):>7} {step['rps']:>8} "
+            f"{step['p50_ms']:>9} {step['p90_ms']:>9} {step['p99_ms']:>9} {step['max_ms']:>9}"
+        )
+    lines.append(f"elapsed {summary['elapsed_s']} s")
+    return "\n".join(lines)
+
+
+def compare_summaries(baseline: dict, current: dict, threshold: float = 0.1) -> (str, List[str]):
+    """
+    :param threshold: growth of p90 latency treated as regression
+    :return: report of latency percentiles per step and steps regressed
+    """
+    lines = [f"{'step':<40} {'count':>13} {'p50 ms':>21} {'p90 ms':>21} {'p99 ms':>21}"]
+    regressions = []
+    for name in sorted(set(baseline["steps"]) | set(current["steps"])):
+        old, new = baseline["steps"].get(name), current["steps"].get(name)
+        if old is None or new is None:
+            lines.append(f"{name:<40} {'only in ' + ('current' if old is None else 'baseline'):>13}")
+            continue
+        if not old["count"] or not new["count"]:
+            lines.append(f"{name:<40} {old['count']:>6}/{new['count']:<6} no successful requests to compare")
+            continue
+        columns = []
+        for key in ("p50_ms", "p90_ms", "p99_ms"):
+            change = (new[key] - old[key]) / old[key] if old[key] else 0.0
+            columns.append(f"{old[key]:>7} -> {new[key]:>7} {change:>+4.0%}")
+        if old["p90_ms"] and (new["p90_ms"] - old["p90_ms"]) / old["p90_ms"] > threshold:
+            regressions.append(name)
+        lines.append(f"{name:<40} {old['count']:>6}/{new['count']:<6} " + " ".join(columns))
+    if regressions:
+        lines.append(f"p90 regressed more than {threshold:.0%}: {', '.join(regressions)}")
+    return "\n".join(lines), regressions
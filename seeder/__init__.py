@@ -0,0 +1,32 @@
+"""
+Seeds the database with synthetic users and orders built by the test factories,
+for benchmarks of index builds, pagination and auth at production-like sizes:
+
+    python -m seeder --customers 1000000 --experts 20000 --orders 3000000 --seed 1 --drop
+
+Documents are generated in batches by a pool of processes and inserted with unordered insert_many.
+The content depends only on the seed and the counts, so repeated runs produce the same database
+and an interrupted run can be continued, already inserted documents are skipped.
+
+Settings not related to Mongo are filled with placeholders unless set in the environment.
+"""
+import os
+
+for _name, _value in {
+    "ENVIRONMENT": "DEV",
+    "MONGO_URL": "mongodb://localhost:27017",
+    "MONGO_INITDB_DATABASE": "app",
+    "JWT_SECRET_KEY": "seeder",
+    "API_KEY": "seeder",
+    "S3_ACCESS_KEY": "seeder",
+    "S3_SECRET_ACCESS_KEY": "seeder",
+    "S3_BUCKET": "seeder",
+    "SMSC_LOGIN": "seeder",
+    "SMSC_PASS": "seeder",
+    "SMSC_SENDER": "seeder",
+    "EMAIL_FROM": "seeder@example.com",
+    "EMAIL_PASSWORD": "seeder",
+    "EMAIL_SERVER": "localhost",
+    "LOG_LEVEL": "WARNING",
+}.items():
+    os.environ.setdefault(_name, _value)
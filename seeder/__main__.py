@@ -0,0 +1,129 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Optional, List, Tuple
+
+import pymongo
+from pymongo.database import Database
+from pymongo.errors import BulkWriteError
+
+from app.core.enums import Collection
+from app.orders.repositories.order import OrderRepository
+from app.settings import settings
+from app.users.enums import UserRole
+from app.users.repositories.user import UserRepository
+from seeder.documents import reseed, user_rows, order_rows
+
+DUPLICATE_KEY_ERROR = 11000
+
+_db: Optional[Database] = None
+
+
+def _init_worker(url: str, database: str) -> None:
+    global _db
+    _db = pymongo.MongoClient(url)[database]
+
+
+def _insert_batch(task: Tuple) -> Tuple[str, int]:
+    """
+    Generates and inserts one batch in a worker process
+    :return: kind of documents and the number inserted, duplicates of a previous run are skipped
+    """
+    seed, kind, batch, batch_size, customers, experts, orders = task
+    reseed(seed, kind, batch)
+    start = batch * batch_size
+    if kind == "order":
+        rows, document_rows = order_rows(
+            start, min(batch_size, orders - start), orders, customers=customers, experts=experts,
+        )
+        _insert_many(Collection.ORDER_DOCUMENTS, document_rows)
+        return kind, _insert_many(Collection.ORDERS, rows)
+    total = customers if kind == UserRole.customer else experts
+    return kind, _insert_many(Collection.USERS, user_rows(kind, start, min(batch_size, total - start), total))
+
+
+def _insert_many(collection: Collection, rows: List[dict]) -> int:
+    """
+    :return: the number of inserted rows
+    """
+    if not rows:
+        return 0
+    try:
+        _db[collection.value].insert_many(rows, ordered=False)
+        return len(rows)
+    except BulkWriteError as e:
+        if any(x["code"] != DUPLICATE_KEY_ERROR for x in e.details["writeErrors"]):
+            raise
+        return e.details["nInserted"]
+
+
+def _tasks(args) -> List[Tuple]:
+    tasks = []
+    for kind, total in ((UserRole.customer, args.customers), (UserRole.expert, args.experts), ("order", args.orders)):
+        for batch in range((total + args.batch_size - 1) // args.batch_size):
+            tasks.append((args.seed, kind, batch, args.batch_size, args.customers, args.experts, args.orders))
+    return tasks
+
+
+def create_indexes(db: Database) -> None:
+    for repository in (UserRepository, OrderRepository):
+        if repository.indexes:
+            started = time.perf_counter()
+            db[repository.collection_name.value].create_indexes(repository.indexes)
+            print(f"{repository.collection_name.value} indexes built in {time.perf_counter() - started:.1f}s")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m seeder")
+    parser.add_argument("--customers", type=int, default=10000)
+    parser.add_argument("--experts", type=int, default=500)
+    parser.add_argument("--orders", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=5000, help="documents per insert_many")
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--mongo-url", default=settings.MONGO_URL)
+    parser.add_argument("--database", default=settings.MONGO_INITDB_DATABASE)
+    parser.add_argument("--drop", action="store_true", help="drop users and orders before seeding")
+    parser.add_argument("--no-indexes", action="store_true", help="do not build indexes of repositories after seeding")
+    args = parser.parse_args()
+    if args.customers < 1 and args.orders > 0:
+        parser.error("orders require customers")
+
+    db = pymongo.MongoClient(args.mongo_url)[args.database]
+    if args.drop:
+        db.drop_collection(Collection.USERS.value)
+        db.drop_collection(Collection.ORDERS.value)
+        db.drop_collection(Collection.ORDER_DOCUMENTS.value)
+        db[Collection.COUNTERS.value].delete_one({"_id": Collection.ORDERS.value})
+
+    started = time.perf_counter()
+    inserted = {UserRole.customer: 0, UserRole.expert: 0, "order": 0}
+    with ProcessPoolExecutor(args.processes, initializer=_init_worker, initargs=(args.mongo_url, args.database)) as pool:
+        for future in as_completed([pool.submit(_insert_batch, task) for task in _tasks(args)]):
+            kind, count = future.result()
+            inserted[kind] += count
+            elapsed = time.perf_counter() - started
+            print(
+                f"\r{inserted[UserRole.customer]} customers, {inserted[UserRole.expert]} experts, "
+                f"{inserted['order']} orders, {sum(inserted.values()) / elapsed:.0f} docs/s",
+                end="",
+                file=sys.stderr,
+            )
+    print(file=sys.stderr)
+    print(f"Inserted {sum(inserted.values())} documents in {time.perf_counter() - started:.1f}s")
+
+    # sequence values of new orders continue after the seeded ones
+    db[Collection.COUNTERS.value].update_one(
+        {"_id": Collection.ORDERS.value},
+        {"$max": {"seq": args.orders}},
+        upsert=True,
+    )
+    if not args.no_indexes:
+        create_indexes(db)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
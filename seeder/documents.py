@@ -0,0 +1,158 @@
+import struct
+import uuid
+from typing import List, Tuple
+
+import factory.random
+import faker
+from bson import ObjectId
+
+from app.orders.enums import OrderStatus, VulnerabilityStatus
+from app.users.enums import UserRole
+from app.users.models import UserToken
+from tests.orders.factories import OrderFactory, DocumentFactory, DocumentContentFactory, OrderDocumentFactory, \
+    DocumentFilesFactory
+from tests.users.factories import CustomerFactory, ExpertFactory
+
+# 2022-01-01, the earliest creation time of seeded documents
+BASE_TIMESTAMP = 1640995200
+SEED_PERIOD = 365 * 24 * 3600
+
+KIND_PREFIX = {
+    UserRole.customer: 1,
+    UserRole.expert: 2,
+    "order": 3,
+}
+
+ORDER_STATUSES = {
+    OrderStatus.draft: 0.10,
+    OrderStatus.published: 0.15,
+    OrderStatus.handling: 0.15,
+    OrderStatus.done: 0.50,
+    OrderStatus.cancelled: 0.10,
+}
+VULNERABILITIES = {
+    VulnerabilityStatus.critical: 0.05,
+    VulnerabilityStatus.major: 0.15,
+    VulnerabilityStatus.minor: 0.30,
+    VulnerabilityStatus.clear: 0.50,
+}
+
+
+def seeded_id(kind, index: int, total: int) -> ObjectId:
+    """
+    Ids depend only on the kind and the index of the document, so orders reference users
+    generated by other processes and a repeated run produces the same ids.
+    The timestamp part grows with the index over the seeded period.
+    """
+    timestamp = BASE_TIMESTAMP + SEED_PERIOD * index // max(total, 1)
+    return ObjectId(struct.pack(">IB", timestamp, KIND_PREFIX[kind]) + index.to_bytes(7, "big"))
+
+
+def reseed(seed: int, kind, batch: int) -> None:
+    """
+    Reseeds factory_boy and Faker per batch, so the batch content does not depend on the number of processes
+    """
+    factory.random.reseed_random(f"{seed}:{KIND_PREFIX[kind]}:{batch}")
+
+
+def _token_count(rng) -> int:
+    # most users sign in from a couple of devices, some have hundreds of stale refresh tokens
+    return min(1 + int(rng.expovariate(1 / 3)), 200)
+
+
+def _skewed_index(rng, total: int) -> int:
+    # a few users own most of the orders
+    return int(total * rng.random() ** 3)
+
+
+def _to_row(model) -> dict:
+    row = model.dict(by_alias=True, exclude_none=True)
+    row["_id"] = ObjectId(row["_id"])
+    return row
+
+
+def user_rows(role: UserRole, start: int, count: int, total: int) -> List[dict]:
+    """
+    :return: users documents with indexes from start to start + count
+    """
+    rng = factory.random.randgen
+    user_factory = CustomerFactory if role == UserRole.customer else ExpertFactory
+    rows = []
+    for index in range(start, start + count):
+        user_id = seeded_id(role, index, total)
+        created = user_id.generation_time.timestamp()
+        kwargs = {
+            "id": user_id,
+            "tokens": [
+                UserToken(value=str(uuid.UUID(int=rng.getrandbits(128), version=4))) for _ in range(_token_count(rng))
+            ],
+            "md__lmt": int(created + rng.random() * (BASE_TIMESTAMP + SEED_PERIOD - created)),
+            "md__ect": int(created),
+            "version": rng.randint(0, 20),
+        }
+        # phones and emails are unique like in production, the rest is random
+        if role == UserRole.customer:
+            kwargs["phone"] = f"79{index:09d}"
+        else:
+            kwargs["email__value"] = f"expert{index}@example.com"
+        rows.append(_to_row(user_factory.build(**kwargs)))
+    return rows
+
+
+def order_rows(start: int, count: int, total: int, customers: int, experts: int) -> Tuple[List[dict], List[dict]]:
+    """
+    :return: orders documents with indexes from start to start + count, referencing seeded customers
+    and experts, and order_documents with their texts and images
+    """
+    rng = factory.random.randgen
+    # OCR texts are joined from paragraphs generated once per batch, Faker text is the slowest part otherwise
+    fake = faker.Faker()
+    fake.seed_instance(rng.random())
+    paragraphs = [fake.paragraph(nb_sentences=8) for _ in range(100)]
+    statuses, weights = zip(*ORDER_STATUSES.items())
+    vulnerabilities, vulnerability_weights = zip(*VULNERABILITIES.items())
+    rows, document_rows = [], []
+    for index in range(start, start + count):
+        status = rng.choices(statuses, weights)[0]
+        order_id = seeded_id("order", index, total)
+        kwargs = {
+            "id": order_id,
+            "status": status,
+            "customer": str(seeded_id(UserRole.customer, _skewed_index(rng, customers), customers)),
+            "seq": index + 1,
+        }
+        if experts and (status in (OrderStatus.handling, OrderStatus.done)
+                        or status == OrderStatus.cancelled and rng.random() < 0.5):
+            kwargs["expert"] = str(seeded_id(UserRole.expert, _skewed_index(rng, experts), experts))
+        if status == OrderStatus.draft and rng.random() < 0.5:
+            kwargs["document"] = None
+        else:
+            files = {"input": _images(rng), "result": []}
+            document = {
+                "input": DocumentContentFactory.build(file=_file_url(rng, "pdf"), images_count=len(files["input"])),
+            }
+            if status == OrderStatus.done:
+                files["result"] = _images(rng)
+                document["result"] = DocumentContentFactory.build(
+                    file=_file_url(rng, "pdf"),
+                    images_count=len(files["result"]),
+                )
+                document["vulnerability"] = rng.choices(vulnerabilities, vulnerability_weights)[0]
+                kwargs["rating"] = rng.randint(1, 5)
+            kwargs["document"] = DocumentFactory.build(**document)
+            document_rows.append(_to_row(OrderDocumentFactory.build(
+                id=order_id,
+                text="\n".join(rng.choices(paragraphs, k=rng.randint(1, 40))),
+                input=DocumentFilesFactory.build(images=files["input"]),
+                result=DocumentFilesFactory.build(images=files["result"]),
+            )))
+        rows.append(_to_row(OrderFactory.build(**kwargs)))
+    return rows, document_rows
+
+
+def _file_url(rng, extension: str) -> str:
+    return f"https://storage.example.com/{rng.getrandbits(96):024x}.{extension}"
+
+
+def _images(rng) -> List[str]:
+    return [_file_url(rng, "png") for _ in range(min(int(rng.expovariate(1 / 4)), 50))]
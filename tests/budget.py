@@ -0,0 +1,46 @@
+from collections import Counter
+from typing import Optional, List, Tuple
+
+from app.core.db_monitoring import command_log
+from app.core.tracing import outbound_log
+
+
+class RoundTrips:
+    """
+    Counts Mongo commands and outbound calls issued within the block, including background tasks:
+
+        with round_trips() as trips:
+            await client.get("/orders/self/", headers=headers)
+        trips.assert_budget(mongo=3, outbound=0)
+    """
+
+    def __init__(self):
+        self.mongo: List[Tuple[str, str, str]] = []
+        self.outbound: List[str] = []
+        self._tokens = None
+
+    def __enter__(self) -> "RoundTrips":
+        self._tokens = command_log.set(self.mongo), outbound_log.set(self.outbound)
+        return self
+
+    def __exit__(self, *args) -> None:
+        command_token, outbound_token = self._tokens
+        command_log.reset(command_token)
+        outbound_log.reset(outbound_token)
+
+    def report(self) -> str:
+        lines = [f"Mongo commands: {len(self.mongo)}"]
+        for (operation, command, collection), count in Counter(self.mongo).most_common():
+            lines.append(f"  {count:>3} x {operation}: {command} {collection}")
+        lines.append(f"Outbound calls: {len(self.outbound)}")
+        for name, count in Counter(self.outbound).most_common():
+            lines.append(f"  {count:>3} x {name}")
+        return "\n".join(lines)
+
+    def assert_budget(self, mongo: Optional[int] = None, outbound: Optional[int] = None) -> None:
+        exceeded = []
+        if mongo is not None and len(self.mongo) > mongo:
+            exceeded.append(f"Mongo commands {len(self.mongo)} > {mongo}")
+        if outbound is not None and len(self.outbound) > outbound:
+            exceeded.append(f"outbound calls {len(self.outbound)} > {outbound}")
+        assert not exceeded, "Round trip budget exceeded: {}\n{}".format(", ".join(exceeded), self.report())
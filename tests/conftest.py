@@ -12,6 +12,7 @@ from app.app import create_app
 from app.core.database import get_test_database
 from app.settings import settings
 from app.users.models import User
+from tests.budget import RoundTrips
 
 app = create_app(testing=True)
 
@@ -23,7 +24,7 @@ app = create_app(testing=True)
 
 @pytest.fixture()
 async def client():
-    async with AsyncClient(app=app, base_url=f'http://{settings.DOMAIN_SCORING}') as client, LifespanManager(app):
+    async with AsyncClient(app=app, base_url=f'http://{settings.DOMAIN}') as client, LifespanManager(app):
         yield client
 
 
@@ -52,3 +53,11 @@ def mock_sms_client():
             autospec=True
     ) as mocked_method:
         yield mocked_method
+
+
+@pytest.fixture()
+def round_trips():
+    """
+    Factory of blocks counting Mongo commands and outbound calls, see RoundTrips
+    """
+    return RoundTrips
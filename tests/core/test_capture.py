@@ -0,0 +1,56 @@
+import json
+import os
+import uuid
+
+import pytest
+
+from app.core import capture
+from app.core.capture import TrafficCapture, sanitize
+
+
+class TestSanitize:
+
+    @pytest.mark.parametrize("value", ["62a1c7f0e4b0a1b2c3d4e5f6", "10", "published"])
+    def test_kept(self, value):
+        assert sanitize(value) == value
+
+    @pytest.mark.parametrize("value", ["79161234567", "user@example.com", str(uuid.uuid4())])
+    def test_masked(self, value):
+        assert sanitize(value) == capture.MASK
+
+
+@pytest.mark.asyncio
+class TestTrafficCapture:
+
+    @pytest.fixture()
+    def recorder(self, tmp_path):
+        recorder = TrafficCapture(str(tmp_path / "capture.ndjson"), sample_rate=1)
+        recorder.start()
+        capture.traffic_capture = recorder
+        yield recorder
+        capture.traffic_capture = None
+        recorder.stop()
+
+    def read(self, recorder: TrafficCapture) -> list:
+        recorder.stop()
+        if not os.path.exists(recorder.path):
+            return []
+        with open(recorder.path) as f:
+            return [json.loads(line) for line in f]
+
+    async def test_request_recorded(self, client, recorder):
+        await client.get("/service/health/", params={"limit": 5, "phone": "79161234567"})
+        await client.get(f"/user/register-confirm/{uuid.uuid4()}/")
+
+        health, confirm = self.read(recorder)
+        assert health["route"] == "/service/health/"
+        assert health["query"] == [["limit", "5"], ["phone", capture.MASK]]
+        assert health["status"] == 200
+        assert health["role"] is None
+        assert confirm["route"] == "/user/register-confirm/{code}/"
+        assert confirm["path_params"] == {"code": capture.MASK}
+
+    async def test_not_sampled(self, client, recorder):
+        recorder.sample_rate = 0
+        await client.get("/service/health/")
+        assert self.read(recorder) == []
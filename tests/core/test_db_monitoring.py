@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.db_monitoring import (
+    CommandMonitor,
+    MONGO_COMMANDS,
+    current_operation,
+    get_query_shape,
+    repository_operation,
+    request_queries,
+)
+
+
+def make_event(command_name: str, command: dict, request_id: int = 1, duration_micros: int = 1000):
+    return SimpleNamespace(
+        command_name=command_name,
+        command=command,
+        connection_id=("localhost", 27017),
+        request_id=request_id,
+        duration_micros=duration_micros,
+        database_name="test",
+    )
+
+
+class TestCommandMonitor:
+
+    def test_query_shape(self):
+        assert get_query_shape({"_id": {"$in": [1, 2]}, "$or": [{"a": 1}, {"b": "x"}]}) == {
+            "_id": {"$in": ["?"]},
+            "$or": [{"a": "?"}, {"b": "?"}],
+        }
+
+    @pytest.mark.asyncio
+    async def test_operation_attribution(self):
+        monitor = CommandMonitor(slow_query_ms=100)
+        command = {"find": "orders", "filter": {"status": "published"}}
+
+        @repository_operation("TestRepository.get")
+        async def get():
+            assert current_operation.get() == "TestRepository.get"
+            monitor.started(make_event("find", command))
+
+        await get()
+        assert current_operation.get() is None
+        monitor.succeeded(make_event("find", command))
+
+        labels = ("find", "orders", "TestRepository.get", "success")
+        assert MONGO_COMMANDS.snapshot()["samples"].count([list(labels), 1]) == 1
+
+    def test_repeated_queries(self):
+        monitor = CommandMonitor(slow_query_ms=100)
+        queries = {}
+        token = request_queries.set(queries)
+        try:
+            for i in range(3):
+                event = make_event("find", {"find": "users", "filter": {"_id": i}}, request_id=i)
+                monitor.started(event)
+                monitor.succeeded(event)
+        finally:
+            request_queries.reset(token)
+
+        assert list(queries.values()) == [3]
@@ -0,0 +1,68 @@
+import logging
+import os
+import queue
+import time
+from unittest import mock
+
+import pytest
+import structlog
+
+from app.core import log_config
+from app.core.log_config import LogSampler, NonBlockingQueueHandler, configure_logging
+
+
+class TestNonBlockingQueueHandler:
+
+    def test_dropped_when_full(self):
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+        record = logging.makeLogRecord({"msg": "event"})
+        dropped = NonBlockingQueueHandler.dropped
+
+        start = time.monotonic()
+        for _ in range(3):
+            handler.emit(record)
+        assert time.monotonic() - start < 0.1
+        assert handler.queue.qsize() == 1
+        assert NonBlockingQueueHandler.dropped == dropped + 2
+
+
+class TestLogSampler:
+    logger = logging.getLogger("orders")
+
+    def test_debug_sampled(self):
+        sampler = LogSampler({"orders": 0.5})
+        with mock.patch("app.core.log_config.random.random", return_value=0.7):
+            with pytest.raises(structlog.DropEvent):
+                sampler(self.logger, "debug", {})
+        with mock.patch("app.core.log_config.random.random", return_value=0.3):
+            assert sampler(self.logger, "debug", {"event": "kept"}) == {"event": "kept"}
+
+    @pytest.mark.parametrize("method_name", ["info", "warning", "error"])
+    def test_other_levels_kept(self, method_name):
+        assert LogSampler({"orders": 0})(self.logger, method_name, {"event": "kept"}) == {"event": "kept"}
+
+    def test_other_loggers_kept(self):
+        assert LogSampler({"users": 0})(self.logger, "debug", {"event": "kept"}) == {"event": "kept"}
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="fork is not available")
+def test_listener_restarted_after_fork():
+    configure_logging(log_format="json")
+    parent_listener = log_config._listener
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        listener = log_config._listener
+        handler = next(x for x in logging.getLogger().handlers if isinstance(x, NonBlockingQueueHandler))
+        restarted = (
+            listener is not parent_listener
+            and listener._thread.is_alive()
+            and handler.queue is listener.queue
+        )
+        os.write(write_fd, b"1" if restarted else b"0")
+        os._exit(0)
+    os.close(write_fd)
+    os.waitpid(pid, 0)
+    assert os.read(read_fd, 1) == b"1"
+    os.close(read_fd)
+    assert parent_listener._thread.is_alive()
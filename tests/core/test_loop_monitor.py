@@ -0,0 +1,31 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.loop_monitor import LoopMonitor, track_request, untrack_request
+
+
+def blocking_call():
+    time.sleep(0.3)
+
+
+@pytest.mark.asyncio
+class TestLoopMonitor:
+
+    async def test_block_captured(self):
+        monitor = LoopMonitor(interval=0.01, block_threshold=0.1)
+        task = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0.05)
+
+        track_request({"type": "http", "method": "GET", "path": "/orders/self/"})
+        try:
+            blocking_call()
+        finally:
+            untrack_request()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert monitor.last_block["path"] == "/orders/self/"
+        assert "blocking_call" in monitor.last_block["stack"]
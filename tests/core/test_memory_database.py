@@ -0,0 +1,136 @@
+import re
+
+import pytest
+from bson import ObjectId
+from pymongo import IndexModel, ReturnDocument, UpdateOne, ASCENDING
+from pymongo.errors import DuplicateKeyError
+
+from app.core.memory_database import MemoryClient, match, project
+
+
+class TestMatch:
+    document = {
+        "_id": ObjectId(),
+        "status": "published",
+        "seq": 5,
+        "email": {"value": "User@example.com"},
+        "tokens": [{"value": "a"}, {"value": "b"}],
+        "document": {"input": {"images": ["1.png", "2.png"]}},
+    }
+
+    @pytest.mark.parametrize("query", [
+        {"status": "published"},
+        {"email.value": re.compile("user@", re.IGNORECASE)},
+        {"status": {"$in": ["draft", "published"]}},
+        {"seq": {"$gt": 4, "$lte": 5}},
+        {"$or": [{"customer": "x"}, {"seq": 5}]},
+        {"tokens": {"$elemMatch": {"value": "b"}}},
+        {"tokens.value": "a"},
+        {"document.input.images": "2.png"},
+        {"expert": None},
+        {"expert": {"$exists": False}},
+        {"status": {"$type": "string"}},
+        {"seq": {"$type": ["double", "int"]}},
+    ])
+    def test_matched(self, query):
+        assert match(self.document, query)
+
+    @pytest.mark.parametrize("query", [
+        {"status": "draft"},
+        {"seq": {"$gt": "4"}},
+        {"status": {"$in": []}},
+        {"$or": [{"customer": "x"}, {"seq": 6}]},
+        {"tokens": {"$elemMatch": {"value": "c"}}},
+        {"status": {"$ne": "published"}},
+        {"expert": {"$type": "null"}},
+        {"seq": {"$type": "bool"}},
+    ])
+    def test_not_matched(self, query):
+        assert not match(self.document, query)
+
+    def test_projection(self):
+        assert project(self.document, {"tokens.value": 1, "_id": 0}) == {"tokens": [{"value": "a"}, {"value": "b"}]}
+        assert set(project(self.document, {"document": 0, "tokens": 0})) == {"_id", "status", "seq", "email"}
+
+
+@pytest.mark.asyncio
+class TestMemoryCollection:
+
+    @pytest.fixture()
+    def collection(self):
+        return MemoryClient()["test"]["orders"]
+
+    async def test_update_operators(self, collection):
+        result = await collection.insert_one({"status": "draft"})
+        order = await collection.find_one_and_update(
+            {"_id": result.inserted_id},
+            {"$set": {"status": "published"}, "$push": {"document.input.images": "1.png"}, "$inc": {"seq": 2}},
+            return_document=ReturnDocument.AFTER,
+        )
+        assert order == {
+            "_id": result.inserted_id,
+            "status": "published",
+            "seq": 2,
+            "document": {"input": {"images": ["1.png"]}},
+        }
+
+    async def test_returned_documents_are_copies(self, collection):
+        await collection.insert_one({"_id": 1, "tokens": []})
+        document = await collection.find_one({"_id": 1})
+        document["tokens"].append("a")
+        assert await collection.find_one({"_id": 1}) == {"_id": 1, "tokens": []}
+
+    async def test_upsert(self, collection):
+        document = await collection.find_one_and_update(
+            {"phone": "79000000000"},
+            {"$setOnInsert": {"version": 0}, "$set": {"acl.code": 1234}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        assert document["phone"] == "79000000000"
+        assert document["version"] == 0
+
+        await collection.update_one({"phone": "79000000000"}, {"$setOnInsert": {"version": 5}}, upsert=True)
+        assert (await collection.find_one({"phone": "79000000000"}))["version"] == 0
+        assert await collection.count_documents({}) == 1
+
+    async def test_unique_index(self, collection):
+        await collection.create_indexes([IndexModel([("phone", ASCENDING)], unique=True, sparse=True)])
+        await collection.insert_one({"phone": "1"})
+        await collection.insert_one({"email": "a"})
+        await collection.insert_one({"email": "b"})
+        with pytest.raises(DuplicateKeyError):
+            await collection.insert_one({"phone": "1"})
+        with pytest.raises(DuplicateKeyError):
+            await collection.update_one({"email": "a"}, {"$set": {"phone": "1"}})
+
+    async def test_partial_unique_index(self, collection):
+        await collection.create_indexes([
+            IndexModel([("phone", ASCENDING)], unique=True, partialFilterExpression={"phone": {"$type": "string"}}),
+        ])
+        await collection.insert_one({"phone": None})
+        await collection.insert_one({"phone": None})
+        await collection.insert_one({"phone": "1"})
+        with pytest.raises(DuplicateKeyError):
+            await collection.insert_one({"phone": "1"})
+
+    async def test_bulk_write(self, collection):
+        await collection.insert_one({"_id": 1, "status": "draft"})
+        await collection.insert_one({"_id": 2, "status": "published"})
+        result = await collection.bulk_write([
+            UpdateOne({"_id": 1, "status": "draft"}, {"$set": {"status": "cancelled"}}),
+            UpdateOne({"_id": 2, "status": "draft"}, {"$set": {"status": "cancelled"}}),
+        ], ordered=False)
+        assert result.matched_count == 1
+
+    async def test_aggregate(self, collection):
+        for seq in range(5):
+            await collection.insert_one({"seq": seq, "status": "published" if seq % 2 else "draft"})
+        result = await collection.aggregate([
+            {"$match": {"status": "draft"}},
+            {"$facet": {
+                "items": [{"$sort": {"seq": -1}}, {"$skip": 1}, {"$limit": 1}, {"$project": {"seq": 1, "_id": 0}}],
+                "total": [{"$count": "value"}],
+            }},
+        ]).to_list(length=1)
+        assert result == [{"items": [{"seq": 2}], "total": [{"value": 3}]}]
@@ -0,0 +1,57 @@
+import json
+import os
+
+import pytest
+
+from app.core.metrics import Registry, Counter, Gauge, Histogram, registry
+
+
+class TestRegistry:
+
+    @pytest.fixture()
+    def metrics_registry(self, monkeypatch, tmp_path):
+        test_registry = Registry()
+        monkeypatch.setattr("app.core.metrics.registry", test_registry)
+        test_registry.directory = str(tmp_path)
+        return test_registry
+
+    def test_render(self, metrics_registry):
+        counter = Counter("test_total", "Test counter", ["handler"])
+        histogram = Histogram("test_seconds", "Test histogram", buckets=(0.1, 1))
+        counter.inc(handler="a")
+        counter.inc(2, handler="a")
+        histogram.observe(0.05)
+        histogram.observe(5)
+
+        text = metrics_registry.render()
+        assert 'test_total{handler="a"} 3.0' in text
+        assert 'test_seconds_bucket{le="0.1"} 1.0' in text
+        assert 'test_seconds_bucket{le="1"} 1.0' in text
+        assert 'test_seconds_bucket{le="+Inf"} 2.0' in text
+        assert 'test_seconds_count 2.0' in text
+
+    def test_merge_workers(self, metrics_registry, tmp_path):
+        counter = Counter("test_total", "Test counter")
+        gauge = Gauge("test_in_progress", "Test gauge")
+        counter.inc()
+        gauge.inc()
+        snapshot = metrics_registry.snapshot()
+        # Exited worker and alive worker
+        (tmp_path / "999999999.json").write_text(json.dumps(snapshot))
+        (tmp_path / f"{os.getppid()}.json").write_text(json.dumps(snapshot))
+
+        text = metrics_registry.render()
+        assert "test_total 3.0" in text
+        assert "test_in_progress 2.0" in text
+
+
+@pytest.mark.asyncio
+class TestMetricsEndpoint:
+    url = "/service/metrics"
+
+    async def test_request_metrics(self, client):
+        await client.get("/service/health/")
+        response = await client.get(self.url)
+        assert response.status_code == 200
+        assert 'http_requests_total{handler="health_check",method="GET",status="200"}' in response.text
+        assert registry.render().count("# TYPE http_request_duration_seconds histogram") == 1
@@ -0,0 +1,58 @@
+import cProfile
+import os
+
+import pytest
+from httpx import AsyncClient
+from starlette.responses import PlainTextResponse
+
+from app.core.middleware import ProfilingMiddleware
+from app.core.profiling import ProfileStorage
+from app.settings import settings
+
+
+def make_profile() -> cProfile.Profile:
+    profile = cProfile.Profile()
+    profile.enable()
+    sum(range(1000))
+    profile.disable()
+    return profile
+
+
+class TestProfileStorage:
+
+    def test_max_files(self, tmp_path):
+        storage = ProfileStorage(directory=str(tmp_path), max_files=2, max_bytes=10 ** 9)
+        for i in range(3):
+            path = storage.save(make_profile(), f"{i}.pstats")
+            os.utime(path, (i, i))
+        assert sorted(os.listdir(tmp_path)) == ["1.pstats", "2.pstats"]
+
+    def test_names_unique(self, tmp_path):
+        storage = ProfileStorage(directory=str(tmp_path), max_files=10, max_bytes=10 ** 9)
+        names = {storage.get_name("get_self_orders") for _ in range(3)}
+        assert len(names) == 3
+        assert all(f"-{os.getpid()}-" in x for x in names)
+
+
+@pytest.mark.asyncio
+class TestProfilingMiddleware:
+
+    @pytest.fixture()
+    def profiled_client(self, tmp_path):
+        app = ProfilingMiddleware(
+            PlainTextResponse("ok"),
+            storage=ProfileStorage(directory=str(tmp_path), max_files=10, max_bytes=10 ** 9),
+        )
+        return AsyncClient(app=app, base_url="http://test")
+
+    async def test_profiled(self, profiled_client, tmp_path):
+        async with profiled_client as client:
+            response = await client.get("/", headers={"x-profile": "1", settings.API_KEY_NAME: settings.API_KEY})
+        assert response.status_code == 200
+        assert os.listdir(tmp_path) == [response.headers["x-profile"]]
+
+    async def test_without_api_key(self, profiled_client, tmp_path):
+        async with profiled_client as client:
+            response = await client.get("/", headers={"x-profile": "1"})
+        assert "x-profile" not in response.headers
+        assert os.listdir(tmp_path) == []
@@ -0,0 +1,49 @@
+import threading
+import time
+
+import pytest
+
+from app.core.sampler import StackSampler
+from app.settings import settings
+
+
+class TestStackSampler:
+
+    def test_sample(self):
+        stack_sampler = StackSampler()
+        stack_sampler.sample()
+        stack_sampler.sample()
+
+        lines = stack_sampler.collapsed(reset=True).splitlines()
+        stack, count = next(x for x in lines if "test_sampler.py:test_sample" in x).rsplit(" ", 1)
+        assert stack.startswith("MainThread;")
+        assert stack.endswith("sampler.py:sample")
+        assert count == "2"
+        assert stack_sampler.collapsed() == ""
+
+    def test_idle_threads_skipped(self):
+        stopped = threading.Event()
+        thread = threading.Thread(target=stopped.wait, name="parked")
+        thread.start()
+        time.sleep(0.01)
+        try:
+            stack_sampler = StackSampler()
+            stack_sampler.sample()
+        finally:
+            stopped.set()
+            thread.join()
+        assert "parked;" not in stack_sampler.collapsed()
+        assert "MainThread;" in stack_sampler.collapsed()
+
+
+@pytest.mark.asyncio
+class TestProfileStacks:
+    url = "/service/profile/stacks"
+
+    async def test_forbidden(self, client):
+        response = await client.get(self.url, headers={settings.API_KEY_NAME: "wrong"})
+        assert response.status_code == 403
+
+    async def test_disabled(self, client):
+        response = await client.get(self.url, headers={settings.API_KEY_NAME: settings.API_KEY})
+        assert response.status_code == 404
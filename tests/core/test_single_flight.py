@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+
+from app.core.memory_database import MemoryClient
+from app.core.single_flight import SingleFlight, shared_reads
+from app.core.unit_of_work import UnitOfWork
+from app.users.repositories.user import UserRepository
+from tests.users.factories import CustomerFactory
+
+
+@pytest.mark.asyncio
+class TestSingleFlight:
+
+    async def test_coalesced(self):
+        calls = []
+
+        async def read():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"tokens": []}
+
+        single_flight = SingleFlight()
+        results = await asyncio.gather(*[single_flight.run(("orders", 1), read, operation="read") for _ in range(5)])
+        assert len(calls) == 1
+        assert single_flight.coalesced == 4
+        results[0]["tokens"].append("a")
+        assert results[1] == {"tokens": []}
+
+        await single_flight.run(("orders", 1), read, operation="read")
+        assert len(calls) == 2
+
+    async def test_cancelled_caller(self):
+        single_flight = SingleFlight()
+
+        async def read():
+            await asyncio.sleep(0.01)
+            return 1
+
+        first = asyncio.create_task(single_flight.run(("orders", 1), read, operation="read"))
+        second = asyncio.create_task(single_flight.run(("orders", 1), read, operation="read"))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == 1
+
+    async def test_forget(self):
+        single_flight = SingleFlight()
+
+        async def read():
+            await asyncio.sleep(0.01)
+            return object()
+
+        first = asyncio.create_task(single_flight.run(("orders", 1), read, operation="read"))
+        await asyncio.sleep(0)
+        single_flight.forget("orders")
+        second = asyncio.create_task(single_flight.run(("orders", 1), read, operation="read"))
+        assert await first is not await second
+
+    async def test_concurrent_requests(self, round_trips):
+        client = MemoryClient(latency=0.01)
+        customer = CustomerFactory(phone="79000000000").dict(by_alias=True, exclude_none=True)
+        await client["test"]["users"].insert_one({**customer, "_id": ObjectId(customer["_id"])})
+        coalesced = shared_reads.coalesced
+
+        with round_trips() as trips:
+            users = await asyncio.gather(*[
+                UserRepository(client["test"], UnitOfWork()).get_user_by_phone("79000000000") for _ in range(10)
+            ])
+        assert {user.id for user in users} == {customer["_id"]}
+        assert len(trips.mongo) == 1
+        assert shared_reads.coalesced - coalesced == 9
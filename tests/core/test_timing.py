@@ -0,0 +1,44 @@
+import pytest
+
+from app.core.timing import RequestTimings, request_timings, span, format_server_timing
+from app.settings import settings
+
+
+class TestRequestTimings:
+
+    def test_nested_span_counted_once(self):
+        timings = RequestTimings()
+        token = request_timings.set(timings)
+        try:
+            with span("serialize"):
+                with span("serialize"):
+                    pass
+                with span("db"):
+                    pass
+        finally:
+            request_timings.reset(token)
+
+        assert set(timings.totals) == {"serialize", "db"}
+        assert timings.totals["serialize"] >= timings.totals["db"]
+
+    def test_span_outside_request(self):
+        with span("db"):
+            pass
+
+    def test_format(self):
+        assert format_server_timing({"auth": 0.0012, "db": 0.01}) == "auth;dur=1.2, db;dur=10.0"
+
+
+@pytest.mark.asyncio
+class TestServerTimingHeader:
+    url = "/service/health/"
+
+    async def test_with_api_key(self, client):
+        response = await client.get(self.url, headers={settings.API_KEY_NAME: settings.API_KEY})
+        assert response.status_code == 200
+        assert "app;dur=" in response.headers["Server-Timing"]
+
+    async def test_without_api_key(self, client):
+        response = await client.get(self.url)
+        assert response.status_code == 200
+        assert "Server-Timing" not in response.headers
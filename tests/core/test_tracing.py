@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from app.core.tracing import Tracer, FileSpanExporter, span, tracer
+
+
+@pytest.fixture()
+def span_file(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    tracer.start(FileSpanExporter(str(path)), interval=0.01)
+    yield path
+    tracer.shutdown()
+
+
+def read_spans(path) -> dict:
+    return {x["name"]: x for x in map(json.loads, path.read_text().splitlines())}
+
+
+class TestTracer:
+
+    def test_nested_spans(self, span_file):
+        with span("parent"):
+            with span("child", collection="orders"):
+                pass
+        tracer.shutdown()
+
+        spans = read_spans(span_file)
+        assert spans["child"]["parentSpanId"] == spans["parent"]["spanId"]
+        assert spans["child"]["traceId"] == spans["parent"]["traceId"]
+        assert spans["child"]["attributes"] == [{"key": "collection", "value": {"stringValue": "orders"}}]
+
+    def test_disabled(self):
+        with span("parent") as current:
+            assert current is None
+        assert not Tracer().enabled
+
+
+@pytest.mark.asyncio
+class TestRequestId:
+    url = "/service/health/"
+
+    async def test_generated(self, client):
+        response = await client.get(self.url)
+        assert len(response.headers["x-request-id"]) == 32
+
+    async def test_accepted(self, client):
+        response = await client.get(self.url, headers={"x-request-id": "client-request-1"})
+        assert response.headers["x-request-id"] == "client-request-1"
+
+    async def test_invalid_replaced(self, client):
+        response = await client.get(self.url, headers={"x-request-id": "bad id\n"})
+        assert response.headers["x-request-id"] != "bad id\n"
+
+    async def test_root_span(self, client, span_file):
+        await client.get(self.url, headers={"x-request-id": "client-request-2"})
+        tracer.shutdown()
+
+        root = read_spans(span_file)["GET /service/health/"]
+        attributes = {x["key"]: x["value"]["stringValue"] for x in root["attributes"]}
+        assert attributes["request_id"] == "client-request-2"
+        assert attributes["http.status_code"] == "200"
@@ -0,0 +1,73 @@
+import pytest
+from bson import ObjectId
+
+from app.core.memory_database import MemoryClient
+from app.core.unit_of_work import UnitOfWork
+from app.users.repositories.user import UserRepository
+from tests.users.factories import CustomerFactory
+
+
+@pytest.mark.asyncio
+class TestUnitOfWork:
+
+    @pytest.fixture()
+    async def client(self):
+        client = MemoryClient()
+        customer = CustomerFactory(phone="79000000000", tokens=[]).dict(by_alias=True, exclude_none=True)
+        await client["test"]["users"].insert_one({**customer, "_id": ObjectId(customer["_id"])})
+        return client
+
+    async def test_repeated_loads(self, client, round_trips):
+        repository = UserRepository(client["test"], UnitOfWork())
+
+        with round_trips() as trips:
+            user = await repository.get_user_by_phone("79000000000")
+            assert (await repository.get_user_by_id(str(user.id))).phone == user.phone
+            assert await repository.get_users_versions([str(user.id)]) == {str(user.id): 0}
+            assert await repository.get_user_by_id(None) is None
+        assert len(trips.mongo) == 1
+
+    async def test_deferred_writes(self, client, round_trips):
+        unit_of_work = UnitOfWork()
+        repository = UserRepository(client["test"], unit_of_work)
+        user = await repository.get_user_by_phone("79000000000")
+
+        with round_trips() as trips:
+            token = await repository.add_refresh_token(phone=user.phone)
+            assert trips.mongo == []
+            # the cached document is dropped and the write is sent before the next repository call
+            assert (await repository.get_user_by_id(str(user.id))).tokens[0].value == token
+            assert await repository.get_user_by_id(str(user.id))
+        assert [command for _, command, _ in trips.mongo] == ["update", "find"]
+        assert (await client["test"]["users"].find_one({"_id": ObjectId(user.id)}))["version"] == 1
+
+    def test_forget(self):
+        unit_of_work = UnitOfWork()
+        first, second = {"_id": ObjectId()}, {"_id": ObjectId()}
+        unit_of_work.remember("users", first)
+        unit_of_work.remember("users", second)
+
+        unit_of_work.forget("users", {"_id": {"$in": [first["_id"]]}})
+        assert unit_of_work.get("users", first["_id"]) is None
+        assert unit_of_work.get("users", second["_id"]) == second
+        unit_of_work.forget("users", {"phone": "79000000000"})
+        assert unit_of_work.get("users", second["_id"]) is None
+
+    async def test_discarded(self, client):
+        unit_of_work = UnitOfWork()
+        collection = client["test"]["users"]
+        await unit_of_work.defer(collection, {"phone": "79000000000"}, {"$inc": {"version": 1}})
+        await unit_of_work.close(commit=False)
+
+        await unit_of_work.defer(collection, {"phone": "79000000000"}, {"$inc": {"version": 5}})
+        assert (await collection.find_one({"phone": "79000000000"}))["version"] == 5
+
+    async def test_queued_update_copied(self, client):
+        unit_of_work = UnitOfWork()
+        collection = client["test"]["users"]
+        update = {"$inc": {"version": 1}}
+        await unit_of_work.defer(collection, {"phone": "79000000000"}, update)
+        update["$inc"]["version"] = 10
+
+        await unit_of_work.flush()
+        assert (await collection.find_one({"phone": "79000000000"}))["version"] == 1
@@ -0,0 +1,41 @@
+import pytest
+
+from app.settings import settings
+
+headers = {settings.API_KEY_NAME: settings.API_KEY}
+
+
+@pytest.mark.asyncio
+class TestMemoryTracing:
+    url = "/service/memory"
+
+    async def test_snapshots_diff(self, client):
+        response = await client.post(f"{self.url}/tracing/start", headers=headers)
+        assert response.json()["tracing"] is True
+        try:
+            old_id = (await client.post(f"{self.url}/snapshots", headers=headers)).json()["id"]
+            allocated = [bytearray(1024) for _ in range(1000)]
+            new_id = (await client.post(f"{self.url}/snapshots", headers=headers)).json()["id"]
+
+            response = await client.get(f"{self.url}/snapshots/{new_id}/diff/{old_id}", headers=headers)
+            assert response.status_code == 200
+            top = response.json()["items"][0]
+            assert "test_memory.py" in top["location"]
+            assert top["size_diff"] >= 1024 * 1000
+            del allocated
+        finally:
+            response = await client.post(f"{self.url}/tracing/stop", headers=headers)
+        assert response.json()["tracing"] is False
+
+    async def test_snapshot_not_started(self, client):
+        response = await client.post(f"{self.url}/snapshots", headers=headers)
+        assert response.status_code == 409
+
+    async def test_model_counts(self, client):
+        response = await client.get(f"{self.url}/models", headers=headers)
+        assert response.status_code == 200
+        assert all(count > 0 for count in response.json()["items"].values())
+
+    async def test_forbidden(self, client):
+        response = await client.get(f"{self.url}/models")
+        assert response.status_code == 403
@@ -0,0 +1,57 @@
+from datetime import datetime
+from typing import Tuple
+
+import faker
+import pytest
+from fastapi_jwt_auth import AuthJWT
+
+from app.users.enums import UserRole
+from app.users.models import User, UserMD, UserEmail
+
+test_faker = faker.Faker()
+
+
+def _md(role: UserRole) -> UserMD:
+    now = int(datetime.utcnow().timestamp())
+    return UserMD(lmt=now, ect=now, role=role)
+
+
+@pytest.fixture()
+def create_customer_in_db(db_client):
+    async def _create_customer_in_db() -> Tuple[User, dict]:
+        user = User(phone=test_faker.msisdn(), md=_md(UserRole.customer)).dict(exclude_none=True)
+        insert_result = await db_client.users.insert_one(user)
+        user = User(**await db_client.users.find_one({"_id": insert_result.inserted_id}))
+        token = AuthJWT().create_access_token(subject=user.phone)
+        return user, {"Authorization": f"Bearer {token}"}
+
+    return _create_customer_in_db
+
+
+@pytest.fixture()
+def create_expert_in_db(db_client):
+    async def _create_expert_in_db() -> Tuple[User, dict]:
+        user = User(
+            email=UserEmail(value=test_faker.email(), confirmed=True),
+            md=_md(UserRole.expert),
+        ).dict(exclude_none=True)
+        insert_result = await db_client.users.insert_one(user)
+        user = User(**await db_client.users.find_one({"_id": insert_result.inserted_id}))
+        token = AuthJWT().create_access_token(subject=user.email.value)
+        return user, {"Authorization": f"Bearer {token}"}
+
+    return _create_expert_in_db
+
+
+@pytest.fixture()
+def create_order(client):
+    async def _create_order(headers: dict, name: str = None) -> dict:
+        response = await client.post(
+            "/orders/",
+            json={"name": name or test_faker.word()},
+            headers=headers,
+        )
+        assert response.status_code == 200
+        return response.json()
+
+    return _create_order
@@ -0,0 +1,54 @@
+import factory
+from bson import ObjectId
+
+from app.orders.enums import OrderStatus, VulnerabilityStatus
+from app.orders.models import Order, Document, DocumentContent, OrderDocument, DocumentFiles
+
+
+class DocumentContentFactory(factory.Factory):
+    file = factory.Faker('uri')
+    images_count = 1
+
+    class Meta:
+        model = DocumentContent
+
+
+class DocumentFactory(factory.Factory):
+    input = factory.SubFactory(DocumentContentFactory)
+    result = None
+    vulnerability = VulnerabilityStatus.unknown
+    has_text = True
+
+    class Meta:
+        model = Document
+
+
+class DocumentFilesFactory(factory.Factory):
+    images = factory.List([factory.Faker('image_url') for _ in range(1)])
+
+    class Meta:
+        model = DocumentFiles
+
+
+class OrderDocumentFactory(factory.Factory):
+    id = factory.LazyFunction(ObjectId)
+    text = factory.Faker('text', max_nb_chars=2000)
+    input = factory.SubFactory(DocumentFilesFactory)
+    result = factory.SubFactory(DocumentFilesFactory, images=[])
+
+    class Meta:
+        model = OrderDocument
+        rename = {"id": "_id"}
+
+
+class OrderFactory(factory.Factory):
+    id = factory.LazyFunction(ObjectId)
+    status = OrderStatus.draft
+    customer = factory.LazyFunction(lambda: str(ObjectId()))
+    name = factory.Faker('sentence', nb_words=4)
+    description = factory.Faker('paragraph')
+    document = factory.SubFactory(DocumentFactory)
+
+    class Meta:
+        model = Order
+        rename = {"id": "_id"}
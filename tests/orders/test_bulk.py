@@ -0,0 +1,48 @@
+import pytest
+
+from app.core.exception.error_codes import order_not_found, order_wrong_operation_by_status
+
+
+@pytest.mark.asyncio
+class TestBulkOrders:
+    url = "/orders/bulk/"
+
+    async def test_cancel(self, client, db_client, create_customer_in_db, create_order):
+        _, headers = await create_customer_in_db()
+        _, other_headers = await create_customer_in_db()
+        orders = [await create_order(headers) for _ in range(3)]
+        foreign_order = await create_order(other_headers)
+        await client.post(f"/orders/{orders[2]['id']}/cancel/", headers=headers)
+
+        response = await client.post(
+            self.url,
+            json={
+                "order_ids": [orders[0]["id"], orders[1]["id"], orders[2]["id"], foreign_order["id"], "invalid"],
+                "action": "cancel",
+            },
+            headers=headers,
+        )
+        assert response.status_code == 200
+        items = response.json()["items"]
+        assert [x.get("status") for x in items] == ["cancelled", "cancelled", None, None, None]
+        assert [x.get("error", {}).get("code") for x in items] == [
+            None, None, order_wrong_operation_by_status, order_not_found, order_not_found,
+        ]
+
+        statuses = {str(x["_id"]): x["status"] async for x in db_client.orders.find()}
+        assert statuses[orders[0]["id"]] == "cancelled"
+        assert statuses[foreign_order["id"]] == "draft"
+
+    async def test_changes_token(self, client, create_customer_in_db, create_order):
+        _, headers = await create_customer_in_db()
+        orders = [await create_order(headers) for _ in range(2)]
+        token = (await client.get("/orders/self/changes/", headers=headers)).json()["token"]
+
+        await client.post(
+            self.url,
+            json={"order_ids": [x["id"] for x in orders], "action": "confirm"},
+            headers=headers,
+        )
+
+        response = await client.get("/orders/self/changes/", params={"since": token}, headers=headers)
+        assert [x["status"] for x in response.json()["items"]] == ["published", "published"]
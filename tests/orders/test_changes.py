@@ -0,0 +1,91 @@
+import asyncio
+from unittest import mock
+
+import pytest
+from bson import ObjectId
+
+from app.orders.enums import OrderStatus
+from app.orders.migrations import assign_order_sequence
+from app.orders.repositories.order import OrderRepository
+from tests.orders.factories import OrderFactory
+
+
+@pytest.mark.asyncio
+class TestOrdersChanges:
+    url = "/orders/self/changes/"
+
+    async def test_initial_sync(self, client, create_customer_in_db, create_order):
+        _, headers = await create_customer_in_db()
+        orders = [await create_order(headers) for _ in range(3)]
+
+        response = await client.get(self.url, params={"since": 0, "limit": 2}, headers=headers)
+        assert response.status_code == 200
+        assert [x["id"] for x in response.json()["items"]] == [x["id"] for x in orders[:2]]
+        assert response.json()["has_more"] is True
+
+        response = await client.get(self.url, params={"since": response.json()["token"]}, headers=headers)
+        assert [x["id"] for x in response.json()["items"]] == [orders[2]["id"]]
+        assert response.json()["has_more"] is False
+
+    async def test_orders_before_sync(self, client, db_client, create_customer_in_db):
+        customer, headers = await create_customer_in_db()
+        row = OrderFactory.build(customer=str(customer.id)).dict(by_alias=True, exclude_none=True)
+        row.pop("seq", None)
+        await db_client.orders.insert_one({**row, "_id": ObjectId(row["_id"])})
+
+        assert await assign_order_sequence(db_client, batch_size=1) >= 1
+        assert await assign_order_sequence(db_client) == 0
+        response = await client.get(self.url, params={"since": 0}, headers=headers)
+        assert [x["id"] for x in response.json()["items"]] == [row["_id"]]
+
+    async def test_only_changed(self, client, create_customer_in_db, create_order):
+        _, headers = await create_customer_in_db()
+        orders = [await create_order(headers) for _ in range(3)]
+        token = (await client.get(self.url, headers=headers)).json()["token"]
+
+        await client.post(f"/orders/{orders[1]['id']}/cancel/", headers=headers)
+
+        response = await client.get(self.url, params={"since": token}, headers=headers)
+        assert response.status_code == 200
+        assert [(x["id"], x["status"]) for x in response.json()["items"]] == [(orders[1]["id"], "cancelled")]
+        assert response.json()["token"] > token
+
+    async def test_foreign_orders(self, client, create_customer_in_db, create_order):
+        _, headers = await create_customer_in_db()
+        _, other_headers = await create_customer_in_db()
+        await create_order(other_headers)
+
+        response = await client.get(self.url, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["items"] == []
+        assert response.json()["token"] == 0
+
+    async def test_interleaved_writers(self, client, db_client, create_customer_in_db, create_order):
+        _, headers = await create_customer_in_db()
+        orders = [await create_order(headers) for _ in range(2)]
+        token = (await client.get(self.url, headers=headers)).json()["token"]
+
+        collection = db_client.orders
+        find_one_and_update = collection.find_one_and_update
+        paused, resume = asyncio.Event(), asyncio.Event()
+
+        async def pause(*args, **kwargs):
+            paused.set()
+            await resume.wait()
+            return await find_one_and_update(*args, **kwargs)
+
+        # the first writer reserves its seq and pauses before the write commits
+        with mock.patch.object(collection, "find_one_and_update", side_effect=pause):
+            first = asyncio.create_task(OrderRepository(db_client).set_rating(orders[0]["id"], 5))
+            await paused.wait()
+        # the second writer gets a later seq and commits first
+        await OrderRepository(db_client).change_oder_status(orders[1]["id"], OrderStatus.cancelled)
+
+        response = await client.get(self.url, params={"since": token}, headers=headers)
+        assert response.json()["items"] == []
+        assert response.json()["token"] == token
+
+        resume.set()
+        await first
+        response = await client.get(self.url, params={"since": token}, headers=headers)
+        assert [x["id"] for x in response.json()["items"]] == [orders[0]["id"], orders[1]["id"]]
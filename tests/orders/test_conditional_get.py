@@ -0,0 +1,52 @@
+import pytest
+
+
+@pytest.mark.asyncio
+class TestSelfOrdersConditionalGet:
+    url = "/orders/self/"
+
+    async def test_not_modified(self, client, create_customer_in_db, create_order):
+        _, headers = await create_customer_in_db()
+        await create_order(headers)
+
+        response = await client.get(self.url, headers=headers)
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+
+        response = await client.get(self.url, headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+
+    @pytest.mark.parametrize("fields", ["name,status", "name,customer"])
+    async def test_fields_not_modified(self, client, create_customer_in_db, create_order, fields):
+        _, headers = await create_customer_in_db()
+        await create_order(headers)
+        etag = (await client.get(self.url, params={"fields": fields}, headers=headers)).headers["ETag"]
+
+        response = await client.get(self.url, params={"fields": fields}, headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 304
+
+    async def test_modified(self, client, create_customer_in_db, create_order):
+        _, headers = await create_customer_in_db()
+        order = await create_order(headers)
+        etag = (await client.get(self.url, headers=headers)).headers["ETag"]
+
+        await client.post(f"/orders/{order['id']}/confirm/", headers=headers)
+
+        response = await client.get(self.url, headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+        assert response.json()["items"][0]["status"] == "published"
+
+
+@pytest.mark.asyncio
+class TestPublishedOrdersConditionalGet:
+    url = "/orders/"
+
+    async def test_not_modified(self, client, create_expert_in_db):
+        _, headers = await create_expert_in_db()
+        etag = (await client.get(self.url, headers=headers)).headers["ETag"]
+
+        response = await client.get(self.url, headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 304
@@ -0,0 +1,88 @@
+from unittest import mock
+
+import pytest
+from bson import ObjectId
+
+from app.orders.enums import FileType
+from app.orders.migrations import split_order_documents
+from app.orders.repositories.document import check_text_compression, encode_text, decode_text
+from app.orders.repositories.order import OrderRepository
+from app.orders.schemas import FileInfoDTO
+from tests.orders.factories import OrderFactory
+
+
+class TestTextEncoding:
+
+    def test_short_text_is_not_compressed(self):
+        assert encode_text("text", compress=True) == {"text": "text", "text_encoding": None}
+
+    def test_compressed(self):
+        pytest.importorskip("zstandard")
+        text = "Contract text " * 500
+        row = encode_text(text, compress=True)
+        assert row["text_encoding"] == "zstd"
+        assert len(row["text"]) < len(text)
+        assert decode_text(row) == text
+
+    def test_compression_requires_zstandard(self):
+        with mock.patch("app.orders.repositories.document.zstandard", None), \
+                mock.patch("app.orders.repositories.document.settings.ORDER_TEXT_COMPRESSION", True):
+            with pytest.raises(RuntimeError):
+                check_text_compression()
+
+
+@pytest.mark.asyncio
+class TestOrderDocument:
+
+    @staticmethod
+    def image(link: str) -> FileInfoDTO:
+        return FileInfoDTO(file_link=link, file_name="1.png", file_type=FileType.img)
+
+    async def test_document_detail(self, client, db_client, create_customer_in_db, create_expert_in_db, create_order):
+        _, headers = await create_customer_in_db()
+        _, expert_headers = await create_expert_in_db()
+        order = await create_order(headers)
+        repository = OrderRepository(db_client)
+        await repository.add_file_to_order_input(order["id"], self.image("https://storage/1.png"))
+        updated = await repository.add_file_to_order_input(order["id"], self.image("https://storage/2.png"))
+        await repository.set_document_text(order["id"], "Contract text")
+
+        assert updated.document.input.images_count == 2
+        row = await db_client.orders.find_one({"_id": ObjectId(order["id"])})
+        assert row["document"] == {"input": {"images_count": 2}, "has_text": True}
+
+        response = await client.get(f"/orders/{order['id']}/document/", headers=headers)
+        assert response.status_code == 200
+        assert response.json() == {
+            "id": order["id"],
+            "text": "Contract text",
+            "input": {"images": ["https://storage/1.png", "https://storage/2.png"]},
+            "result": {"images": []},
+            "vulnerability": "unknown",
+        }
+        # experts see documents of published orders only
+        response = await client.get(f"/orders/{order['id']}/document/", headers=expert_headers)
+        assert response.status_code == 404
+
+    async def test_split_order_documents(self, client, db_client):
+        row = OrderFactory.build().dict(by_alias=True, exclude_none=True)
+        row["_id"] = ObjectId(row["_id"])
+        row["seq"] = 0
+        row["document"] = {
+            "text": "Contract text",
+            "input": {"file": "https://storage/input.pdf", "images": ["https://storage/1.png"]},
+            "vulnerability": "unknown",
+        }
+        await db_client.orders.insert_one(row)
+
+        assert await split_order_documents(db_client, batch_size=1) >= 1
+        assert await split_order_documents(db_client) == 0
+        order = await OrderRepository(db_client).get_order_by_id(str(row["_id"]))
+        assert order.document.input.file == "https://storage/input.pdf"
+        assert order.document.input.images_count == 1
+        assert order.document.has_text
+        # summary fields of the response changed, delta sync clients receive the order
+        assert order.seq > 0
+        document = await db_client.order_documents.find_one({"_id": row["_id"]})
+        assert document["text"] == "Contract text"
+        assert document["input"] == {"images": ["https://storage/1.png"]}
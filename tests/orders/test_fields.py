@@ -0,0 +1,49 @@
+import pytest
+
+from app.core.metrics import CACHE_REQUESTS
+from app.orders.cache import published_orders_cache
+from app.orders.repositories.order import OrderRepository
+
+
+def test_projection():
+    assert OrderRepository.get_projection(["status"]) == {"customer": 1, "name": 1, "seq": 1, "status": 1}
+    projection = OrderRepository.get_projection()
+    assert "document.input.images_count" in projection
+    assert "document.text" not in projection
+
+
+@pytest.mark.asyncio
+class TestOrderFields:
+
+    async def test_self_orders(self, client, create_customer_in_db, create_order):
+        _, headers = await create_customer_in_db()
+        order = await create_order(headers)
+
+        response = await client.get("/orders/self/", params={"fields": "name,status"}, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["items"] == [{"id": order["id"], "name": order["name"], "status": "draft"}]
+
+        full = await client.get("/orders/self/", headers=headers)
+        assert full.json()["items"][0]["customer"] == order["customer"]
+        assert full.headers["ETag"] != response.headers["ETag"]
+
+    async def test_published_orders(self, client, create_customer_in_db, create_expert_in_db, create_order):
+        published_orders_cache.invalidate()
+        customer, customer_headers = await create_customer_in_db()
+        _, expert_headers = await create_expert_in_db()
+        order = await create_order(customer_headers)
+        await client.post(f"/orders/{order['id']}/confirm/", headers=customer_headers)
+
+        hits = CACHE_REQUESTS.get(cache="published_orders", result="hit")
+        for _ in range(2):
+            response = await client.get("/orders/", params={"fields": "customer"}, headers=expert_headers)
+            assert response.status_code == 200
+        assert CACHE_REQUESTS.get(cache="published_orders", result="hit") == hits
+        item = next(x for x in response.json()["items"] if x["id"] == order["id"])
+        assert item == {"id": order["id"], "customer": order["customer"]}
+        assert item["customer"]["phone"] == customer.phone
+
+    async def test_unknown_field(self, client, create_customer_in_db):
+        _, headers = await create_customer_in_db()
+        response = await client.get("/orders/self/changes/", params={"fields": "name,acl"}, headers=headers)
+        assert response.status_code == 400
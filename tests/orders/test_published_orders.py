@@ -0,0 +1,55 @@
+import pytest
+
+from app.core.metrics import CACHE_REQUESTS
+from app.orders.cache import PublishedOrdersCache, published_orders_cache
+
+
+def cache_requests(result: str) -> float:
+    return CACHE_REQUESTS.get(cache="published_orders", result=result)
+
+
+class TestPublishedOrdersCache:
+
+    def test_hit_and_miss(self):
+        cache = PublishedOrdersCache(ttl=60, depth=20)
+        hits, misses = cache_requests("hit"), cache_requests("miss")
+        assert cache.get(offset=0, limit=10) is None
+        cache.set(offset=0, limit=10, content="page", etag='"tag"', generation=cache.generation)
+        assert cache.get(offset=0, limit=10) == ("page", '"tag"')
+        assert (cache_requests("hit"), cache_requests("miss")) == (hits + 1, misses + 1)
+
+    def test_not_cacheable(self):
+        cache = PublishedOrdersCache(ttl=60, depth=20)
+        cache.set(offset=20, limit=10, content="page", etag='"tag"', generation=cache.generation)
+        assert cache.get(offset=20, limit=10) is None
+
+    def test_stale_generation(self):
+        cache = PublishedOrdersCache(ttl=60, depth=20)
+        generation = cache.generation
+        cache.invalidate()
+        cache.set(offset=0, limit=10, content="page", etag='"tag"', generation=generation)
+        assert cache.get(offset=0, limit=10) is None
+
+
+@pytest.mark.asyncio
+class TestGetPublishedOrders:
+    url = "/orders/"
+
+    async def test_invalidation(self, client, create_customer_in_db, create_expert_in_db, create_order):
+        published_orders_cache.invalidate()
+        _, customer_headers = await create_customer_in_db()
+        _, expert_headers = await create_expert_in_db()
+        order = await create_order(customer_headers)
+        await client.post(f"/orders/{order['id']}/confirm/", headers=customer_headers)
+
+        response = await client.get(self.url, headers=expert_headers)
+        assert response.status_code == 200
+        assert order["id"] in [x["id"] for x in response.json()["items"]]
+
+        hits = cache_requests("hit")
+        assert (await client.get(self.url, headers=expert_headers)).json() == response.json()
+        assert cache_requests("hit") == hits + 1
+
+        await client.post(f"/orders/{order['id']}/accept/", headers=expert_headers)
+        response = await client.get(self.url, headers=expert_headers)
+        assert order["id"] not in [x["id"] for x in response.json()["items"]]
@@ -0,0 +1,81 @@
+from unittest import mock
+
+import pytest
+
+from app.orders.cache import published_orders_cache
+
+
+@pytest.mark.asyncio
+class TestRoundTrips:
+
+    async def test_self_orders(self, client, create_customer_in_db, create_order, round_trips):
+        _, headers = await create_customer_in_db()
+        orders = [await create_order(headers) for _ in range(3)]
+
+        with round_trips() as trips:
+            response = await client.get("/orders/self/", params={"limit": 50}, headers=headers)
+        assert response.status_code == 200
+        # user, page and count, the customer is the caller in the identity map,
+        # versions are not checked without If-None-Match
+        trips.assert_budget(mongo=3, outbound=0)
+
+    async def test_self_orders_not_modified(self, client, create_customer_in_db, create_order, round_trips):
+        _, headers = await create_customer_in_db()
+        await create_order(headers)
+        response = await client.get("/orders/self/", params={"limit": 50}, headers=headers)
+
+        with round_trips() as trips:
+            response = await client.get(
+                "/orders/self/",
+                params={"limit": 50},
+                headers={**headers, "If-None-Match": response.headers["ETag"]},
+            )
+        assert response.status_code == 304
+        trips.assert_budget(mongo=2, outbound=0)
+
+    async def test_published_orders_of_customer(
+            self, client, create_customer_in_db, create_expert_in_db, create_order, round_trips,
+    ):
+        _, customer_headers = await create_customer_in_db()
+        _, expert_headers = await create_expert_in_db()
+        for _ in range(10):
+            order = await create_order(customer_headers)
+            await client.post(f"/orders/{order['id']}/confirm/", headers=customer_headers)
+        published_orders_cache.invalidate()
+
+        with round_trips() as trips:
+            response = await client.get("/orders/", params={"limit": 10}, headers=expert_headers)
+        assert response.status_code == 200
+        assert len({x["customer"]["id"] for x in response.json()["items"]}) == 1
+        # user, page and count, customers of the page are read with one query
+        trips.assert_budget(mongo=4, outbound=0)
+
+    async def test_create_order(self, client, create_customer_in_db, round_trips):
+        _, headers = await create_customer_in_db()
+
+        with round_trips() as trips:
+            response = await client.post("/orders/", json={"name": "Contract"}, headers=headers)
+        assert response.status_code == 200
+        # user, sequence lease, insert and lease release, the inserted order and the customer are not read back
+        trips.assert_budget(mongo=4, outbound=0)
+
+    async def test_cancel_order(self, client, create_customer_in_db, create_order, round_trips):
+        _, headers = await create_customer_in_db()
+        order = await create_order(headers)
+
+        with round_trips() as trips:
+            response = await client.post(f"/orders/{order['id']}/cancel/", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["customer"]["id"] == order["customer"]["id"]
+        # user, order, sequence lease, update and lease release, the serializer reuses the caller
+        trips.assert_budget(mongo=5, outbound=0)
+
+    async def test_auth_customer(self, client, round_trips):
+        with mock.patch("app.services.sms_service.sms_service.requests.get") as requests_get, \
+                round_trips() as trips:
+            requests_get.return_value.content = b"OK - 1 SMS"
+            response = await client.post("/user/auth/customer/", json={"phone": "78000000001"})
+        assert response.status_code == 200
+        # The customer and the code are saved with one upsert, the background task only sends SMS
+        assert trips.outbound == ["sms.send"]
+        trips.assert_budget(mongo=1, outbound=1)
@@ -1,5 +1,8 @@
+import asyncio
+
 import pytest
 
+from app.users.repositories.user import UserRepository
 from tests.users.conftest import test_faker
 
 
@@ -50,3 +53,29 @@ class TestSignup:
         new_user = await db_client.users.find_one({'email.value': self.fake_email})
         assert new_user is not None
         assert new_user['email'] == email
+
+
+@pytest.mark.asyncio
+class TestCustomerUpsert:
+
+    async def test_created(self, db_client):
+        repository = UserRepository(db_client)
+        user, created = await repository.get_or_create_user_by_phone("79120000001", code="1234")
+        assert created
+        assert user.phone == "79120000001"
+
+        same_user, created = await repository.get_or_create_user_by_phone("79120000001", code="4321")
+        assert not created
+        assert same_user.id == user.id
+        assert same_user.version == user.version + 1
+        row = await db_client.users.find_one({"phone": "79120000001"})
+        assert row["acl"]["code"] == "4321"
+        assert row["md"]["role"] == user.md.role
+
+    async def test_concurrent(self, db_client):
+        results = await asyncio.gather(*(
+            UserRepository(db_client).get_or_create_user_by_phone("79120000002", code="1234") for _ in range(3)
+        ))
+        assert [created for _, created in results].count(True) == 1
+        assert len({user.id for user, _ in results}) == 1
+        assert await db_client.users.count_documents({"phone": "79120000002"}) == 1
@@ -1,11 +1,8 @@
-import random
-
 import factory
-import faker
+from bson import ObjectId
 
-from app.core.database import PydanticObjectId
 from app.users.enums import UserRole
-from app.users.models import User, PasswordRecovery, ACLPassword, UserACL, UserToken
+from app.users.models import User, PasswordRecovery, ACLPassword, UserACL, UserToken, UserMD, UserEmail
 
 
 class PasswordRecoveryFactory(factory.Factory):
@@ -25,7 +22,7 @@ class ACLPasswordFactory(factory.Factory):
 
 class UserACLFactory(factory.Factory):
     password = factory.SubFactory(ACLPasswordFactory)
-    code = "".join([str(random.randint(0, 9)) for _ in range(4)])
+    code = factory.Faker('random_int', min=1000, max=9999)
 
     class Meta:
         model = UserACL
@@ -43,17 +40,28 @@ class UserMDFactory(factory.Factory):
     ect = 1640995200
     role = UserRole.expert
 
+    class Meta:
+        model = UserMD
+
+
+class UserEmailFactory(factory.Factory):
+    value = factory.Faker('email')
+    confirmed = True
+
+    class Meta:
+        model = UserEmail
+
 
 class UserFactory(factory.Factory):
-    id = PydanticObjectId()
-    name = faker.Faker("name")
+    id = factory.LazyFunction(ObjectId)
+    name = factory.Faker('name')
     acl = factory.SubFactory(UserACLFactory)
     tokens = factory.List([factory.SubFactory(UserTokenFactory) for _ in range(1)])
-    rating = random.uniform(3, 5)
+    rating = factory.Faker('pyfloat', min_value=3, max_value=5)
 
 
 class CustomerFactory(UserFactory):
-    phone = faker.Faker("phone")
+    phone = factory.Faker('msisdn')
     md = factory.SubFactory(UserMDFactory, role=UserRole.customer)
 
     class Meta:
@@ -61,7 +69,7 @@ class CustomerFactory(UserFactory):
 
 
 class ExpertFactory(UserFactory):
-    email = faker.Faker("email")
+    email = factory.SubFactory(UserEmailFactory)
     md = factory.SubFactory(UserMDFactory, role=UserRole.expert)
 
     class Meta:
@@ -0,0 +1,45 @@
+import pytest
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+from app.core.events import create_indexes
+from app.core.memory_database import MemoryClient
+from app.users.migrations import find_duplicate_phones, merge_duplicate_phones
+
+
+@pytest.mark.asyncio
+class TestMergeDuplicatePhones:
+
+    @pytest.fixture()
+    def db(self):
+        return MemoryClient()["test"]
+
+    async def test_merged(self, db):
+        kept, duplicate = ObjectId(), ObjectId()
+        await db.users.insert_many([
+            {"_id": kept, "phone": "79120000001", "tokens": [{"value": "a"}]},
+            {"_id": duplicate, "phone": "79120000001", "tokens": [{"value": "b"}]},
+            {"_id": ObjectId(), "phone": "79120000002", "tokens": []},
+            {"_id": ObjectId(), "phone": None},
+            {"_id": ObjectId(), "phone": None},
+        ])
+        await db.orders.insert_one({"customer": str(duplicate), "name": "order", "seq": 0})
+
+        assert await merge_duplicate_phones(db) == 1
+        assert await merge_duplicate_phones(db) == 0
+        row = await db.users.find_one({"phone": "79120000001"})
+        assert row["_id"] == kept
+        assert row["tokens"] == [{"value": "a"}, {"value": "b"}]
+        order = await db.orders.find_one({})
+        assert order["customer"] == str(kept)
+        assert order["seq"] > 0
+
+    async def test_index_not_built_with_duplicates(self, db):
+        await db.users.insert_many([{"phone": "79120000001"}, {"phone": "79120000001"}, {"phone": "79120000002"}])
+        assert await find_duplicate_phones(db) == ["79120000001"]
+        with pytest.raises(DuplicateKeyError):
+            await create_indexes(db)
+        assert await db.users.count_documents({}) == 3
+
+        await merge_duplicate_phones(db)
+        await create_indexes(db)
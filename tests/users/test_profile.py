@@ -1,4 +1,8 @@
 import pytest
+from bson import ObjectId
+
+from app.users.repositories.user import UserRepository
+from app.users.schemas import UpdateUserDTO
 
 
 @pytest.mark.asyncio
@@ -25,6 +29,20 @@ class TestGetProfile:
         assert response.status_code == 200
         assert response["email"] == user.email.value
 
+    async def test_not_modified(self, client, db_client, expert_factory, create_user_in_db):
+        row = expert_factory().dict(by_alias=True, exclude_none=True)
+        user, token = await create_user_in_db({**row, "_id": ObjectId(row["_id"])})
+        response = await client.get(self.url, headers={"Authorization": token})
+        etag = response.headers["ETag"]
+
+        response = await client.get(self.url, headers={"Authorization": token, "If-None-Match": etag})
+        assert response.status_code == 304
+
+        await client.post(self.url, json={"name": "new name"}, headers={"Authorization": token})
+        response = await client.get(self.url, headers={"Authorization": token, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
 
 @pytest.mark.asyncio
 class TestUpdateProfile:
@@ -42,3 +60,55 @@ class TestUpdateProfile:
         )
         assert response.status_code == 200
         assert response["name"] == "new name"
+
+
+@pytest.mark.asyncio
+class TestPartialUpdate:
+    url = "/user/"
+
+    @pytest.fixture()
+    async def expert(self, expert_factory, create_user_in_db):
+        row = expert_factory().dict(by_alias=True, exclude_none=True)
+        return await create_user_in_db({**row, "_id": ObjectId(row["_id"])})
+
+    async def test_changed_fields(self, client, db_client, expert, round_trips):
+        user, token = expert
+        with round_trips() as trips:
+            response = await client.post(self.url, json={"name": "new name"}, headers={"Authorization": token})
+        assert response.status_code == 200
+        assert response.json()["name"] == "new name"
+        # user and find_one_and_update
+        trips.assert_budget(mongo=2)
+
+        with round_trips() as trips:
+            await client.post(self.url, json={"name": "new name"}, headers={"Authorization": token})
+        trips.assert_budget(mongo=1)
+
+    async def test_concurrent_token_kept(self, db_client, expert):
+        user, _ = expert
+        await db_client.users.update_one({"_id": ObjectId(user.id)}, {"$push": {"tokens": {"value": "new"}}})
+
+        updated = await UserRepository(db_client).update_user(user, UpdateUserDTO(name="new name"))
+        assert updated.name == "new name"
+        assert updated.version == user.version + 1
+        assert updated.tokens[-1].value == "new"
+
+    async def test_if_match(self, client, expert):
+        user, token = expert
+        etag = (await client.get(self.url, headers={"Authorization": token})).headers["ETag"]
+
+        response = await client.post(
+            self.url, json={"name": "first"}, headers={"Authorization": token, "If-Match": etag},
+        )
+        assert response.status_code == 200
+        response = await client.post(
+            self.url, json={"name": "second"}, headers={"Authorization": token, "If-Match": etag},
+        )
+        assert response.status_code == 412
+
+    async def test_version_conflict(self, db_client, expert):
+        user, _ = expert
+        await db_client.users.update_one({"_id": ObjectId(user.id)}, {"$inc": {"version": 1}})
+
+        repository = UserRepository(db_client)
+        assert await repository.update_user(user, UpdateUserDTO(name="new"), expected_version=user.version) is None